@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# load test of the gateway: `--threads` callers send reads and creates (a
+# `--write-ratio` of them) for `--seconds`, one call per HTTP request or
+# `--batch` calls per `/batch` request. Without `--url` a gateway is started
+# in process in front of a node emulator.
+#   python -m bench.gateway [--url http://127.0.0.1:4562] [-t 32] [-s 10] [-w 0.2] [-b 1]
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import requests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.suite import percentile
+from lib.emulator import SAMPLE_MNEMONIC
+
+GAS_INFO = {'max_fee': 4000001}
+VALUE = 'v' * 256
+SEEDED_KEYS = 100
+
+def start_gateway(block_time):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from lib.emulator import NodeEmulator
+    from lib.gateway import create_app, new_gateway
+    node = NodeEmulator(block_time=block_time).start()
+    gateway = new_gateway({'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'bench', 'endpoint': node.endpoint})
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+    server = make_server('127.0.0.1', 0, create_app(gateway), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    def stop():
+        server.shutdown()
+        gateway.close()
+        node.stop()
+    return 'http://127.0.0.1:%d' % server.server_port, stop
+
+class Caller:
+    def __init__(self, url, n, write_ratio, batch):
+        self.url = url
+        self.n = n
+        self.write_ratio = write_ratio
+        self.batch = batch
+        self.session = requests.Session()
+        self.latencies = {'read': [], 'create': [], 'batch': []}
+        self.errors = 0
+        self.writes = 0
+
+    def next_call(self):
+        if random.random() < self.write_ratio:
+            self.writes += 1
+            return {'method': 'create', 'args': ['t%d-%d' % (self.n, self.writes), VALUE, GAS_INFO]}
+        return {'method': 'read', 'args': ['seed%d' % random.randrange(SEEDED_KEYS)]}
+
+    def run(self, deadline):
+        while time.time() < deadline:
+            if self.batch > 1:
+                calls = [self.next_call() for _ in range(self.batch)]
+                started_at = time.perf_counter()
+                res = self.session.post(self.url + '/batch', json=calls)
+                self.latencies['batch'].append(time.perf_counter() - started_at)
+                self.errors += res.status_code != 200 or sum(1 for r in res.json() if 'error' in r)
+            else:
+                call = self.next_call()
+                started_at = time.perf_counter()
+                res = self.session.post(self.url + '/', json=call)
+                self.latencies[call['method']].append(time.perf_counter() - started_at)
+                self.errors += res.status_code != 200
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='gateway to load, one is started against a node emulator otherwise')
+    parser.add_argument('-t', '--threads', type=int, default=32)
+    parser.add_argument('-s', '--seconds', type=float, default=10)
+    parser.add_argument('-w', '--write-ratio', type=float, default=0.2)
+    parser.add_argument('-b', '--batch', type=int, default=1, help='calls per /batch request, 1 posts them one by one')
+    parser.add_argument('--block-time', type=float, default=1, help='block time of the started node emulator')
+    parser.add_argument('-o', '--output', help='write the results as json')
+    args = parser.parse_args()
+
+    url, stop = args.url, None
+    if url == None:
+        url, stop = start_gateway(args.block_time)
+    try:
+        seed = requests.post(url + '/batch', json=[{'method': 'create', 'args': ['seed%d' % i, VALUE, GAS_INFO]} for i in range(SEEDED_KEYS)])
+        callers = [Caller(url, n, args.write_ratio, args.batch) for n in range(args.threads)]
+        deadline = time.time() + args.seconds
+        threads = [threading.Thread(target=c.run, args=(deadline,)) for c in callers]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stats = requests.get(url + '/stats').json()
+    finally:
+        if stop != None:
+            stop()
+
+    results = {'threads': args.threads, 'seconds': elapsed, 'batch': args.batch, 'write_ratio': args.write_ratio, 'requests': {}}
+    if any('error' in r for r in seed.json()):
+        print('seeding failed, keys may exist already: reads of them may fail')
+    for name in ['read', 'create', 'batch']:
+        latencies = sorted(l for c in callers for l in c.latencies[name])
+        if not latencies:
+            continue
+        results['requests'][name] = r = {
+            'n': len(latencies),
+            'per_second': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+        print('%-8s %8d requests %10.1f /s   p50 %8.2f ms   p99 %8.2f ms' % (name, r['n'], r['per_second'], r['p50_ms'], r['p99_ms']))
+    results['errors'] = sum(c.errors for c in callers)
+    results['gateway'] = stats
+    writes = stats['writes']
+    print('errors %d, %d writes in %d transactions (%d retried alone)' % (results['errors'], writes['writes'], writes['transactions'], writes['isolated']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# sign the same payloads with every available signer backend, check the
+# signatures are byte-identical and report signatures per second:
+#   python -m bench.signing
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.bluzelle import HD_PATH, ADDRESS_PREFIX
+from lib.identity import derive_identity
+from lib import signer
+
+MNEMONIC = 'around buzz diagram captain obtain detail salon mango muffin brother morning jeans display attend knife carry green dwarf vendor hungry fan route pumpkin car'
+ROUNDS = 500
+
+def main():
+    identity = derive_identity(MNEMONIC, HD_PATH, ADDRESS_PREFIX)
+    payloads = [b'{"account_number":"0","chain_id":"bluzelle","sequence":"%d"}' % i for i in range(ROUNDS)]
+    backends = [('ecdsa', signer.EcdsaSigner)]
+    if signer.coincurve != None:
+        backends.append(('secp256k1', signer.Secp256k1Signer))
+    else:
+        print('coincurve not installed, only benchmarking ecdsa')
+
+    signatures = {}
+    for (name, cls) in backends:
+        s = cls(identity.private_key, identity.public_key)
+        start = time.perf_counter()
+        signatures[name] = [s.sign(p) for p in payloads]
+        elapsed = time.perf_counter() - start
+        print('%-10s %10.0f sigs/s' % (name, ROUNDS / elapsed))
+
+    if len(signatures) > 1 and signatures['ecdsa'] != signatures['secp256k1']:
+        print('signatures differ between backends')
+        sys.exit(1)
+    if len(signatures) > 1:
+        print('signatures identical across backends')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# time the key derivation part of `new_client` startup:
+#   python -m bench.startup
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.bluzelle import HD_PATH, ADDRESS_PREFIX
+from lib.identity import IdentityCache, derive_identity
+
+MNEMONIC = 'around buzz diagram captain obtain detail salon mango muffin brother morning jeans display attend knife carry green dwarf vendor hungry fan route pumpkin car'
+ROUNDS = 20
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+def main():
+    with tempfile.TemporaryDirectory() as d:
+        IdentityCache().load(MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+        process_cache = IdentityCache()
+        process_cache.load(MNEMONIC, HD_PATH, ADDRESS_PREFIX)
+        results = [
+            ('derive (no cache)', timed(lambda: derive_identity(MNEMONIC, HD_PATH, ADDRESS_PREFIX))),
+            ('disk cache hit', timed(lambda: IdentityCache().load(MNEMONIC, HD_PATH, ADDRESS_PREFIX, d))),
+            ('process cache hit', timed(lambda: process_cache.load(MNEMONIC, HD_PATH, ADDRESS_PREFIX))),
+        ]
+    for (name, ms) in results:
+        print('%-20s %8.3f ms' % (name, ms))
+
+if __name__ == '__main__':
+    main()
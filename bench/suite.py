@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# time the client hot paths and every `Client` method end to end against a
+# local fake REST node, and write the results as json to diff across runs:
+#   python -m bench.suite [-o bench-results.json] [-n 200] [--compare old.json]
+import sys
+import os
+import re
+import json
+import binascii
+import time
+import platform
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lib.bluzelle import Client, HD_PATH
+from lib.mnemonic_utils import mnemonic_to_private_key
+from lib.canonical import canonical_json
+from lib.emulator import FakeNode, new_offline_client, SAMPLE_MNEMONIC
+
+GAS_INFO = {'max_fee': 4000001}
+LEASE_INFO = {'days': 1, 'hours': 2, 'minutes': 3, 'seconds': 4}
+VALUE = 'v' * 256
+# result each tx query message reports in the `/txs` response data
+TX_RESULTS = {
+    'crud/read': {'value': VALUE},
+    'crud/has': {'has': True},
+    'crud/count': {'count': '1'},
+    'crud/keys': {'keys': ['k%d' % i for i in range(100)]},
+    'crud/keyvalues': {'keyvalues': [{'key': 'k%d' % i, 'value': VALUE} for i in range(100)]},
+    'crud/getlease': {'lease': '100'},
+    'crud/getnshortestleases': {'keyleases': [{'key': 'k', 'lease': '100'}]},
+}
+
+# runs of `fn` per second and microseconds per run, best of `repeat` batches of `number`
+def micro(fn, number, repeat = 5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = (time.perf_counter() - start) / number
+        if best == None or elapsed < best:
+            best = elapsed
+    return {'ops_per_second': 1 / best, 'us_per_op': best * 1e6}
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+# ops/s and latency percentiles of `n` sequential calls
+def end_to_end(fn, n):
+    fn(0)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        started_at = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - started_at)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'n': n,
+        'ops_per_second': n / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+def sample_transaction(client):
+    return {
+        'msg': [{'type': 'crud/create', 'value': client.transaction_payload(client.key_value_payload('key<&>', VALUE))}],
+        'fee': {'gas': '200000', 'amount': [{'denom': 'ubnt', 'amount': '4000001'}]},
+        'memo': Client.make_random_string(32),
+    }
+
+# the sign bytes encoding `canonical_json` replaced, for comparison
+def legacy_sign_bytes(payload):
+    s = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    s = re.sub(r"([&<>])", lambda m: u"\\u00" + binascii.hexlify(m.group(0).encode('ascii')).decode(), s)
+    return bytes(s, 'utf-8')
+
+def bench_hot_paths():
+    client = new_offline_client()
+    txn = sample_transaction(client)
+    return {
+        'legacy_sign_bytes': micro(lambda: legacy_sign_bytes(txn), 2000),
+        'canonical_json': micro(lambda: canonical_json(txn), 2000),
+        'sign_transaction': micro(lambda: client.sign_transaction(txn), 200),
+        'encode_safe': micro(lambda: Client.encode_safe('a key/with?odd#chars&more'), 10000),
+        'mnemonic_to_private_key': micro(lambda: mnemonic_to_private_key(SAMPLE_MNEMONIC, str_derivation_path=HD_PATH), 5, 3),
+        'lease_info_to_blocks': micro(lambda: Client.lease_info_to_blocks(LEASE_INFO), 20000),
+    }
+
+def new_node():
+    node = FakeNode()
+    def txs(req):
+        msgs = req['body']['tx']['msg']
+        data = ''.join(json.dumps(TX_RESULTS[m['type']]) for m in msgs if m['type'] in TX_RESULTS)
+        res = {'height': '1', 'txhash': 'H', 'raw_log': '[]', 'gas_used': '1000'}
+        if data:
+            res['data'] = data.encode('ascii').hex()
+        return res
+    def builder(req):
+        value = dict(req['body'])
+        value.pop('BaseReq', None)
+        return {'value': {'msg': [{'type': 'crud/' + req['path'].split('/')[2], 'value': value}], 'fee': {'gas': '200000', 'amount': []}}}
+    node.route('GET', '/crud/read/', lambda req: {'result': {'value': VALUE}})
+    node.route('GET', '/crud/has/', lambda req: {'result': {'has': True}})
+    node.route('GET', '/crud/count/', lambda req: {'result': {'count': '100'}})
+    node.route('GET', '/crud/keys/', lambda req: {'result': TX_RESULTS['crud/keys']})
+    node.route('GET', '/crud/keyvalues/', lambda req: {'result': TX_RESULTS['crud/keyvalues']})
+    node.route('GET', '/crud/getlease/', lambda req: {'result': {'lease': '100'}})
+    node.route('GET', '/crud/getnshortestleases/', lambda req: {'result': TX_RESULTS['crud/getnshortestleases']})
+    node.route('GET', '/auth/accounts/', lambda req: {'result': {'value': {'account_number': 0, 'sequence': 0}}})
+    node.route('GET', '/node_info', lambda req: {'application_version': {'version': '0.0.0'}})
+    node.route('POST', '/txs', txs)
+    node.route('POST', '/crud/', builder)
+    node.route('DELETE', '/crud/', builder)
+    return node
+
+def bench_methods(n):
+    node = new_node()
+    client = new_offline_client({'endpoint': node.endpoint})
+    key = lambda i: 'key%d' % i
+    methods = [
+        ('account', lambda i: client.account()),
+        ('version', lambda i: client.version()),
+        ('read', lambda i: client.read(key(i))),
+        ('has', lambda i: client.has(key(i))),
+        ('count', lambda i: client.count()),
+        ('keys', lambda i: client.keys()),
+        ('key_values', lambda i: client.key_values()),
+        ('get_lease', lambda i: client.get_lease(key(i))),
+        ('get_n_shortest_leases', lambda i: client.get_n_shortest_leases(10)),
+        ('create', lambda i: client.create(key(i), VALUE, GAS_INFO, LEASE_INFO)),
+        ('update', lambda i: client.update(key(i), VALUE, GAS_INFO)),
+        ('rename', lambda i: client.rename(key(i), key(i) + 'x', GAS_INFO)),
+        ('delete', lambda i: client.delete(key(i), GAS_INFO)),
+        ('delete_all', lambda i: client.delete_all(GAS_INFO)),
+        ('multi_update', lambda i: client.multi_update([{'key': key(i), 'value': VALUE}], GAS_INFO)),
+        ('renew_lease', lambda i: client.renew_lease(key(i), GAS_INFO, LEASE_INFO)),
+        ('renew_lease_all', lambda i: client.renew_lease_all(GAS_INFO, LEASE_INFO)),
+        ('tx_read', lambda i: client.tx_read(key(i), GAS_INFO)),
+        ('tx_has', lambda i: client.tx_has(key(i), GAS_INFO)),
+        ('tx_count', lambda i: client.tx_count(GAS_INFO)),
+        ('tx_keys', lambda i: client.tx_keys(GAS_INFO)),
+        ('tx_key_values', lambda i: client.tx_key_values(GAS_INFO)),
+        ('tx_get_lease', lambda i: client.tx_get_lease(key(i), GAS_INFO)),
+        ('tx_get_n_shortest_leases', lambda i: client.tx_get_n_shortest_leases(10, GAS_INFO)),
+    ]
+    try:
+        return dict((name, end_to_end(fn, n)) for (name, fn) in methods)
+    finally:
+        client.close()
+        node.stop()
+
+def compare(results, old):
+    print('\n%-28s %12s %12s %8s' % ('vs ' + os.path.basename(old['path']), 'before', 'after', 'ratio'))
+    for section in ['hot_paths', 'methods']:
+        for (name, now) in results[section].items():
+            before = old[section].get(name, None)
+            if before != None:
+                print('%-28s %12.0f %12.0f %7.2fx' % (name, before['ops_per_second'], now['ops_per_second'], now['ops_per_second'] / before['ops_per_second']))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', default='bench-results.json')
+    parser.add_argument('-n', '--ops', type=int, default=200, help='calls per client method')
+    parser.add_argument('--compare', help='results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'hot_paths': bench_hot_paths(),
+        'methods': bench_methods(args.ops),
+    }
+    for (name, r) in results['hot_paths'].items():
+        print('%-28s %12.0f ops/s %10.2f us' % (name, r['ops_per_second'], r['us_per_op']))
+    for (name, r) in results['methods'].items():
+        print('%-28s %12.0f ops/s   p50 %6.2f ms   p99 %6.2f ms' % (name, r['ops_per_second'], r['p50_ms'], r['p99_ms']))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print('results written to %s' % args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        old['path'] = args.compare
+        compare(results, old)
+
+if __name__ == '__main__':
+    main()
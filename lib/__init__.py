@@ -1 +1,7 @@
 from .bluzelle import new_client, APIError, OptionsError
+from .transport import Transport, HTTPTransport
+from .async_client import new_async_client, AsyncTransport
+from .pool import new_pool_client, PoolClient
+from .retry import RetryPolicy
+from .metrics import Metrics, MetricsRegistry, serve_metrics
+from .tracing import Tracer, LoggingExporter
@@ -0,0 +1,549 @@
+import asyncio
+import json
+import time
+from .canonical import canonical_json
+from .bluzelle import Client, APIError, validate_options, TX_COMMAND, EMPTY_BATCH, KEY_NOT_FOUND, DEFAULT_CONCURRENCY, CRUD_STORE, NODE_BEHIND, LATEST_BLOCK_ENDPOINT, DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS, CONSISTENCY_POLL_INTERVAL_IN_SECONDS
+from .transport import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT_IN_SECONDS, STREAM_CHUNK_SIZE
+from .bulk import AsyncBulkWriter, DEFAULT_BULK_MAX_BYTES
+from .cache import MISS, CACHE_READ, CACHE_HAS, CACHE_LEASE
+from .stream import JSONArrayParser, MALFORMED_STREAM
+from .singleflight import AsyncSingleFlight
+from .tracker import AsyncTxTracker, then, TX_POLL_INTERVAL_SECONDS, TX_POLL_BATCH_SIZE, TX_CONFIRMATION_TIMEOUT_SECONDS
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+AIOHTTP_IS_REQUIRED = 'aiohttp is required for the async client (pip install aiohttp)'
+
+# the parts of a `requests.Response` the client relies on
+class AsyncResponse:
+    def __init__(self, status_code, text, content = None):
+        self.status_code = status_code
+        self.text = text
+        # body bytes, sizes in metrics count bytes not characters
+        self.content = content if content != None else text.encode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+# base async transport, subclass and pass as the `transport` option of
+# `new_async_client`
+class AsyncTransport:
+    async def request(self, method, url, data = None, headers = None):
+        raise NotImplementedError
+
+    async def stream(self, method, url, headers = None):
+        yield (await self.request(method, url, headers=headers)).text.encode('utf-8')
+
+    def stats(self):
+        return {
+            "requests": 0,
+            "connections": 0,
+            "reused": 0,
+        }
+
+    async def close(self):
+        pass
+
+# keep-alive transport backed by an `aiohttp.ClientSession`, the session is
+# created lazily so it binds to the loop the client is used from
+#   @param pool_size max connections per endpoint (host), extra requests queue
+#   @param timeout total timeout in seconds for every request
+#   @param verify tls certificate verification
+class AioHTTPTransport(AsyncTransport):
+    def __init__(self, pool_size = DEFAULT_POOL_SIZE, timeout = DEFAULT_TIMEOUT_IN_SECONDS, verify = True):
+        if aiohttp == None:
+            raise ImportError(AIOHTTP_IS_REQUIRED)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.verify = verify
+        self.session = None
+        self.num_requests = 0
+        self.num_connections = 0
+
+    def get_session(self):
+        if self.session == None:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(self.on_request_start)
+            trace.on_connection_create_end.append(self.on_connection_create_end)
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0,
+                    limit_per_host=self.pool_size,
+                    ssl=None if self.verify else False
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace]
+            )
+        return self.session
+
+    async def on_request_start(self, session, ctx, params):
+        self.num_requests += 1
+
+    async def on_connection_create_end(self, session, ctx, params):
+        self.num_connections += 1
+
+    async def request(self, method, url, data = None, headers = None):
+        async with self.get_session().request(method, url, data=data, headers=headers) as response:
+            content = await response.read()
+            return AsyncResponse(response.status, await response.text(), content)
+
+    async def stream(self, method, url, headers = None):
+        async with self.get_session().request(method, url, headers=headers) as response:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                yield chunk
+
+    def stats(self):
+        return {
+            "requests": self.num_requests,
+            "connections": self.num_connections,
+            "reused": max(self.num_requests - self.num_connections, 0),
+        }
+
+    async def close(self):
+        if self.session != None:
+            await self.session.close()
+            self.session = None
+
+# asyncio flavour of `Client`, every api method is a coroutine. Validation,
+# payloads, fees and signing are shared with `Client`; only io differs.
+# Queries run fully concurrently, transactions are broadcast one at a time
+# as they share the account sequence.
+class AsyncClient(Client):
+    def __init__(self, options):
+        super().__init__(options)
+        self.transaction_lock = asyncio.Lock()
+
+    def new_transport(self):
+        return AioHTTPTransport(
+            pool_size=self.options.get('pool_size', DEFAULT_POOL_SIZE),
+            timeout=self.options.get('timeout', DEFAULT_TIMEOUT_IN_SECONDS)
+        )
+
+    def new_flights(self):
+        return AsyncSingleFlight()
+
+    def new_tracker(self):
+        return AsyncTxTracker(
+            self,
+            poll_interval=self.options.get('confirmation_poll_interval', TX_POLL_INTERVAL_SECONDS),
+            batch_size=self.options.get('confirmation_batch_size', TX_POLL_BATCH_SIZE),
+            timeout=self.options.get('confirmation_timeout', TX_CONFIRMATION_TIMEOUT_SECONDS)
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    #
+
+    async def account(self):
+        return (await self.api_query(self.account_url()))['result']['value']
+
+    async def version(self):
+        return (await self.api_query(self.version_url()))['application_version']['version']
+
+    # mutate methods
+
+    async def create(self, key, value, gas_info, lease_info = None):
+        payload = self.key_value_payload(key, value, lease_info)
+        return await self.send_transaction("post", "/crud/create", payload, gas_info)
+
+    async def update(self, key, value, gas_info, lease_info = None):
+        payload = self.key_value_payload(key, value, lease_info)
+        return await self.send_transaction("post", "/crud/update", payload, gas_info)
+
+    async def delete(self, key, gas_info):
+        return await self.send_transaction("delete", "/crud/delete", self.key_payload(key), gas_info)
+
+    async def rename(self, key, new_key, gas_info):
+        return await self.send_transaction("post", "/crud/rename", self.rename_payload(key, new_key), gas_info)
+
+    async def delete_all(self, gas_info):
+        return await self.send_transaction("post", "/crud/deleteall", {}, gas_info)
+
+    async def multi_update(self, payload, gas_info):
+        return await self.send_transaction("post", "/crud/multiupdate", {"KeyValues": payload}, gas_info)
+
+    async def renew_lease(self, key, gas_info, lease_info = None):
+        payload = self.lease_payload(lease_info, self.key_payload(key))
+        await self.send_transaction("post", "/crud/renewlease", payload, gas_info)
+
+    async def renew_all_leases(self, *args, **kwargs):
+        return await self.renew_lease_all(*args, **kwargs)
+
+    async def renew_lease_all(self, gas_info, lease_info = None):
+        payload = self.lease_payload(lease_info, {})
+        await self.send_transaction("post", "/crud/renewleaseall", payload, gas_info)
+
+    async def bulk_write(self, items, gas_info, upsert = False, lease_info = None, max_bytes = DEFAULT_BULK_MAX_BYTES, max_gas = None, offline = True):
+        return await AsyncBulkWriter(self, gas_info, upsert, lease_info, max_bytes, max_gas, offline).write(items)
+
+    async def commit_batch(self, batch, gas_info):
+        if len(batch) == 0:
+            raise APIError(EMPTY_BATCH)
+        with self.span("batch", {"ops": len(batch)}):
+            self.record_transaction_call("/crud/batch")
+            txns = await asyncio.gather(*[self.build_transaction(method, endpoint, payload, batch.offline) for (method, endpoint, payload, _) in batch.ops])
+            ops = [(endpoint, payload) for (_, endpoint, payload, _) in batch.ops]
+            async with self.transaction_lock:
+                if self.account_stale:
+                    await self.set_account()
+                self.track_writes(ops)
+                res = await self.broadcast_transaction(Client.merge_transactions(txns), gas_info)
+            res = await self.block_result(res)
+        return then(res, lambda res: batch.results(self.track_writes(ops, res)))
+
+    # query methods
+
+    async def read(self, key, proof = None):
+        if proof and self.options.get('rpc_endpoint', None):
+            return await self.proven_read(key)
+        url = self.read_url(key, proof)
+        generation = self.cache_generation()
+        value = MISS if proof else self.cache_get(CACHE_READ, key)
+        if value is MISS:
+            if not await self.key_filter_check(key):
+                raise APIError(KEY_NOT_FOUND)
+            value = self.cache_put(CACHE_READ, key, (await self.api_query(url))['result']['value'], generation)
+        return value
+
+    async def proven_read(self, key):
+        with self.span("read", {"proof": True}):
+            store_key = self.store_key(key)
+            res = (await self.rpc_query(self.abci_query_url(store_key)))['response']
+            height, root = Client.proven_store_root(res, store_key)
+            if not self.proofs.verified(height, CRUD_STORE, root):
+                self.verify_store_root(res, height, root, self.trusted_app_hash(height))
+            return Client.stored_value(res)
+
+    async def has(self, key):
+        url = self.has_url(key)
+        generation = self.cache_generation()
+        has = self.cache_get(CACHE_HAS, key)
+        if has is MISS:
+            if not await self.key_filter_check(key):
+                return False
+            has = self.cache_put(CACHE_HAS, key, (await self.api_query(url))['result']['has'], generation)
+        return has
+
+    async def count(self):
+        return int((await self.api_query(self.count_url()))['result']['count'])
+
+    async def keys(self):
+        return (await self.api_query(self.keys_url()))['result']['keys']
+
+    async def key_values(self):
+        return (await self.api_query(self.key_values_url()))['result']['keyvalues']
+
+    def iter_keys(self, limit = None):
+        Client.validate_limit(limit)
+        return self.api_query_stream(self.keys_url(), 'keys', limit)
+
+    def iter_key_values(self, limit = None):
+        Client.validate_limit(limit)
+        return self.api_query_stream(self.key_values_url(), 'keyvalues', limit)
+
+    async def read_many(self, keys, proof = None):
+        return await self.map_keys(lambda key: self.read(key, proof), keys)
+
+    async def has_many(self, keys):
+        return await self.map_keys(self.has, keys)
+
+    async def get_lease_many(self, keys):
+        return await self.map_keys(self.get_lease, keys)
+
+    async def get_lease(self, key):
+        url = self.get_lease_url(key)
+        generation = self.cache_generation()
+        lease = self.cache_get(CACHE_LEASE, key)
+        if lease is MISS:
+            lease = Client.lease_blocks_to_seconds(int((await self.api_query(url))['result']['lease']))
+            self.cache_put(CACHE_LEASE, key, lease, generation)
+        return lease
+
+    async def get_n_shortest_leases(self, n):
+        res = await self.api_query(self.get_n_shortest_leases_url(n))
+        return Client.key_leases_blocks_to_seconds(res['result']['keyleases'])
+
+    # query tx methods
+
+    async def tx_read(self, key, gas_info):
+        res = await self.send_transaction("post", "/crud/read", self.key_payload(key), gas_info)
+        return then(res, lambda res: res['value'])
+
+    async def tx_has(self, key, gas_info):
+        res = await self.send_transaction("post", "/crud/has", self.key_payload(key), gas_info)
+        return then(res, lambda res: res['has'])
+
+    async def tx_count(self, gas_info):
+        res = await self.send_transaction("post", "/crud/count", {}, gas_info)
+        return then(res, lambda res: int(res['count']))
+
+    async def tx_keys(self, gas_info):
+        res = await self.send_transaction("post", "/crud/keys", {}, gas_info)
+        return then(res, lambda res: res['keys'])
+
+    async def tx_key_values(self, gas_info):
+        res = await self.send_transaction("post", "/crud/keyvalues", {}, gas_info)
+        return then(res, lambda res: res['keyvalues'])
+
+    async def tx_get_lease(self, key, gas_info):
+        res = await self.send_transaction("post", "/crud/getlease", self.key_payload(key), gas_info)
+        return then(res, lambda res: Client.lease_blocks_to_seconds(int(res['lease'])))
+
+    async def tx_get_n_shortest_leases(self, n, gas_info):
+        res = await self.send_transaction("post", "/crud/getnshortestleases", self.n_payload(n), gas_info)
+        return then(res, lambda res: Client.key_leases_blocks_to_seconds(res['keyleases']))
+
+    # key filter
+
+    async def key_filter_check(self, key):
+        if self.key_filter == None:
+            return True
+        if self.key_filter.stale() and self.key_filter.begin_sync():
+            if self.key_filter.ready:
+                asyncio.ensure_future(self.sync_key_filter())
+            else:
+                await self.sync_key_filter()
+        return self.key_filter.might_contain(key)
+
+    async def sync_key_filter(self):
+        try:
+            keys = await self.keys()
+        except Exception as e:
+            self.logger.warning('key filter resync failed (%s)', e)
+            self.key_filter.fail_sync()
+            return
+        self.key_filter.finish_sync(keys)
+
+    # api
+
+    async def api_query(self, endpoint):
+        url = self.options['endpoint'] + endpoint
+        min_height = self.min_query_height(endpoint)
+        with self.span(Client.endpoint_method(endpoint)) as span:
+            try:
+                if not self.coalesces(endpoint):
+                    res = await self.fetch_query(endpoint, url)
+                else:
+                    res, shared = await self.flights.do(url, lambda: self.fetch_query(endpoint, url))
+                    if shared:
+                        self.record_coalesced(span, endpoint)
+            except APIError as e:
+                if min_height == 0:
+                    raise
+                res = e
+            if Client.is_behind(res, min_height):
+                res = await self.catch_up(span, endpoint, url, res, min_height)
+            return Client.answer(res)
+
+    async def catch_up(self, span, endpoint, url, res, min_height):
+        deadline = time.time() + self.options.get('consistency_timeout', DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS)
+        while True:
+            height = Client.answer_height(res)
+            if height == None:
+                height = await self.latest_height()
+                if height >= min_height:
+                    return await self.fetch_answer(endpoint, url)
+            elif height >= min_height:
+                return res
+            if time.time() > deadline:
+                raise APIError(NODE_BEHIND % (height, min_height))
+            self.record_behind(span, endpoint, height, min_height)
+            await asyncio.sleep(CONSISTENCY_POLL_INTERVAL_IN_SECONDS)
+            res = await self.fetch_answer(endpoint, url)
+
+    async def fetch_answer(self, endpoint, url):
+        try:
+            return await self.fetch_query(endpoint, url)
+        except APIError as e:
+            return e
+
+    async def wait_for_height(self, span, endpoint, min_height):
+        deadline = time.time() + self.options.get('consistency_timeout', DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS)
+        while True:
+            height = await self.latest_height()
+            if height >= min_height:
+                return
+            if time.time() > deadline:
+                raise APIError(NODE_BEHIND % (height, min_height))
+            self.record_behind(span, endpoint, height, min_height)
+            await asyncio.sleep(CONSISTENCY_POLL_INTERVAL_IN_SECONDS)
+
+    async def latest_height(self):
+        return Client.block_height(await self.fetch_query(LATEST_BLOCK_ENDPOINT, self.options['endpoint'] + LATEST_BLOCK_ENDPOINT))
+
+    async def rpc_query(self, endpoint):
+        url = self.options['rpc_endpoint'] + endpoint
+        with self.http_span("get", url) as span:
+            started_at = time.perf_counter()
+            response = await self.transport.request("get", url)
+            data = response.json()
+            error = Client.rpc_error(data, response)
+            self.record_request("query", endpoint, 0, self.response_size(response), started_at, error)
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return data['result']
+
+    async def fetch_query(self, endpoint, url):
+        with self.http_span("get", url) as span:
+            started_at = time.perf_counter()
+            response = await self.transport.request("get", url)
+            error = self.get_response_error(response)
+            self.record_request("query", endpoint, 0, self.response_size(response), started_at, error)
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return response.json()
+
+    # concurrent queries
+
+    async def map_keys(self, fn, keys):
+        semaphore = asyncio.Semaphore(self.options.get('concurrency', DEFAULT_CONCURRENCY))
+        async def call(key):
+            async with semaphore:
+                try:
+                    return await fn(key)
+                except Exception as e:
+                    return e
+        return await asyncio.gather(*[call(key) for key in keys])
+
+    async def api_query_stream(self, endpoint, name, limit = None):
+        url = self.options['endpoint'] + endpoint
+        min_height = self.min_query_height(endpoint)
+        span = self.span(Client.endpoint_method(endpoint), {"http.method": "get", "http.url": url})
+        started_at = time.perf_counter()
+        chunks = self.transport.stream("get", url)
+        parser = JSONArrayParser(name)
+        n = 0
+        received = 0
+        error = None
+        try:
+            if min_height > 0:
+                await self.wait_for_height(span, endpoint, min_height)
+            async for chunk in chunks:
+                received += len(chunk)
+                for item in parser.feed(chunk):
+                    if limit != None and n >= limit:
+                        return
+                    n += 1
+                    yield item
+            data = parser.close()
+            if data != None:
+                raise Client.api_error(data) or APIError(MALFORMED_STREAM, data)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            await chunks.aclose()
+            self.record_request("query", endpoint, 0, received, started_at)
+            span.set("http.received_bytes", received)
+            span.set("items", n)
+            span.finish(error)
+
+    async def api_mutate(self, method, endpoint, payload):
+        url = self.options['endpoint'] + endpoint
+        with self.http_span(method, url) as span:
+            payload = canonical_json(payload)
+            if span.capture_payloads:
+                span.set("http.request", payload.decode("utf-8"))
+            started_at = time.perf_counter()
+            response = await self.transport.request(
+                method,
+                url,
+                data=payload,
+                headers={"content-type": "application/json"}
+            )
+            error = self.get_response_error(response)
+            self.record_request("mutate", endpoint, len(payload), self.response_size(response), started_at, error)
+            span.set("http.sent_bytes", len(payload))
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return response.json()
+
+    async def send_transaction(self, method, endpoint, payload, gas_info):
+        with self.span(Client.endpoint_method(endpoint)):
+            self.record_transaction_call(endpoint)
+            txn = await self.build_transaction(method, endpoint, payload)
+            async with self.transaction_lock:
+                if self.account_stale:
+                    await self.set_account()
+                ops = [(endpoint, payload)]
+                self.track_writes(ops)
+                res = await self.broadcast_transaction(txn, gas_info)
+            res = await self.block_result(res)
+        return then(res, lambda res: self.track_writes(ops, res))
+
+    async def build_transaction(self, method, endpoint, payload, offline = False):
+        started_at = time.perf_counter()
+        if self.build_offline(endpoint, offline):
+            txn = self.offline_transaction(endpoint, payload)
+        else:
+            txn = await self.validate_transaction(method, endpoint, payload)
+        self.record_phase("validate", started_at)
+        return txn
+
+    async def validate_transaction(self, method, endpoint, payload):
+        txn = (await self.api_mutate(method, endpoint, self.transaction_payload(payload)))['value']
+        self.cache_gas(endpoint, txn)
+        return txn
+
+    async def broadcast_transaction(self, txn, gas_info):
+        retry = self.retry_policy.start()
+        while True:
+            payload = self.broadcast_payload(txn, gas_info)
+            started_at = time.perf_counter()
+            response = await self.api_mutate("post", TX_COMMAND, payload)
+            self.record_phase("broadcast", started_at)
+            self.record_broadcast(txn, response)
+            delay = self.broadcast_retry_delay(response, retry)
+            if delay != None:
+                await asyncio.sleep(delay)
+                if not self.recover_sequence(response):
+                    await self.set_account()
+                continue
+            self.learn_gas(txn['msg'], response)
+            if self.should_retry_out_of_gas(txn, response, gas_info, retry):
+                # the failed tx may have used up its sequence
+                await self.set_account()
+                continue
+            return self.parse_broadcast_response(response)
+
+    # pipelined block mode txs wait for their block once the transaction lock is released
+    async def block_result(self, res):
+        if self.pipelined():
+            return await res
+        return res
+
+    def response_size(self, response):
+        return len(response.content)
+
+    async def set_account(self):
+        self.bluzelle_account = await self.account()
+        self.account_stale = False
+
+    async def close(self):
+        if self.tracker != None:
+            self.tracker.close()
+        await self.transport.close()
+
+# initialize new async client with provided `options`, takes the same
+# options as `new_client` with `transport` being an `AsyncTransport`
+#   client = await new_async_client({...})
+async def new_async_client(options):
+    validate_options(options, AsyncTransport)
+
+    client = AsyncClient(options)
+    client.setup_logging()
+    client.set_private_key()
+    client.set_address()
+    await client.set_account()
+
+    return client
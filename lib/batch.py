@@ -0,0 +1,92 @@
+QUERY_RESULTS_MISMATCH = "expected %d query results in the transaction data, got %d"
+
+# collects heterogeneous crud operations and commits them as a single
+# signed transaction: one signature, one fee and one block for all of them
+#
+#   batch = client.batch()
+#   batch.create('a', '1').update('b', '2').tx_read('c')
+#   results = batch.commit(gas_info)  # [None, None, '<value of c>']
+#
+# the transaction is atomic, if any operation fails they all do
+class Batch:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+        # build the messages locally instead of asking the node, see `Client.offline_transaction`
+        self.offline = False
+
+    def __len__(self):
+        return len(self.ops)
+
+    def add(self, method, endpoint, payload, parse = None):
+        self.ops.append((method, endpoint, payload, parse))
+        return self
+
+    # mutate methods
+
+    def create(self, key, value, lease_info = None):
+        return self.add("post", "/crud/create", self.client.key_value_payload(key, value, lease_info))
+
+    def update(self, key, value, lease_info = None):
+        return self.add("post", "/crud/update", self.client.key_value_payload(key, value, lease_info))
+
+    def delete(self, key):
+        return self.add("delete", "/crud/delete", self.client.key_payload(key))
+
+    def rename(self, key, new_key):
+        return self.add("post", "/crud/rename", self.client.rename_payload(key, new_key))
+
+    def delete_all(self):
+        return self.add("post", "/crud/deleteall", {})
+
+    def multi_update(self, payload):
+        return self.add("post", "/crud/multiupdate", {"KeyValues": payload})
+
+    def renew_lease(self, key, lease_info = None):
+        return self.add("post", "/crud/renewlease", self.client.lease_payload(lease_info, self.client.key_payload(key)))
+
+    def renew_lease_all(self, lease_info = None):
+        return self.add("post", "/crud/renewleaseall", self.client.lease_payload(lease_info, {}))
+
+    # query tx methods
+
+    def tx_read(self, key):
+        return self.add("post", "/crud/read", self.client.key_payload(key), lambda res: res['value'])
+
+    def tx_has(self, key):
+        return self.add("post", "/crud/has", self.client.key_payload(key), lambda res: res['has'])
+
+    def tx_count(self):
+        return self.add("post", "/crud/count", {}, lambda res: int(res['count']))
+
+    def tx_keys(self):
+        return self.add("post", "/crud/keys", {}, lambda res: res['keys'])
+
+    def tx_key_values(self):
+        return self.add("post", "/crud/keyvalues", {}, lambda res: res['keyvalues'])
+
+    def tx_get_lease(self, key):
+        return self.add("post", "/crud/getlease", self.client.key_payload(key), lambda res: self.client.lease_blocks_to_seconds(int(res['lease'])))
+
+    def tx_get_n_shortest_leases(self, n):
+        return self.add("post", "/crud/getnshortestleases", self.client.n_payload(n), lambda res: self.client.key_leases_blocks_to_seconds(res['keyleases']))
+
+    #
+
+    def commit(self, gas_info):
+        return self.client.commit_batch(self, gas_info)
+
+    # map the decoded tx data back onto the operations, only query operations
+    # produce data and the chain concatenates it in message order
+    def results(self, data):
+        parsers = [parse for (_, _, _, parse) in self.ops if parse != None]
+        if data == None:
+            data = []
+        elif len(parsers) == 1 or type(data) is not list:
+            data = [data]
+        if len(data) != len(parsers):
+            # imported here, the client module imports this one
+            from .bluzelle import APIError
+            raise APIError(QUERY_RESULTS_MISMATCH % (len(parsers), len(data)), data)
+        data = iter(data)
+        return [parse(next(data)) if parse != None else None for (_, _, _, parse) in self.ops]
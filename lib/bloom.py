@@ -0,0 +1,133 @@
+import hashlib
+import math
+import threading
+import time
+
+DEFAULT_FP_RATE = 0.01
+DEFAULT_RESYNC_INTERVAL_IN_SECONDS = 60
+MIN_CAPACITY = 1024
+
+# plain bloom filter sized for `capacity` items at a `fp_rate` false positive
+# rate, using double hashing over a 128 bit blake2b digest
+class BloomFilter:
+    def __init__(self, capacity, fp_rate = DEFAULT_FP_RATE):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size = max(int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def indexes(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for i in self.indexes(key):
+            self.bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        for i in self.indexes(key):
+            if not self.bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+# local membership filter of the keys of a uuid. A negative answer means the
+# key definitely does not exist as far as this client can tell; keys written
+# by other clients only show up after the next resync.
+#
+# Loading keys is left to the client (sync or async), a resync is requested
+# with `begin_sync` and completed with `finish_sync(keys)`. The keys of writes
+# may not be in the loaded keys yet, e.g. when their tx lands after the node
+# answered: keys added since the previous resync began are carried over to the
+# new filter, as are those added while it is in flight.
+class KeyFilter:
+    def __init__(self, fp_rate = DEFAULT_FP_RATE, resync_interval = DEFAULT_RESYNC_INTERVAL_IN_SECONDS):
+        self.fp_rate = fp_rate
+        self.resync_interval = resync_interval
+        self.bloom = None
+        self.synced_at = 0
+        self.syncing = False
+        # keys added since the resync in flight began, and keys added before it
+        # that it carries over
+        self.added = []
+        self.carried = []
+        self.lock = threading.Lock()
+        self.checks = 0
+        self.negatives = 0
+        self.resyncs = 0
+
+    @property
+    def ready(self):
+        return self.bloom != None
+
+    def stale(self):
+        if self.bloom == None:
+            return True
+        if self.bloom.count > self.bloom.capacity:
+            return True
+        return time.time() - self.synced_at > self.resync_interval
+
+    # returns whether the caller should load the keys and call `finish_sync`
+    def begin_sync(self):
+        with self.lock:
+            if self.syncing:
+                return False
+            self.syncing = True
+            self.carried = self.added
+            self.added = []
+            return True
+
+    def finish_sync(self, keys):
+        bloom = BloomFilter(max(len(keys) * 2, MIN_CAPACITY), self.fp_rate)
+        for key in keys:
+            bloom.add(key)
+        with self.lock:
+            for key in self.carried + self.added:
+                bloom.add(key)
+            self.bloom = bloom
+            self.synced_at = time.time()
+            self.syncing = False
+            self.carried = []
+            self.resyncs += 1
+
+    def fail_sync(self):
+        with self.lock:
+            self.syncing = False
+            self.added = self.carried + self.added
+            self.carried = []
+
+    def might_contain(self, key):
+        with self.lock:
+            self.checks += 1
+            if self.bloom == None or key in self.bloom:
+                return True
+            self.negatives += 1
+            return False
+
+    def add(self, key):
+        with self.lock:
+            if self.bloom != None:
+                self.bloom.add(key)
+            self.added.append(key)
+
+    # every key is gone, e.g. after delete_all
+    def reset(self):
+        with self.lock:
+            if self.bloom != None:
+                self.bloom = BloomFilter(self.bloom.capacity, self.fp_rate)
+            self.added = []
+            self.carried = []
+
+    def stats(self):
+        with self.lock:
+            return {
+                "checks": self.checks,
+                "negatives": self.negatives,
+                "resyncs": self.resyncs,
+                "keys": self.bloom.count if self.bloom != None else 0,
+                "capacity": self.bloom.capacity if self.bloom != None else 0,
+            }
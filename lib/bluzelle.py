@@ -1,18 +1,32 @@
-import requests
 import json
 import base64
 import random
 import string
 import logging
 import time
-import hashlib
-import bech32
 import math
 import re
 import binascii
 import urllib.parse
-from .mnemonic_utils import mnemonic_to_private_key
-from ecdsa import SigningKey, SECP256k1
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from .identity import identity_cache
+from .transport import Transport, HTTPTransport, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT_IN_SECONDS
+from .batch import Batch
+from .bulk import BulkWriter, DEFAULT_BULK_MAX_BYTES
+from .gas import GasModel, DEFAULT_GAS_MARGIN
+from .retry import RetryPolicy
+from .metrics import Metrics
+from .canonical import canonical_json
+from .tracing import Tracer, LoggingExporter, NOOP_SPAN, current_span
+from .bloom import KeyFilter, DEFAULT_FP_RATE, DEFAULT_RESYNC_INTERVAL_IN_SECONDS
+from .cache import ReadCache, MISS, CACHE_READ, CACHE_HAS, CACHE_LEASE, DEFAULT_CACHE_TTL_IN_SECONDS
+from .tracker import TxTracker, then, TX_POLL_INTERVAL_SECONDS, TX_POLL_BATCH_SIZE, TX_CONFIRMATION_TIMEOUT_SECONDS
+from .signer import new_signer, SIGNERS, SIGNER_AUTO
+from .stream import JSONArrayParser, MALFORMED_STREAM
+from .singleflight import SingleFlight
+from .proof import VerifiedRoots, ProofError, verify_value_op, verify_multistore_op, decode_fields, field
 
 DEFAULT_ENDPOINT = "http://localhost:1317"
 DEFAULT_CHAIN_ID = "bluzelle"
@@ -21,9 +35,43 @@ ADDRESS_PREFIX = "bluzelle"
 TX_COMMAND = "/txs"
 TOKEN_NAME = "ubnt"
 PUB_KEY_TYPE = "tendermint/PubKeySecp256k1"
-BROADCAST_MAX_RETRIES = 10
-BROADCAST_RETRY_INTERVAL_SECONDS = 1
+OUT_OF_GAS_MAX_RETRIES = 2
+OUT_OF_GAS_RETRY_FACTOR = 2
 BLOCK_TIME_IN_SECONDS = 5
+BROADCAST_MODE_BLOCK = "block"
+BROADCAST_MODE_SYNC = "sync"
+BROADCAST_MODE_ASYNC = "async"
+BROADCAST_MODES = [BROADCAST_MODE_BLOCK, BROADCAST_MODE_SYNC, BROADCAST_MODE_ASYNC]
+DEFAULT_OFFLINE_GAS = 200000
+DEFAULT_CONCURRENCY = DEFAULT_POOL_SIZE
+CONSISTENCY_EVENTUAL = "eventual"
+CONSISTENCY_READ_YOUR_WRITES = "read_your_writes"
+CONSISTENCIES = [CONSISTENCY_EVENTUAL, CONSISTENCY_READ_YOUR_WRITES]
+DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS = 2 * BLOCK_TIME_IN_SECONDS
+CONSISTENCY_POLL_INTERVAL_IN_SECONDS = 0.1
+# iavl store of the crud module, proven reads query it through tendermint's rpc
+CRUD_STORE = "crud"
+CRUD_STORE_QUERY_PATH = '"/store/crud/key"'
+
+# tx builder endpoint => (msg type, zero valued msg fields besides UUID/Owner)
+# used to build transactions locally with the `offline_transactions` option
+CRUD_MSGS = {
+    "/crud/create": ("crud/create", {"Key": "", "Value": "", "Lease": "0"}),
+    "/crud/read": ("crud/read", {"Key": ""}),
+    "/crud/update": ("crud/update", {"Key": "", "Value": "", "Lease": "0"}),
+    "/crud/delete": ("crud/delete", {"Key": ""}),
+    "/crud/keys": ("crud/keys", {}),
+    "/crud/has": ("crud/has", {"Key": ""}),
+    "/crud/rename": ("crud/rename", {"Key": "", "NewKey": ""}),
+    "/crud/keyvalues": ("crud/keyvalues", {}),
+    "/crud/count": ("crud/count", {}),
+    "/crud/deleteall": ("crud/deleteall", {}),
+    "/crud/multiupdate": ("crud/multiupdate", {"KeyValues": []}),
+    "/crud/getlease": ("crud/getlease", {"Key": ""}),
+    "/crud/getnshortestleases": ("crud/getnshortestleases", {"N": "0"}),
+    "/crud/renewlease": ("crud/renewlease", {"Key": "", "Lease": "0"}),
+    "/crud/renewleaseall": ("crud/renewleaseall", {"Lease": "0"}),
+}
 
 KEY_MUST_BE_A_STRING = "Key must be a string"
 NEW_KEY_MUST_BE_A_STRING = "New key must be a string"
@@ -37,9 +85,52 @@ MNEMONIC_MUST_BE_A_STRING = "mnemonic must be a string"
 UUID_MUST_BE_A_STRING = "uuid must be a string"
 INVALID_TRANSACTION = "Invalid transaction."
 KEY_CANNOT_CONTAIN_A_SLASH = "Key cannot contain a slash"
+KEY_NOT_FOUND = "key not found"
+ENDPOINT_METHODS = {"auth": "account", "node_info": "version", "txs": "txs", "blocks": "latest_block"}
+LATEST_BLOCK_ENDPOINT = "/blocks/latest"
+EXPECTED_SEQUENCE_RE = re.compile(r'expected (\d+), got \d+')
+EMPTY_BATCH = "Batch has no operations"
+INVALID_PROOF = "invalid proof: %s"
+NODE_BEHIND = "node is at height %d, behind this client's last write at height %d"
+NO_TRUSTED_APP_HASH = "no trusted app hash at height %d"
 
 CHAIN_ID_MUST_BE_A_STRING = 'chain_id must be a string'
 ENDPOINT_MUST_BE_A_STRING = 'endpoint must be a string'
+HD_PATH_MUST_BE_A_STRING = 'hd_path must be a string'
+POOL_SIZE_MUST_BE_AN_INT = 'pool_size must be a positive int'
+CONCURRENCY_MUST_BE_AN_INT = 'concurrency must be a positive int'
+RETRY_POLICY_MUST_BE_A_RETRY_POLICY = 'retry_policy must be a RetryPolicy'
+METRICS_MUST_BE_METRICS = 'metrics must be a Metrics'
+TRACER_MUST_BE_A_TRACER = 'tracer must be a Tracer'
+GAS_MODEL_MUST_BE_A_BOOL = 'gas_model must be a bool'
+GAS_MARGIN_MUST_BE_A_NUMBER = 'gas_margin must be a positive number'
+TIMEOUT_MUST_BE_A_NUMBER = 'timeout must be a positive number'
+TRANSPORT_MUST_BE_A_TRANSPORT = 'transport must be a Transport'
+INVALID_BROADCAST_MODE = 'broadcast_mode must be one of %s' % ', '.join(BROADCAST_MODES)
+INVALID_CONSISTENCY = 'consistency must be one of %s' % ', '.join(CONSISTENCIES)
+CONSISTENCY_TIMEOUT_MUST_BE_A_NUMBER = 'consistency_timeout must be a positive number'
+CONFIRMATION_POLL_INTERVAL_MUST_BE_A_NUMBER = 'confirmation_poll_interval must be a positive number'
+CONFIRMATION_BATCH_SIZE_MUST_BE_AN_INT = 'confirmation_batch_size must be a positive int'
+CONFIRMATION_TIMEOUT_MUST_BE_A_NUMBER = 'confirmation_timeout must be a positive number'
+OFFLINE_TRANSACTIONS_MUST_BE_A_BOOL = 'offline_transactions must be a bool'
+OFFLINE_GAS_MUST_BE_AN_INT = 'offline_gas must be a positive int'
+CACHE_SIZE_MUST_BE_AN_INT = 'cache_size must be a positive int'
+CACHE_TTL_MUST_BE_A_NUMBER = 'cache_ttl must be a positive number'
+KEY_FILTER_MUST_BE_A_BOOL = 'key_filter must be a bool'
+KEY_FILTER_FP_RATE_MUST_BE_A_RATE = 'key_filter_fp_rate must be a number between 0 and 1'
+KEY_FILTER_RESYNC_INTERVAL_MUST_BE_A_NUMBER = 'key_filter_resync_interval must be a positive number'
+IDENTITY_CACHE_DIR_MUST_BE_A_STRING = 'identity_cache_dir must be a string'
+COALESCE_QUERIES_MUST_BE_A_BOOL = 'coalesce_queries must be a bool'
+PIPELINE_MUST_BE_A_BOOL = 'pipeline must be a bool'
+RPC_ENDPOINT_MUST_BE_A_STRING = 'rpc_endpoint must be a string'
+APP_HASH_SOURCE_MUST_BE_CALLABLE = 'app_hash_source must be callable'
+APP_HASH_SOURCE_REQUIRED = 'app_hash_source is required with rpc_endpoint'
+INVALID_SIGNER = 'signer must be one of %s' % ', '.join(SIGNERS)
+
+# the handler of the `bluzelle` logger, added once however many clients (pool
+# accounts included) a process makes so each line is printed once
+LOG_HANDLER = logging.StreamHandler()
+LOG_HANDLER.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 
 # client option validation error
 class OptionsError(Exception):
@@ -55,68 +146,96 @@ class APIError(Exception):
 class Client:
     def __init__(self, options):
         self.options = options
+        self.transport = options.get('transport') or self.new_transport()
+        self.tracker = None
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        # held from signing a tx until the node took or rejected it, so threads sharing
+        # the client use the account sequence one after the other
+        self.sequence_lock = threading.Lock()
+        self.account_stale = False
+        # height of the block holding this client's last successful write, queries wait
+        # for the node to reach it with the `read_your_writes` consistency
+        self.write_height = 0
+        self.write_height_lock = threading.Lock()
+        # client whose reads this client's writes must show up in, see `share_read_state`
+        self.reader = self
+        # endpoint => highest gas the node asked for, reused by offline transactions
+        self.gas_cache = {}
+        self.cache = None
+        if options.get('cache_size', None):
+            self.cache = ReadCache(
+                options['cache_size'],
+                ttl=options.get('cache_ttl', DEFAULT_CACHE_TTL_IN_SECONDS),
+                block_time=BLOCK_TIME_IN_SECONDS
+            )
+        self.retry_policy = options.get('retry_policy') or RetryPolicy()
+        self.metrics = options.get('metrics', None)
+        self.tracer = options.get('tracer', None)
+        self.gas_model = None
+        if options.get('gas_model', False):
+            self.gas_model = GasModel(margin=options.get('gas_margin', DEFAULT_GAS_MARGIN))
+        self.key_filter = None
+        if options.get('key_filter', False):
+            self.key_filter = KeyFilter(
+                fp_rate=options.get('key_filter_fp_rate', DEFAULT_FP_RATE),
+                resync_interval=options.get('key_filter_resync_interval', DEFAULT_RESYNC_INTERVAL_IN_SECONDS)
+            )
+        self.flights = None
+        if options.get('coalesce_queries', True):
+            self.flights = self.new_flights()
+        self.proofs = VerifiedRoots()
+
+    # let the writes of `clients` (e.g. the other accounts of a pool) show up in this client's
+    # reads: they share its read cache, key filter and coalesced flights, and raise the height
+    # its `read_your_writes` queries wait for
+    def share_read_state(self, clients):
+        for c in clients:
+            c.cache = self.cache
+            c.key_filter = self.key_filter
+            c.flights = self.flights
+            c.reader = self
+
+    def new_transport(self):
+        return HTTPTransport(
+            pool_size=self.options.get('pool_size', DEFAULT_POOL_SIZE),
+            timeout=self.options.get('timeout', DEFAULT_TIMEOUT_IN_SECONDS)
+        )
+
+    def new_flights(self):
+        return SingleFlight()
+
+    def new_tracker(self):
+        return TxTracker(
+            self,
+            poll_interval=self.options.get('confirmation_poll_interval', TX_POLL_INTERVAL_SECONDS),
+            batch_size=self.options.get('confirmation_batch_size', TX_POLL_BATCH_SIZE),
+            timeout=self.options.get('confirmation_timeout', TX_CONFIRMATION_TIMEOUT_SECONDS)
+        )
 
     #
 
     def account(self):
-        url = "/auth/accounts/%s" % self.address
-        return self.api_query(url)['result']['value']
+        return self.api_query(self.account_url())['result']['value']
 
     def version(self):
-        url = "/node_info"
-        return self.api_query(url)['application_version']['version']
+        return self.api_query(self.version_url())['application_version']['version']
 
     # mutate methods
 
     def create(self, key, value, gas_info, lease_info = None):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        if type(value) != str:
-            raise APIError(VALUE_MUST_BE_A_STRING)
-        payload = { "Key": key }
-        if lease_info != None:
-            lease = Client.lease_info_to_blocks(lease_info)
-            if lease < 0:
-                raise APIError(INVALID_LEASE_TIME)
-            payload["Lease"] = str(lease)
-        payload["Value"] = value
+        payload = self.key_value_payload(key, value, lease_info)
         return self.send_transaction("post", "/crud/create", payload, gas_info)
 
     def update(self, key, value, gas_info, lease_info = None):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        if type(value) != str:
-            raise APIError(VALUE_MUST_BE_A_STRING)
-        payload = { "Key": key }
-        if lease_info != None:
-            lease = Client.lease_info_to_blocks(lease_info)
-            if lease < 0:
-                raise APIError(INVALID_LEASE_TIME)
-            payload["Lease"] = str(lease)
-        payload["Value"] = value
+        payload = self.key_value_payload(key, value, lease_info)
         return self.send_transaction("post", "/crud/update", payload, gas_info)
 
     def delete(self, key, gas_info):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        return self.send_transaction("delete", "/crud/delete", {
-            "Key": key,
-        }, gas_info)
+        return self.send_transaction("delete", "/crud/delete", self.key_payload(key), gas_info)
 
     def rename(self, key, new_key, gas_info):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        if type(new_key) != str:
-            raise APIError(NEW_KEY_MUST_BE_A_STRING)
-        Client.validate_key(new_key)
-        return self.send_transaction("post", "/crud/rename", {
-            "Key": key,
-            "NewKey": new_key,
-        }, gas_info)
+        return self.send_transaction("post", "/crud/rename", self.rename_payload(key, new_key), gas_info)
 
     def delete_all(self, gas_info):
         return self.send_transaction("post", "/crud/deleteall", {}, gas_info)
@@ -125,167 +244,464 @@ class Client:
       return self.send_transaction("post", "/crud/multiupdate", {"KeyValues": payload}, gas_info)
 
     def renew_lease(self, key, gas_info, lease_info = None):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        payload = {
-            "Key": key,
-        }
-        if lease_info != None:
-            lease = Client.lease_info_to_blocks(lease_info)
-            if lease < 0:
-                raise APIError(INVALID_LEASE_TIME)
-            payload["Lease"] = str(lease)
+        payload = self.lease_payload(lease_info, self.key_payload(key))
         self.send_transaction("post", "/crud/renewlease", payload, gas_info)
 
     def renew_all_leases(self, *args, **kwargs):
         return self.renew_lease_all(*args, **kwargs)
 
     def renew_lease_all(self, gas_info, lease_info = None):
-        payload = {}
-        if lease_info != None:
-            lease = Client.lease_info_to_blocks(lease_info)
-            if lease < 0:
-                raise APIError(INVALID_LEASE_TIME)
-            payload["Lease"] = str(lease)
+        payload = self.lease_payload(lease_info, {})
         self.send_transaction("post", "/crud/renewleaseall", payload, gas_info)
 
+    # start collecting operations to commit as a single transaction
+    def batch(self):
+        return Batch(self)
+
+    # write many (key, value) pairs as a sequence of batch transactions, see `BulkWriter`
+    def bulk_write(self, items, gas_info, upsert = False, lease_info = None, max_bytes = DEFAULT_BULK_MAX_BYTES, max_gas = None, offline = True):
+        return BulkWriter(self, gas_info, upsert, lease_info, max_bytes, max_gas, offline).write(items)
+
+    def commit_batch(self, batch, gas_info):
+        if len(batch) == 0:
+            raise APIError(EMPTY_BATCH)
+        with self.span("batch", {"ops": len(batch)}):
+            self.record_transaction_call("/crud/batch")
+            txns = self.build_transactions([(method, endpoint, payload) for (method, endpoint, payload, _) in batch.ops], batch.offline)
+            ops = [(endpoint, payload) for (_, endpoint, payload, _) in batch.ops]
+            self.track_writes(ops)
+            res = self.broadcast_transaction(Client.merge_transactions(txns), gas_info)
+        return then(res, lambda res: batch.results(self.track_writes(ops, res)))
+
     # query methods
 
+    # with `proof`, the value is verified locally when `rpc_endpoint` is set, by the node's
+    # `pread` route otherwise
     def read(self, key, proof = None):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        key = Client.encode_safe(key)
-        if proof:
-            url = "/crud/pread/{uuid}/{key}".format(uuid=self.options["uuid"], key=key)
-        else:
-            url = "/crud/read/{uuid}/{key}".format(uuid=self.options["uuid"], key=key)
-        return self.api_query(url)['result']['value']
+        if proof and self.options.get('rpc_endpoint', None):
+            return self.proven_read(key)
+        url = self.read_url(key, proof)
+        generation = self.cache_generation()
+        value = MISS if proof else self.cache_get(CACHE_READ, key)
+        if value is MISS:
+            if not self.key_filter_check(key):
+                raise APIError(KEY_NOT_FOUND)
+            value = self.cache_put(CACHE_READ, key, self.api_query(url)['result']['value'], generation)
+        return value
+
+    # the value of `key` only once its proof checks out against a trusted app hash
+    def proven_read(self, key):
+        with self.span("read", {"proof": True}):
+            store_key = self.store_key(key)
+            res = self.rpc_query(self.abci_query_url(store_key))['response']
+            height, root = Client.proven_store_root(res, store_key)
+            if not self.proofs.verified(height, CRUD_STORE, root):
+                self.verify_store_root(res, height, root, self.trusted_app_hash(height))
+            return Client.stored_value(res)
+
+    # app hash proofs at `height` are checked against, from the `app_hash_source` option. The
+    # queried node's own headers are not trusted: their validator signatures are not checked
+    def trusted_app_hash(self, height):
+        app_hash = self.proofs.get(height)
+        if app_hash == None:
+            app_hash = self.options['app_hash_source'](height)
+        if not app_hash:
+            raise APIError(INVALID_PROOF % NO_TRUSTED_APP_HASH % height)
+        return app_hash
 
     def has(self, key):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        url = "/crud/has/{uuid}/{key}".format(uuid=self.options["uuid"], key=Client.encode_safe(key))
-        return self.api_query(url)['result']['has']
+        url = self.has_url(key)
+        generation = self.cache_generation()
+        has = self.cache_get(CACHE_HAS, key)
+        if has is MISS:
+            if not self.key_filter_check(key):
+                return False
+            has = self.cache_put(CACHE_HAS, key, self.api_query(url)['result']['has'], generation)
+        return has
 
     def count(self):
-        url = "/crud/count/{uuid}".format(uuid=self.options["uuid"])
-        return int(self.api_query(url)['result']['count'])
+        return int(self.api_query(self.count_url())['result']['count'])
 
     def keys(self):
-        url = "/crud/keys/{uuid}".format(uuid=self.options["uuid"])
-        return self.api_query(url)['result']['keys']
+        return self.api_query(self.keys_url())['result']['keys']
 
     def key_values(self):
-        url = "/crud/keyvalues/{uuid}".format(uuid=self.options["uuid"])
-        return self.api_query(url)['result']['keyvalues']
+        return self.api_query(self.key_values_url())['result']['keyvalues']
+
+    # same as `keys`/`key_values` but yields results as they download instead
+    # of holding the whole namespace in memory. The node has no paging, so
+    # `limit` stops reading (and drops the connection) after `limit` results.
+    def iter_keys(self, limit = None):
+        Client.validate_limit(limit)
+        return self.api_query_stream(self.keys_url(), 'keys', limit)
+
+    def iter_key_values(self, limit = None):
+        Client.validate_limit(limit)
+        return self.api_query_stream(self.key_values_url(), 'keyvalues', limit)
 
     def get_lease(self, key):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        url = "/crud/getlease/{uuid}/{key}".format(uuid=self.options["uuid"], key=Client.encode_safe(key))
-        return Client.lease_blocks_to_seconds(int(self.api_query(url)['result']['lease']))
+        url = self.get_lease_url(key)
+        generation = self.cache_generation()
+        lease = self.cache_get(CACHE_LEASE, key)
+        if lease is MISS:
+            lease = Client.lease_blocks_to_seconds(int(self.api_query(url)['result']['lease']))
+            self.cache_put(CACHE_LEASE, key, lease, generation)
+        return lease
+
+    # many keys at once, fanned out over `concurrency` threads. Results come
+    # in the order of `keys`, a key that failed holds its exception instead
+    def read_many(self, keys, proof = None):
+        return self.map_keys(lambda key: self.read(key, proof), keys)
+
+    def has_many(self, keys):
+        return self.map_keys(self.has, keys)
+
+    def get_lease_many(self, keys):
+        return self.map_keys(self.get_lease, keys)
 
     def get_n_shortest_leases(self, n):
-        if n < 0:
-            raise APIError(INVALID_VALUE_SPECIFIED)
-        url = "/crud/getnshortestleases/{uuid}/{n}".format(uuid=self.options["uuid"], n=str(n))
-        kls = self.api_query(url)['result']['keyleases']
-        for kl in kls:
-            kl["lease"] = Client.lease_blocks_to_seconds(int(kl["lease"]))
-        return kls
+        kls = self.api_query(self.get_n_shortest_leases_url(n))['result']['keyleases']
+        return Client.key_leases_blocks_to_seconds(kls)
 
     #query tx methods
     def tx_read(self, key, gas_info):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        res = self.send_transaction("post", "/crud/read", {
-            "Key": key,
-        }, gas_info)
-        return res['value']
+        res = self.send_transaction("post", "/crud/read", self.key_payload(key), gas_info)
+        return then(res, lambda res: res['value'])
 
     def tx_has(self, key, gas_info):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        res = self.send_transaction("post", "/crud/has", {
-            "Key": key,
-        }, gas_info)
-        return res['has']
+        res = self.send_transaction("post", "/crud/has", self.key_payload(key), gas_info)
+        return then(res, lambda res: res['has'])
 
     def tx_count(self, gas_info):
         res = self.send_transaction("post", "/crud/count", {}, gas_info)
-        return int(res['count'])
+        return then(res, lambda res: int(res['count']))
 
     def tx_keys(self, gas_info):
         res = self.send_transaction("post", "/crud/keys", {}, gas_info)
-        return res['keys']
+        return then(res, lambda res: res['keys'])
 
     def tx_key_values(self, gas_info):
         res = self.send_transaction("post", "/crud/keyvalues", {}, gas_info)
-        return res['keyvalues']
+        return then(res, lambda res: res['keyvalues'])
 
     def tx_get_lease(self, key, gas_info):
-        if type(key) != str:
-            raise APIError(KEY_MUST_BE_A_STRING)
-        Client.validate_key(key)
-        res = self.send_transaction("post", "/crud/getlease", {
-            "Key": key,
-        }, gas_info)
-        return Client.lease_blocks_to_seconds(int(res['lease']))
+        res = self.send_transaction("post", "/crud/getlease", self.key_payload(key), gas_info)
+        return then(res, lambda res: Client.lease_blocks_to_seconds(int(res['lease'])))
 
     def tx_get_n_shortest_leases(self, n, gas_info):
+        res = self.send_transaction("post", "/crud/getnshortestleases", self.n_payload(n), gas_info)
+        return then(res, lambda res: Client.key_leases_blocks_to_seconds(res['keyleases']))
+
+    # query urls, shared with the async client
+
+    def account_url(self):
+        return "/auth/accounts/%s" % self.address
+
+    def version_url(self):
+        return "/node_info"
+
+    def read_url(self, key, proof = None):
+        Client.validate_string_key(key)
+        key = Client.encode_safe(key)
+        if proof:
+            return "/crud/pread/{uuid}/{key}".format(uuid=self.options["uuid"], key=key)
+        return "/crud/read/{uuid}/{key}".format(uuid=self.options["uuid"], key=key)
+
+    # key of a uuid's key in the crud store
+    def store_key(self, key):
+        Client.validate_string_key(key)
+        return self.options["uuid"].encode("utf-8") + b"\x00" + key.encode("utf-8")
+
+    def abci_query_url(self, store_key):
+        return "/abci_query?path=%s&data=0x%s&prove=true" % (urllib.parse.quote(CRUD_STORE_QUERY_PATH), store_key.hex())
+
+    def has_url(self, key):
+        Client.validate_string_key(key)
+        return "/crud/has/{uuid}/{key}".format(uuid=self.options["uuid"], key=Client.encode_safe(key))
+
+    def count_url(self):
+        return "/crud/count/{uuid}".format(uuid=self.options["uuid"])
+
+    def keys_url(self):
+        return "/crud/keys/{uuid}".format(uuid=self.options["uuid"])
+
+    def key_values_url(self):
+        return "/crud/keyvalues/{uuid}".format(uuid=self.options["uuid"])
+
+    def get_lease_url(self, key):
+        Client.validate_string_key(key)
+        return "/crud/getlease/{uuid}/{key}".format(uuid=self.options["uuid"], key=Client.encode_safe(key))
+
+    def get_n_shortest_leases_url(self, n):
+        if n < 0:
+            raise APIError(INVALID_VALUE_SPECIFIED)
+        return "/crud/getnshortestleases/{uuid}/{n}".format(uuid=self.options["uuid"], n=str(n))
+
+    # transaction payloads, shared with the async client
+
+    @classmethod
+    def key_payload(cls, key):
+        Client.validate_string_key(key)
+        return {
+            "Key": key,
+        }
+
+    @classmethod
+    def key_value_payload(cls, key, value, lease_info = None):
+        Client.validate_string_key(key)
+        if type(value) != str:
+            raise APIError(VALUE_MUST_BE_A_STRING)
+        payload = { "Key": key }
+        Client.lease_payload(lease_info, payload)
+        payload["Value"] = value
+        return payload
+
+    @classmethod
+    def rename_payload(cls, key, new_key):
+        Client.validate_string_key(key)
+        if type(new_key) != str:
+            raise APIError(NEW_KEY_MUST_BE_A_STRING)
+        Client.validate_key(new_key)
+        return {
+            "Key": key,
+            "NewKey": new_key,
+        }
+
+    @classmethod
+    def lease_payload(cls, lease_info, payload):
+        if lease_info != None:
+            lease = Client.lease_info_to_blocks(lease_info)
+            if lease < 0:
+                raise APIError(INVALID_LEASE_TIME)
+            payload["Lease"] = str(lease)
+        return payload
+
+    @classmethod
+    def n_payload(cls, n):
         if n < 0:
             raise APIError(INVALID_VALUE_SPECIFIED)
-        res = self.send_transaction("post", "/crud/getnshortestleases", {
+        return {
             "N": str(n),
-        }, gas_info)
-        kls = res['keyleases']
-        for kl in kls:
-            kl["lease"] = Client.lease_blocks_to_seconds(int(kl["lease"]))
-        return kls
+        }
 
     # api
     def api_query(self, endpoint):
         url = self.options['endpoint'] + endpoint
-        self.logger.debug('querying url(%s)...' % (url))
-        response = requests.get(url)
-        error = self.get_response_error(response)
-        if error:
-            raise error
-        data = response.json()
-        self.logger.debug('response (%s)...' % (data))
-        return data
+        min_height = self.min_query_height(endpoint)
+        with self.span(Client.endpoint_method(endpoint)) as span:
+            try:
+                if not self.coalesces(endpoint):
+                    res = self.fetch_query(endpoint, url)
+                else:
+                    res, shared = self.flights.do(url, lambda: self.fetch_query(endpoint, url))
+                    if shared:
+                        self.record_coalesced(span, endpoint)
+            except APIError as e:
+                if min_height == 0:
+                    raise
+                res = e
+            if Client.is_behind(res, min_height):
+                res = self.catch_up(span, endpoint, url, res, min_height)
+            return Client.answer(res)
+
+    # re-query a node lagging behind this client's last write until it caught up,
+    # bypassing coalescing as flights in the air may be as stale. An answer without a
+    # height is asked again once the node's latest block reached `min_height`
+    def catch_up(self, span, endpoint, url, res, min_height):
+        deadline = time.time() + self.options.get('consistency_timeout', DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS)
+        while True:
+            height = Client.answer_height(res)
+            if height == None:
+                height = self.latest_height()
+                if height >= min_height:
+                    return self.fetch_answer(endpoint, url)
+            elif height >= min_height:
+                return res
+            if time.time() > deadline:
+                raise APIError(NODE_BEHIND % (height, min_height))
+            self.record_behind(span, endpoint, height, min_height)
+            time.sleep(CONSISTENCY_POLL_INTERVAL_IN_SECONDS)
+            res = self.fetch_answer(endpoint, url)
+
+    # the response of a query or the APIError it failed with
+    def fetch_answer(self, endpoint, url):
+        try:
+            return self.fetch_query(endpoint, url)
+        except APIError as e:
+            return e
+
+    # a stream's height comes with its last byte, too late to query again. Streams start
+    # once the node's latest block reached `min_height` instead
+    def wait_for_height(self, span, endpoint, min_height):
+        deadline = time.time() + self.options.get('consistency_timeout', DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS)
+        while True:
+            height = self.latest_height()
+            if height >= min_height:
+                return
+            if time.time() > deadline:
+                raise APIError(NODE_BEHIND % (height, min_height))
+            self.record_behind(span, endpoint, height, min_height)
+            time.sleep(CONSISTENCY_POLL_INTERVAL_IN_SECONDS)
+
+    def latest_height(self):
+        return Client.block_height(self.fetch_query(LATEST_BLOCK_ENDPOINT, self.options['endpoint'] + LATEST_BLOCK_ENDPOINT))
+
+    # tendermint rpc queries, their result or error is wrapped in a json-rpc response
+    def rpc_query(self, endpoint):
+        url = self.options['rpc_endpoint'] + endpoint
+        with self.http_span("get", url) as span:
+            started_at = time.perf_counter()
+            response = self.transport.request("get", url)
+            data = response.json()
+            error = Client.rpc_error(data, response)
+            self.record_request("query", endpoint, 0, self.response_size(response), started_at, error)
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return data['result']
+
+    def fetch_query(self, endpoint, url):
+        with self.http_span("get", url) as span:
+            started_at = time.perf_counter()
+            response = self.transport.request("get", url)
+            error = self.get_response_error(response)
+            self.record_request("query", endpoint, 0, self.response_size(response), started_at, error)
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return response.json()
+
+    # the span of a stream is not made active, it would leak into the caller between items
+    def api_query_stream(self, endpoint, name, limit = None):
+        url = self.options['endpoint'] + endpoint
+        min_height = self.min_query_height(endpoint)
+        span = self.span(Client.endpoint_method(endpoint), {"http.method": "get", "http.url": url})
+        started_at = time.perf_counter()
+        chunks = self.transport.stream("get", url)
+        parser = JSONArrayParser(name)
+        n = 0
+        received = 0
+        error = None
+        try:
+            if min_height > 0:
+                self.wait_for_height(span, endpoint, min_height)
+            for chunk in chunks:
+                received += len(chunk)
+                for item in parser.feed(chunk):
+                    if limit != None and n >= limit:
+                        return
+                    n += 1
+                    yield item
+            data = parser.close()
+            if data != None:
+                raise Client.api_error(data) or APIError(MALFORMED_STREAM, data)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            chunks.close()
+            self.record_request("query", endpoint, 0, received, started_at)
+            span.set("http.received_bytes", received)
+            span.set("items", n)
+            span.finish(error)
 
     def api_mutate(self, method, endpoint, payload):
         url = self.options['endpoint'] + endpoint
-        self.logger.debug('mutating url({url}), method({method})...'.format(url=url, method=method))
-        payload = self.json_dumps(payload)
-        self.logger.debug("%s" % payload)
-        response = getattr(requests, method)(
-            url,
-            data=payload,
-            headers={"content-type": "application/json"},
-            verify=False
-        )
-        self.logger.debug("%s" % response.text)
-        error = self.get_response_error(response)
-        if error:
-            raise error
-        data = response.json()
-        self.logger.debug('response (%s)...' % (data))
-        return data
+        with self.http_span(method, url) as span:
+            payload = canonical_json(payload)
+            if span.capture_payloads:
+                span.set("http.request", payload.decode("utf-8"))
+            started_at = time.perf_counter()
+            response = self.transport.request(
+                method,
+                url,
+                data=payload,
+                headers={"content-type": "application/json"}
+            )
+            error = self.get_response_error(response)
+            self.record_request("mutate", endpoint, len(payload), self.response_size(response), started_at, error)
+            span.set("http.sent_bytes", len(payload))
+            self.trace_response(span, response)
+            if error:
+                raise error
+            return response.json()
 
     def send_transaction(self, method, endpoint, payload, gas_info):
-        self.broadcast_retries = 0
-        txn = self.validate_transaction(method, endpoint, payload)
-        return self.broadcast_transaction(txn, gas_info)
+        with self.span(Client.endpoint_method(endpoint)):
+            self.record_transaction_call(endpoint)
+            txn = self.build_transaction(method, endpoint, payload)
+            ops = [(endpoint, payload)]
+            self.track_writes(ops)
+            res = self.broadcast_transaction(txn, gas_info)
+        return then(res, lambda res: self.track_writes(ops, res))
+
+    def build_transaction(self, method, endpoint, payload, offline = False):
+        started_at = time.perf_counter()
+        if self.build_offline(endpoint, offline):
+            txn = self.offline_transaction(endpoint, payload)
+        else:
+            txn = self.validate_transaction(method, endpoint, payload)
+        self.record_phase("validate", started_at)
+        return txn
+
+    # unsigned txs of many [(method, endpoint, payload)] ops, in order. Those the node
+    # builds are asked for `concurrency` at a time, under the caller's span
+    def build_transactions(self, ops, offline = False):
+        if len(ops) == 1 or all(self.build_offline(endpoint, offline) for (_, endpoint, _) in ops):
+            return [self.build_transaction(method, endpoint, payload, offline) for (method, endpoint, payload) in ops]
+        executor = self.get_executor()
+        futures = [executor.submit(contextvars.copy_context().run, self.build_transaction, *op, offline) for op in ops]
+        return [f.result() for f in futures]
 
     def validate_transaction(self, method, endpoint, payload):
+        txn = self.api_mutate(method, endpoint, self.transaction_payload(payload))['value']
+        self.cache_gas(endpoint, txn)
+        return txn
+
+    # txs are signed and sent one at a time, in sequence order. Pipelined block mode txs
+    # wait for their block after releasing the lock, so the next tx can go out meanwhile
+    def broadcast_transaction(self, txn, gas_info):
+        retry = self.retry_policy.start()
+        with self.sequence_lock:
+            if self.account_stale:
+                self.set_account()
+            res = self.broadcast_in_sequence(txn, gas_info, retry)
+        if self.pipelined():
+            return res.result()
+        return res
+
+    def broadcast_in_sequence(self, txn, gas_info, retry):
+        while True:
+            payload = self.broadcast_payload(txn, gas_info)
+            started_at = time.perf_counter()
+            response = self.api_mutate("post", TX_COMMAND, payload)
+            self.record_phase("broadcast", started_at)
+            self.record_broadcast(txn, response)
+            delay = self.broadcast_retry_delay(response, retry)
+            if delay != None:
+                time.sleep(delay)
+                if not self.recover_sequence(response):
+                    self.set_account()
+                continue
+            self.learn_gas(txn['msg'], response)
+            if self.should_retry_out_of_gas(txn, response, gas_info, retry):
+                # the failed tx may have used up its sequence
+                self.set_account()
+                continue
+            return self.parse_broadcast_response(response)
+
+    # block mode with the `pipeline` option: txs are broadcast in sync mode and tracked
+    def pipelined(self):
+        return self.options.get('pipeline', False) and self.options.get('broadcast_mode', BROADCAST_MODE_BLOCK) == BROADCAST_MODE_BLOCK
+
+    def broadcast_mode(self):
+        if self.pipelined():
+            return BROADCAST_MODE_SYNC
+        return self.options.get('broadcast_mode', BROADCAST_MODE_BLOCK)
+
+    # transaction steps that do no io, shared with the async client
+
+    def transaction_payload(self, payload):
         payload.update({
             "BaseReq": {
                 "chain_id": self.options['chain_id'],
@@ -294,9 +710,46 @@ class Client:
             "Owner": self.address,
             "UUID": self.options['uuid'],
         })
-        return self.api_mutate(method, endpoint, payload)['value']
+        return payload
+
+    # skip the node's tx builder when asked to (by the option or the caller, e.g. bulk
+    # writes) or when the gas model can size the tx
+    def build_offline(self, endpoint, offline = False):
+        if not (endpoint in CRUD_MSGS):
+            return False
+        if offline or self.options.get('offline_transactions', False):
+            return True
+        return self.gas_model != None and self.gas_model.ready(CRUD_MSGS[endpoint][0])
+
+    # the unsigned tx the node's tx builder endpoint would return, without asking it
+    def offline_transaction(self, endpoint, payload):
+        msg_type, fields = CRUD_MSGS[endpoint]
+        value = dict(fields)
+        value.update(payload)
+        value["UUID"] = self.options['uuid']
+        value["Owner"] = self.address
+        gas = self.estimate_gas(endpoint, payload)
+        return {
+            "msg": [{"type": msg_type, "value": value}],
+            "fee": {"amount": [], "gas": str(gas)},
+            "signatures": None,
+            "memo": "",
+        }
 
-    def broadcast_transaction(self, txn, gas_info):
+    # gas a single `endpoint` message is expected to use
+    def estimate_gas(self, endpoint, payload):
+        if self.gas_model != None and endpoint in CRUD_MSGS:
+            gas = self.gas_model.predict(CRUD_MSGS[endpoint][0], payload)
+            if gas != None:
+                return gas
+        return self.gas_cache.get(endpoint, self.options.get('offline_gas', DEFAULT_OFFLINE_GAS))
+
+    def cache_gas(self, endpoint, txn):
+        gas = int(txn['fee']['gas'])
+        if gas > self.gas_cache.get(endpoint, 0):
+            self.gas_cache[endpoint] = gas
+
+    def broadcast_payload(self, txn, gas_info):
         # set txn memo
         txn['memo'] = Client.make_random_string(32)
 
@@ -309,16 +762,7 @@ class Client:
         if len(fee.get('amount', [])) > 0:
             amount = int(fee['amount'][0]['amount'])
 
-        max_gas = gas_info.get('max_gas', 0)
-        max_fee = gas_info.get('max_fee', 0)
-        gas_price = gas_info.get('gas_price', 0)
-
-        if max_gas != 0 and gas > max_gas:
-            gas = max_gas
-        if max_fee != 0:
-            amount = max_fee
-        elif gas_price != 0:
-            amount = gas * gas_price
+        gas, amount = Client.apply_gas_info(gas, amount, gas_info)
 
         txn['fee'] = {
             'gas': str(gas),
@@ -326,7 +770,6 @@ class Client:
         }
 
         # sign
-        self.logger.warning( self.get_pub_key_string())
         txn['signatures'] = [{
             "pub_key": {
                 "type": PUB_KEY_TYPE,
@@ -338,16 +781,79 @@ class Client:
         }]
 
         # broadcast
-        payload = {
+        return {
             "tx": txn,
-            "mode": "block"
+            "mode": self.broadcast_mode()
         }
-        response = self.api_mutate(
-            "post",
-            TX_COMMAND,
-            payload
-        )
 
+    # seconds to wait before resending a tx the node rejected for its sequence,
+    # None for any other response
+    def broadcast_retry_delay(self, response, retry):
+        if not Client.is_sequence_error(response):
+            return None
+        delay = retry.next_delay()
+        self.record_retry("sequence", delay)
+        if delay == None:
+            raise APIError("transaction failed after max retry attempts", response)
+        self.logger.warning("transaction failed ... retrying(%i) in %.2fs ...", retry.attempts, delay)
+        current_span().event("sequence_retry", attempt=retry.attempts, delay=delay)
+        return delay
+
+    # take the sequence from the node's error when it has one, saving the account query
+    def recover_sequence(self, response):
+        sequence = Client.expected_sequence(response)
+        self.retry_policy.record_recovery(sequence != None)
+        if sequence == None:
+            return False
+        self.bluzelle_account['sequence'] = sequence
+        self.account_stale = False
+        return True
+
+    @classmethod
+    def is_sequence_error(cls, response):
+        if not ('code' in response):
+            return False
+        raw_log = response.get('raw_log', '')
+        return "signature verification failed" in raw_log or "account sequence" in raw_log
+
+    # newer nodes say e.g. `account sequence mismatch, expected 7, got 5: incorrect account sequence`
+    @classmethod
+    def expected_sequence(cls, response):
+        m = EXPECTED_SEQUENCE_RE.search(response.get('raw_log', ''))
+        if m == None:
+            return None
+        return int(m.group(1))
+
+    # included single message txs teach the gas model, out of gas ones widen its margin
+    def learn_gas(self, msgs, response):
+        if self.gas_model == None:
+            return
+        if Client.is_out_of_gas(response):
+            for msg in msgs:
+                self.gas_model.miss(msg['type'])
+        elif len(msgs) == 1 and not ('code' in response) and int(response.get('gas_used', 0)) > 0:
+            self.gas_model.observe(msgs[0]['type'], msgs[0]['value'], int(response['gas_used']))
+
+    # resend out of gas txs with more gas, unless `max_gas` doesn't allow for it
+    def should_retry_out_of_gas(self, txn, response, gas_info, retry):
+        if self.gas_model == None or not Client.is_out_of_gas(response):
+            return False
+        gas = int(txn['fee']['gas'])
+        more_gas, _ = Client.apply_gas_info(gas * OUT_OF_GAS_RETRY_FACTOR, 0, gas_info)
+        if retry.gas_attempts >= OUT_OF_GAS_MAX_RETRIES or more_gas <= gas:
+            return False
+        retry.gas_attempts += 1
+        self.record_retry("out_of_gas", 0)
+        self.logger.warning("transaction ran out of gas (%i) ... retrying with %i ...", gas, more_gas)
+        current_span().event("out_of_gas_retry", gas=gas, more_gas=more_gas)
+        txn['fee']['gas'] = str(more_gas)
+        return True
+
+    @classmethod
+    def is_out_of_gas(cls, response):
+        return 'code' in response and (response['code'] == 11 or "out of gas" in response.get('raw_log', ''))
+
+    def parse_broadcast_response(self, response):
         # https://github.com/bluzelle/blzjs/blob/45fe51f6364439fa88421987b833102cc9bcd7c0/src/swarmClient/cosmos.js#L240-L246
         # note - as of right now (3/6/20) the responses returned by the Cosmos REST interface now look like this:
         # success case: {"height":"0","txhash":"3F596D7E83D514A103792C930D9B4ED8DCF03B4C8FD93873AB22F0A707D88A9F","raw_log":"[]"}
@@ -355,24 +861,80 @@ class Client:
         #  "raw_log":"unauthorized: signature verification failed; verify correct account sequence and chain-id"}
         #
         # this is far from ideal, doesn't match their docs, and is probably going to change (again) in the future.
+        #
+        # in sync and async modes the response only carries the txhash, the sequence is advanced locally
+        # and the result is resolved later on by the tracker polling `/txs/{hash}`
         if not ('code' in response):
             self.bluzelle_account['sequence'] += 1
-            if 'data' in response:
-                return json.loads(bytes.fromhex(response['data']).decode("ascii"))
+            if self.broadcast_mode() != BROADCAST_MODE_BLOCK:
+                return self.track_transaction(response['txhash'])
+            self.record_write_height(response)
+            return Client.decode_transaction_data(response)
+
+        raise APIError(response['raw_log'], response)
+
+    def track_transaction(self, txhash):
+        if self.tracker == None:
+            self.tracker = self.new_tracker()
+        return self.tracker.track(txhash)
+
+    # called by the tracker once `/txs/{hash}` returns the included tx
+    def resolve_transaction(self, future, response):
+        self.learn_gas(response.get('tx', {}).get('value', {}).get('msg', []), response)
+        self.record_phase("block_wait", future.created_at)
+        self.record_gas_used(response)
+        if future.done():
             return
-
-        raw_log = response['raw_log']
-        if "signature verification failed" in raw_log:
-            self.broadcast_retries += 1
-            self.logger.warning("transaction failed ... retrying(%i) ...", self.broadcast_retries)
-            if self.broadcast_retries >= BROADCAST_MAX_RETRIES:
-                raise APIError("transaction failed after max retry attempts", response)
-            time.sleep(BROADCAST_RETRY_INTERVAL_SECONDS)
-            # lookup changed sequence
-            self.set_account()
-            return self.broadcast_transaction(txn, gas_info)
-
-        raise APIError(raw_log, response)
+        if 'code' in response:
+            future.set_exception(APIError(response['raw_log'], response))
+        else:
+            self.record_write_height(response)
+            future.set_result(Client.decode_transaction_data(response))
+
+    # called by the tracker when a tx never showed up in a block, it most likely was dropped
+    # from the mempool so the local sequence is ahead of the chain
+    def lose_transaction(self, future, timeout):
+        self.account_stale = True
+        if not future.done():
+            future.set_exception(APIError("transaction %s not included after %ss" % (future.txhash, timeout)))
+
+    # multi message transactions concatenate the data of every message, a list of
+    # results is returned then
+    @classmethod
+    def decode_transaction_data(cls, response):
+        if 'data' in response:
+            data = bytes.fromhex(response['data']).decode("ascii")
+            decoder = json.JSONDecoder()
+            results = []
+            i = 0
+            while i < len(data):
+                result, i = decoder.raw_decode(data, i)
+                results.append(result)
+            if len(results) == 1:
+                return results[0]
+            return results
+
+    # merge unsigned transactions into one carrying all of their messages
+    # and paying for the sum of their gas. Each was sized on its own, per tx
+    # overhead included, so the sum over-estimates the merged tx by that
+    # overhead for all but one of them
+    @classmethod
+    def merge_transactions(cls, txns):
+        txn = txns[0]
+        gas = 0
+        amount = 0
+        msgs = []
+        for t in txns:
+            gas += int(t['fee']['gas'])
+            for a in t['fee'].get('amount') or []:
+                amount += int(a['amount'])
+            msgs.extend(t['msg'])
+        txn['msg'] = msgs
+        txn['fee'] = {
+            'gas': str(gas),
+            'amount': [{ 'denom': TOKEN_NAME, 'amount': str(amount)}] if amount else []
+        }
+        return txn
 
     def sign_transaction(self, txn):
         payload = {
@@ -383,33 +945,327 @@ class Client:
             "msgs": txn["msg"],
             "sequence": str(self.bluzelle_account['sequence']),
         }
-        payload = Client.sanitize_string(self.json_dumps(payload))
-        self.logger.debug("sign %s" % payload)
-        payload = bytes(payload, 'utf-8')
-        return base64.b64encode(self.private_key.sign_deterministic(payload, hashfunc=hashlib.sha256)).decode("utf-8")
+        started_at = time.perf_counter()
+        with self.span("sign") as span:
+            payload = canonical_json(payload)
+            if span.capture_payloads:
+                span.set("pub_key", self.get_pub_key_string())
+                span.set("sign_bytes", payload.decode("utf-8"))
+            signature = base64.b64encode(self.signer.sign(payload)).decode("utf-8")
+        self.record_phase("sign", started_at)
+        return signature
 
     def set_account(self):
         self.bluzelle_account = self.account()
+        self.account_stale = False
+
+    # read cache, shared with the async client
+
+    def cache_get(self, kind, key):
+        if self.cache == None:
+            return MISS
+        return self.cache.get(kind, key)
+
+    # taken before a query, so `cache_put` drops its result if one of this client's
+    # writes invalidated the key meanwhile
+    def cache_generation(self):
+        if self.cache == None:
+            return None
+        return self.cache.generation()
+
+    def cache_put(self, kind, key, value, generation = None):
+        if self.cache != None:
+            self.cache.put(kind, key, value, generation)
+        return value
+
+    # keep the read cache and key filter in line with this client's own writes, called around
+    # the broadcast so reads racing the block are dropped too. Returns `res` to chain on tx results.
+    def track_writes(self, ops, res = None):
+        if self.flights != None:
+            self.flights.forget()
+        if self.key_filter != None:
+            for (endpoint, payload) in ops:
+                if endpoint == "/crud/deleteall":
+                    self.key_filter.reset()
+                elif endpoint in ["/crud/create", "/crud/update", "/crud/rename", "/crud/multiupdate"]:
+                    keys = [payload.get("NewKey", payload.get("Key"))]
+                    keys.extend(kv['key'] for kv in payload.get("KeyValues", []))
+                    for key in keys:
+                        if key != None:
+                            self.key_filter.add(key)
+        if self.cache == None:
+            return res
+        for (endpoint, payload) in ops:
+            if endpoint in ["/crud/deleteall", "/crud/renewleaseall"]:
+                self.cache.clear()
+                continue
+            keys = [payload[k] for k in ["Key", "NewKey"] if k in payload]
+            keys.extend(kv['key'] for kv in payload.get("KeyValues", []))
+            for key in keys:
+                self.cache.invalidate(key)
+            if "Lease" in payload and "Key" in payload and int(payload["Lease"]) > 0:
+                self.cache.set_lease(payload["Key"], Client.lease_blocks_to_seconds(int(payload["Lease"])))
+        return res
+
+    # key filter
+
+    # returns False when the key definitely does not exist. The filter is seeded from `keys()`
+    # on first use, later resyncs run in the background while the old filter keeps answering
+    def key_filter_check(self, key):
+        if self.key_filter == None:
+            return True
+        if self.key_filter.stale() and self.key_filter.begin_sync():
+            if self.key_filter.ready:
+                threading.Thread(target=self.sync_key_filter, name='bluzelle-key-filter', daemon=True).start()
+            else:
+                self.sync_key_filter()
+        return self.key_filter.might_contain(key)
+
+    def sync_key_filter(self):
+        try:
+            keys = self.keys()
+        except Exception as e:
+            self.logger.warning('key filter resync failed (%s)', e)
+            self.key_filter.fail_sync()
+            return
+        self.key_filter.finish_sync(keys)
+
+    # concurrent queries
+
+    def map_keys(self, fn, keys):
+        def call(key):
+            try:
+                return fn(key)
+            except Exception as e:
+                return e
+        return list(self.get_executor().map(call, keys))
+
+    def get_executor(self):
+        with self.executor_lock:
+            if self.executor == None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.options.get('concurrency', DEFAULT_CONCURRENCY),
+                    thread_name_prefix='bluzelle-query'
+                )
+            return self.executor
+
+    def key_filter_stats(self):
+        if self.key_filter == None:
+            return None
+        return self.key_filter.stats()
+
+    def gas_model_stats(self):
+        if self.gas_model == None:
+            return None
+        return self.gas_model.stats()
+
+    # metrics, shared with the async client. Phases of a write are `validate` (building the
+    # tx, by the node unless offline), `sign`, `broadcast` (the `/txs` request, which includes
+    # the block wait in block mode), `retry_wait` (backing off before resending a tx rejected
+    # over its sequence) and `block_wait` (until the tracker saw the tx in a block)
+
+    def record_phase(self, phase, started_at):
+        if self.metrics != None:
+            self.metrics.observe("phase_seconds", time.perf_counter() - started_at, {"phase": phase})
+
+    # a resent tx, `delay` is the backoff before it and None when the tx was given up on
+    def record_retry(self, reason, delay):
+        if self.metrics == None:
+            return
+        if delay == None:
+            self.metrics.inc("tx_retries_exhausted_total", 1, {"reason": reason})
+            return
+        self.metrics.inc("tx_retries_total", 1, {"reason": reason})
+        if delay > 0:
+            self.metrics.observe("phase_seconds", delay, {"phase": "retry_wait"})
 
-    def get_response_error(self, response):
-        jsonError = response.json()
-        error = jsonError.get('error', '')
+    def record_request(self, kind, endpoint, sent_bytes, received_bytes, started_at, error = None):
+        if self.metrics == None:
+            return
+        labels = {"kind": kind, "method": Client.endpoint_method(endpoint)}
+        self.metrics.inc("requests_total", 1, labels)
+        self.metrics.observe("request_seconds", time.perf_counter() - started_at, labels)
         if error:
-            return APIError(error, jsonError, response)
+            self.metrics.inc("request_errors_total", 1, labels)
+        self.metrics.inc("sent_bytes_total", sent_bytes)
+        self.metrics.inc("received_bytes_total", received_bytes)
+
+    # queries are coalesced on their full url, only reads of the crud module are: account
+    # and tx queries follow the sequence
+    def coalesces(self, endpoint):
+        return self.flights != None and endpoint.startswith("/crud/")
+
+    def record_coalesced(self, span, endpoint):
+        span.set("coalesced", True)
+        if self.metrics != None:
+            self.metrics.inc("coalesced_queries_total", 1, {"method": Client.endpoint_method(endpoint)})
+
+    # with the `read_your_writes` consistency `/crud` queries must see the state at or after
+    # this client's last write, account and tx queries need not
+    def min_query_height(self, endpoint):
+        if self.options.get('consistency', CONSISTENCY_EVENTUAL) != CONSISTENCY_READ_YOUR_WRITES or not endpoint.startswith("/crud/"):
+            return 0
+        return self.write_height
+
+    # query responses carry the height they were answered at. Answers without one, errors
+    # such as "key not found" included, may be as stale
+    @classmethod
+    def is_behind(cls, res, min_height):
+        if min_height == 0:
+            return False
+        height = Client.answer_height(res)
+        return height == None or height < min_height
 
-    def get_pub_key_string(self):
-        return base64.b64encode(self.private_key.verifying_key.to_string("compressed")).decode("utf-8")
+    @classmethod
+    def answer_height(cls, res):
+        if type(res) is dict and 'height' in res:
+            return int(res['height'])
+        return None
 
-    def json_dumps(self, payload):
-        return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    @classmethod
+    def answer(cls, res):
+        if isinstance(res, APIError):
+            raise res
+        return res
 
     @classmethod
-    def sanitize_string(cls, s):
-        return re.sub(r"([&<>])", Client.sanitize_string_token, s)
+    def block_height(cls, res):
+        return int(res['block']['header']['height'])
+
+    def record_write_height(self, response):
+        height = int(response.get('height', 0))
+        reader = self.reader
+        with reader.write_height_lock:
+            reader.write_height = max(reader.write_height, height)
+
+    def record_behind(self, span, endpoint, height, min_height):
+        span.event("node_behind", height=height, min_height=min_height)
+        if self.metrics != None:
+            self.metrics.inc("behind_queries_total", 1, {"method": Client.endpoint_method(endpoint)})
+
+    def record_transaction_call(self, endpoint):
+        if self.metrics != None:
+            self.metrics.inc("transactions_total", 1, {"method": Client.endpoint_method(endpoint)})
+
+    # the fee is paid once the node accepts a tx, gas used is known once it is in a block
+    def record_broadcast(self, txn, response):
+        if self.metrics == None:
+            return
+        if 'code' in response:
+            self.metrics.inc("transaction_errors_total", 1, {"code": response['code']})
+            return
+        for a in txn['fee'].get('amount') or []:
+            self.metrics.inc("fee_paid_total", int(a['amount']), {"denom": a['denom']})
+        # the tracker records it in sync/async modes
+        if self.broadcast_mode() == BROADCAST_MODE_BLOCK:
+            self.record_gas_used(response)
+
+    def record_gas_used(self, response):
+        if self.metrics != None and int(response.get('gas_used', 0)) > 0:
+            self.metrics.inc("gas_used_total", int(response['gas_used']))
+
+    def response_size(self, response):
+        return len(response.content)
 
+    # proofs, shared with the async client. A proof at height h is of the state after
+    # block h
+
+    # height of an `abci_query` response and root of the crud store its proof leads to,
+    # raises unless the proof holds the returned value at `store_key`
+    @classmethod
+    def proven_store_root(cls, response, store_key):
+        if not response.get('value', None):
+            raise APIError(KEY_NOT_FOUND)
+        ops = (response.get('proof', None) or {}).get('ops', None) or []
+        if len(ops) != 2:
+            raise APIError(INVALID_PROOF % "expected 2 proof ops, got %d" % len(ops), response)
+        try:
+            return int(response['height']), verify_value_op(ops[0], store_key, base64.b64decode(response['value']))
+        except ProofError as e:
+            raise APIError(INVALID_PROOF % e, response)
+
+    def verify_store_root(self, response, height, root, app_hash):
+        try:
+            verify_multistore_op(response['proof']['ops'][1], CRUD_STORE, root, app_hash)
+        except ProofError as e:
+            raise APIError(INVALID_PROOF % e, response)
+        self.proofs.add(height, app_hash, CRUD_STORE, root)
+
+    # the crud module keeps values amino encoded, the value string first
     @classmethod
-    def sanitize_string_token(cls, m):
-        return u"\\u00" + binascii.hexlify(m.group(0).encode('ascii')).decode()
+    def stored_value(cls, response):
+        return field(decode_fields(base64.b64decode(response['value'])), 1, b"").decode("utf-8")
+
+    @classmethod
+    def rpc_error(cls, data, response = None):
+        error = data.get('error', None)
+        if error:
+            return APIError(error.get('data', None) or error.get('message', ''), data, response)
+
+    def proof_stats(self):
+        return self.proofs.stats()
+
+    # tracing, shared with the async client. Each client call gets a span named after its
+    # method (`read`, `create`, `batch`...) with a child `http` span per request it makes
+
+    def span(self, name, attributes = None):
+        if self.tracer == None:
+            return NOOP_SPAN
+        return self.tracer.span(name, attributes)
+
+    def http_span(self, method, url):
+        if self.tracer == None:
+            return NOOP_SPAN
+        return self.tracer.span("http", {"http.method": method, "http.url": url})
+
+    def trace_response(self, span, response):
+        if span.recording:
+            span.set("http.received_bytes", self.response_size(response))
+            if span.capture_payloads:
+                span.set("http.response", response.text)
+
+    # `read` for /crud/read/{uuid}/{key}, `create` for /crud/create, `account` for /auth/accounts/...
+    @classmethod
+    def endpoint_method(cls, endpoint):
+        parts = endpoint.split('?')[0].split('/')
+        if len(parts) > 2 and parts[1] == 'crud':
+            return parts[2]
+        return ENDPOINT_METHODS.get(parts[1], parts[1])
+
+    def retry_stats(self):
+        return self.retry_policy.stats()
+
+    def coalesce_stats(self):
+        if self.flights == None:
+            return None
+        return self.flights.stats()
+
+    def cache_stats(self):
+        if self.cache == None:
+            return None
+        return self.cache.stats()
+
+    def transport_stats(self):
+        return self.transport.stats()
+
+    def close(self):
+        if self.tracker != None:
+            self.tracker.close()
+        if self.executor != None:
+            self.executor.shutdown(wait=False)
+        self.transport.close()
+
+    def get_response_error(self, response):
+        return Client.api_error(response.json(), response)
+
+    @classmethod
+    def api_error(cls, jsonError, response = None):
+        error = jsonError.get('error', '')
+        if error:
+            return APIError(error, jsonError, response)
+
+    def get_pub_key_string(self):
+        return self.signer.pub_key_string
 
     @classmethod
     def encode_safe(cls, s):
@@ -428,31 +1284,30 @@ class Client:
     def setup_logging(self):
         logger = logging.getLogger('bluzelle')
         logger.setLevel(logging.DEBUG)
-        ch = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
+        # a no-op when the handler is already there
+        logger.addHandler(LOG_HANDLER)
         logger.disabled = not self.options['debug']
         self.logger = logger
+        # debug output is a trace of every call
+        if self.tracer == None and self.options['debug']:
+            self.tracer = Tracer(capture_payloads=True, exporter=LoggingExporter(logger))
 
+    # keys and address come from the process wide identity cache, see `IdentityCache`
     def set_private_key(self):
-        self.private_key = SigningKey.from_string(
-            mnemonic_to_private_key(self.options['mnemonic'], str_derivation_path=HD_PATH),
-            curve=SECP256k1
+        self.identity = identity_cache.load(
+            self.options['mnemonic'],
+            self.options.get('hd_path', HD_PATH),
+            ADDRESS_PREFIX,
+            self.options.get('identity_cache_dir', None)
+        )
+        self.signer = new_signer(
+            self.identity.private_key,
+            self.identity.public_key,
+            self.options.get('signer', SIGNER_AUTO)
         )
 
     def set_address(self):
-        pk = self.private_key.verifying_key.to_string("compressed")
-
-        h = hashlib.new('sha256')
-        h.update(pk)
-        s = h.digest()
-
-        h = hashlib.new('ripemd160')
-        h.update(s)
-        r = h.digest()
-
-        self.address = bech32.bech32_encode(ADDRESS_PREFIX, bech32.convertbits(r, 8, 5, True))
+        self.address = self.identity.address
 
     @classmethod
     def lease_info_to_blocks(cls, lease_info):
@@ -489,6 +1344,27 @@ class Client:
     def lease_blocks_to_seconds(cls, blocks):
         return blocks * BLOCK_TIME_IN_SECONDS
 
+    @classmethod
+    def key_leases_blocks_to_seconds(cls, kls):
+        for kl in kls:
+            kl["lease"] = Client.lease_blocks_to_seconds(int(kl["lease"]))
+        return kls
+
+    # the (gas, fee amount) a tx asking for `gas` and `amount` is sent with
+    @classmethod
+    def apply_gas_info(cls, gas, amount, gas_info):
+        max_gas = gas_info.get('max_gas', 0)
+        max_fee = gas_info.get('max_fee', 0)
+        gas_price = gas_info.get('gas_price', 0)
+
+        if max_gas != 0 and gas > max_gas:
+            gas = max_gas
+        if max_fee != 0:
+            amount = max_fee
+        elif gas_price != 0:
+            amount = gas * gas_price
+        return gas, amount
+
     @classmethod
     def validate_gas_info(cls, gas_info):
         if gas_info == None:
@@ -514,27 +1390,168 @@ class Client:
             raise OptionsError('%s is required' % option_name)
         options[option_name] = val
 
+    @classmethod
+    def validate_number_option(cls, options, option_name, err_msg, default, types = (int,)):
+        val = options.get(option_name, None)
+        if val == None:
+            val = default
+        if type(val) not in types or val <= 0:
+            raise OptionsError(err_msg)
+        options[option_name] = val
+
     @classmethod
     def validate_key(cls, key):
         if '/' in key:
             raise OptionsError(KEY_CANNOT_CONTAIN_A_SLASH)
+
+    @classmethod
+    def validate_limit(cls, limit):
+        if limit != None and (type(limit) != int or limit < 0):
+            raise APIError(INVALID_VALUE_SPECIFIED)
+
+    @classmethod
+    def validate_string_key(cls, key):
+        if type(key) != str:
+            raise APIError(KEY_MUST_BE_A_STRING)
+        Client.validate_key(key)
     
+# validate `options` in place, shared by `new_client` and `new_async_client`
+def validate_options(options, transport_class = Transport):
+    if not ('debug' in options):
+        options['debug'] = False
+    Client.validate_option(options, 'mnemonic', MNEMONIC_MUST_BE_A_STRING)
+    Client.validate_option(options, 'uuid', UUID_MUST_BE_A_STRING)
+    Client.validate_option(options, 'chain_id', CHAIN_ID_MUST_BE_A_STRING, DEFAULT_CHAIN_ID)
+    Client.validate_option(options, 'endpoint', ENDPOINT_MUST_BE_A_STRING, DEFAULT_ENDPOINT)
+    Client.validate_option(options, 'hd_path', HD_PATH_MUST_BE_A_STRING, HD_PATH)
+    Client.validate_number_option(options, 'pool_size', POOL_SIZE_MUST_BE_AN_INT, DEFAULT_POOL_SIZE)
+    Client.validate_number_option(options, 'concurrency', CONCURRENCY_MUST_BE_AN_INT, DEFAULT_CONCURRENCY)
+    Client.validate_number_option(options, 'timeout', TIMEOUT_MUST_BE_A_NUMBER, DEFAULT_TIMEOUT_IN_SECONDS, (int, float))
+    if options.get('transport', None) != None and not isinstance(options['transport'], transport_class):
+        raise OptionsError(TRANSPORT_MUST_BE_A_TRANSPORT)
+    if not ('broadcast_mode' in options):
+        options['broadcast_mode'] = BROADCAST_MODE_BLOCK
+    if options['broadcast_mode'] not in BROADCAST_MODES:
+        raise OptionsError(INVALID_BROADCAST_MODE)
+    if not ('consistency' in options):
+        options['consistency'] = CONSISTENCY_EVENTUAL
+    if options['consistency'] not in CONSISTENCIES:
+        raise OptionsError(INVALID_CONSISTENCY)
+    Client.validate_number_option(options, 'consistency_timeout', CONSISTENCY_TIMEOUT_MUST_BE_A_NUMBER, DEFAULT_CONSISTENCY_TIMEOUT_IN_SECONDS, (int, float))
+    if options.get('rpc_endpoint', None) != None and type(options['rpc_endpoint']) != str:
+        raise OptionsError(RPC_ENDPOINT_MUST_BE_A_STRING)
+    if options.get('app_hash_source', None) != None and not callable(options['app_hash_source']):
+        raise OptionsError(APP_HASH_SOURCE_MUST_BE_CALLABLE)
+    if options.get('rpc_endpoint', None) and options.get('app_hash_source', None) == None:
+        raise OptionsError(APP_HASH_SOURCE_REQUIRED)
+    if not ('pipeline' in options):
+        options['pipeline'] = False
+    if type(options['pipeline']) is not bool:
+        raise OptionsError(PIPELINE_MUST_BE_A_BOOL)
+    Client.validate_number_option(options, 'confirmation_poll_interval', CONFIRMATION_POLL_INTERVAL_MUST_BE_A_NUMBER, TX_POLL_INTERVAL_SECONDS, (int, float))
+    Client.validate_number_option(options, 'confirmation_batch_size', CONFIRMATION_BATCH_SIZE_MUST_BE_AN_INT, TX_POLL_BATCH_SIZE)
+    Client.validate_number_option(options, 'confirmation_timeout', CONFIRMATION_TIMEOUT_MUST_BE_A_NUMBER, TX_CONFIRMATION_TIMEOUT_SECONDS, (int, float))
+    if not ('offline_transactions' in options):
+        options['offline_transactions'] = False
+    if type(options['offline_transactions']) is not bool:
+        raise OptionsError(OFFLINE_TRANSACTIONS_MUST_BE_A_BOOL)
+    Client.validate_number_option(options, 'offline_gas', OFFLINE_GAS_MUST_BE_AN_INT, DEFAULT_OFFLINE_GAS)
+    if options.get('cache_size', None) != None:
+        Client.validate_number_option(options, 'cache_size', CACHE_SIZE_MUST_BE_AN_INT, 0)
+    Client.validate_number_option(options, 'cache_ttl', CACHE_TTL_MUST_BE_A_NUMBER, DEFAULT_CACHE_TTL_IN_SECONDS, (int, float))
+    if options.get('retry_policy', None) != None and not isinstance(options['retry_policy'], RetryPolicy):
+        raise OptionsError(RETRY_POLICY_MUST_BE_A_RETRY_POLICY)
+    if options.get('metrics', None) != None and not isinstance(options['metrics'], Metrics):
+        raise OptionsError(METRICS_MUST_BE_METRICS)
+    if options.get('tracer', None) != None and not isinstance(options['tracer'], Tracer):
+        raise OptionsError(TRACER_MUST_BE_A_TRACER)
+    if not ('gas_model' in options):
+        options['gas_model'] = False
+    if type(options['gas_model']) is not bool:
+        raise OptionsError(GAS_MODEL_MUST_BE_A_BOOL)
+    Client.validate_number_option(options, 'gas_margin', GAS_MARGIN_MUST_BE_A_NUMBER, DEFAULT_GAS_MARGIN, (int, float))
+    if not ('key_filter' in options):
+        options['key_filter'] = False
+    if type(options['key_filter']) is not bool:
+        raise OptionsError(KEY_FILTER_MUST_BE_A_BOOL)
+    Client.validate_number_option(options, 'key_filter_fp_rate', KEY_FILTER_FP_RATE_MUST_BE_A_RATE, DEFAULT_FP_RATE, (int, float))
+    if options['key_filter_fp_rate'] >= 1:
+        raise OptionsError(KEY_FILTER_FP_RATE_MUST_BE_A_RATE)
+    if options.get('identity_cache_dir', None) != None and type(options['identity_cache_dir']) != str:
+        raise OptionsError(IDENTITY_CACHE_DIR_MUST_BE_A_STRING)
+    if not ('signer' in options):
+        options['signer'] = SIGNER_AUTO
+    if options['signer'] not in SIGNERS:
+        raise OptionsError(INVALID_SIGNER)
+    Client.validate_number_option(options, 'key_filter_resync_interval', KEY_FILTER_RESYNC_INTERVAL_MUST_BE_A_NUMBER, DEFAULT_RESYNC_INTERVAL_IN_SECONDS, (int, float))
+    if not ('coalesce_queries' in options):
+        options['coalesce_queries'] = True
+    if type(options['coalesce_queries']) is not bool:
+        raise OptionsError(COALESCE_QUERIES_MUST_BE_A_BOOL)
+
 # initialize new client with provided `options`
 # @param options
 #   @required mnemonic
 #   @optional chain_id
 #   @optional endpoint
+#   @optional hd_path key derivation path, defaults to the first cosmos account
 #   @optional gas_info
 #   @optional debug
+#   @optional pool_size kept-alive connections per endpoint
+#   @optional concurrency max queries in flight for `read_many`, `has_many` and `get_lease_many`,
+#       defaults to `pool_size` connections
+#   @optional timeout http request timeout in seconds
+#   @optional transport custom `Transport` (pool_size and timeout are then ignored)
+#   @optional broadcast_mode `block` (default) waits for the block and returns the tx result,
+#       `sync`/`async` return a `TxFuture` right away resolved once the tx is in a block
+#   @optional pipeline in block mode, send txs in sync mode and wait for their block after
+#       releasing the account sequence, so threads sharing the client get their txs into the
+#       same block instead of one per block
+#   @optional confirmation_poll_interval seconds between `/txs/{hash}` polls in sync/async modes
+#   @optional confirmation_batch_size max hashes checked per poll
+#   @optional confirmation_timeout seconds after which an unconfirmed tx is failed
+#   @optional offline_transactions build transactions locally instead of asking the node's
+#       tx builder endpoints, saving a round trip per write
+#   @optional offline_gas gas per message of offline transactions, until the node has
+#       reported the gas for that kind of message
+#   @optional retry_policy `RetryPolicy` for txs rejected over their sequence: backoff, max retries
+#       and deadline. Its `stats()` (also `client.retry_stats()`) count retries and time waited
+#   @optional metrics `Metrics` hook receiving per phase latencies, per method request counts,
+#       bytes sent and received, gas used and fees paid, e.g. a `MetricsRegistry`
+#   @optional tracer `Tracer` recording a span per client call with a child span per http
+#       request, for a `sample_rate` fraction of calls. Off (and free) unless set; `debug`
+#       logs a trace of every call, payloads included
+#   @optional gas_model learn the gas used per kind of message from included txs and, once
+#       sized, build txs locally with the predicted gas instead of having the node simulate
+#       them. Out of gas txs are resent with more gas (within `max_gas`)
+#   @optional gas_margin extra gas on top of predictions, as a fraction (0.2 is 20%)
+#   @optional cache_size max cached read/has/get_lease results, caching is off unless set.
+#       Entries are dropped by this client's own writes, not by writes of other clients
+#   @optional cache_ttl seconds a cached result is served for, capped by the key's lease
+#   @optional key_filter answer `has`/`read` of keys that definitely do not exist locally from a
+#       bloom filter seeded from `keys()` and kept current by this client's own writes
+#   @optional key_filter_fp_rate false positive rate the filter is sized for
+#   @optional key_filter_resync_interval seconds between resyncs picking up other clients' keys
+#   @optional identity_cache_dir directory to keep derived keys in, encrypted, so new processes
+#       skip the mnemonic derivation (keys are always cached per process). Needs the
+#       `cryptography` package (`bluzelle[identity_cache]`), without it nothing is written
+#   @optional signer signing backend, `secp256k1` (libsecp256k1 via coincurve), `ecdsa`
+#       (pure python) or `auto` (default, secp256k1 when installed)
+#   @optional rpc_endpoint tendermint rpc endpoint (port 26657), `read(key, proof=True)` queries
+#       values with their merkle proof there and verifies them locally instead of through the
+#       node's `pread` route
+#   @optional app_hash_source `fn(height)` returning the trusted app hash of the state at
+#       `height` (e.g. from a light client), required with `rpc_endpoint`
+#   @optional coalesce_queries concurrent identical `/crud` queries share one request (default),
+#       each caller getting its own copy of the result, dropped on this client's own writes.
+#       `coalesce_stats()` counts the deduplicated calls
+#   @optional consistency `eventual` (default) or `read_your_writes`: `/crud` queries (`read`, `has`,
+#       `keys`, `count`, `key_values`, ...) then reflect this client's successful writes, waiting for a
+#       lagging node to reach the height of the last one, instead of needing `tx_read` and friends
+#   @optional consistency_timeout seconds a `read_your_writes` query waits for a lagging node
 def new_client(options):
     # validate options
-
-    if not ('debug' in options):
-        options['debug'] = False
-    Client.validate_option(options, 'mnemonic', MNEMONIC_MUST_BE_A_STRING)
-    Client.validate_option(options, 'uuid', UUID_MUST_BE_A_STRING)
-    Client.validate_option(options, 'chain_id', CHAIN_ID_MUST_BE_A_STRING, DEFAULT_CHAIN_ID)
-    Client.validate_option(options, 'endpoint', ENDPOINT_MUST_BE_A_STRING, DEFAULT_ENDPOINT)
+    validate_options(options)
 
     client = Client(options)
 
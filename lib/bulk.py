@@ -0,0 +1,144 @@
+import time
+import asyncio
+from concurrent.futures import Future, wait
+from .canonical import canonical_json
+
+DEFAULT_BULK_MAX_BYTES = 512 * 1024
+DEFAULT_BULK_MAX_GAS = 10000000
+# json of the msg envelope around each payload: type, UUID and Owner fields
+MSG_OVERHEAD_BYTES = 64
+
+# writes an iterable of (key, value) pairs as a sequence of batch
+# transactions, each kept under `max_bytes` of messages and `max_gas`
+# estimated gas (the gas_info `max_gas` when set), so any number of rows can
+# be loaded without picking batch sizes by hand
+#
+#   report = client.bulk_write(rows, gas_info, upsert=True)
+#   # [{'keys': 120, 'bytes': 501234, 'estimated_gas': 9600000, 'max_fee': 2000, 'seconds': 5.2, 'result': ...}, ...]
+#
+# `estimated_gas` and `max_fee` are what the chunk was sized and priced from,
+# the gas actually used is in the tx result (and the `gas_used_total` metric)
+#
+# chunks are built locally from the same gas estimates unless `offline` is
+# False, then the node builds every item's message (concurrently, see
+# `Client.build_transactions`) and checks it on the way
+#
+# keys are created, or with `upsert` updated when they already exist. Chunks
+# are committed one after the other as the items are read; in sync/async
+# broadcast modes `result` is the chunk's `TxFuture` and the next chunk is
+# sent without waiting for the block, unless it writes keys of earlier chunks.
+class BulkWriter:
+    def __init__(self, client, gas_info, upsert = False, lease_info = None, max_bytes = DEFAULT_BULK_MAX_BYTES, max_gas = None, offline = True):
+        self.client = client
+        self.offline = offline
+        self.gas_info = client.validate_gas_info(gas_info)
+        self.upsert = upsert
+        self.lease_info = lease_info
+        self.max_bytes = max_bytes
+        self.max_gas = max_gas or gas_info.get('max_gas', 0) or DEFAULT_BULK_MAX_GAS
+
+    def write(self, items):
+        reports = []
+        for (chunk, repeated) in self.chunks(items):
+            if repeated:
+                BulkWriter.wait_landed(reports)
+            reports.append(self.commit(chunk, repeated))
+        return reports
+
+    # (list of (key, payload, bytes, gas), keys of the list written by an earlier
+    # chunk), a single item over the limits still goes out on its own. Keys of
+    # earlier chunks are updated even when `has_many` ran before those landed
+    def chunks(self, items):
+        chunk = []
+        size = 0
+        gas = 0
+        written = set()
+        overhead = MSG_OVERHEAD_BYTES + len(self.client.options['uuid']) + len(self.client.address)
+        for (key, value) in items:
+            payload = self.client.key_value_payload(key, value, self.lease_info)
+            item_size = len(canonical_json(payload)) + overhead
+            item_gas = self.client.estimate_gas("/crud/create", payload)
+            if chunk and (size + item_size > self.max_bytes or gas + item_gas > self.max_gas):
+                yield BulkWriter.repeated_keys(chunk, written)
+                chunk = []
+                size = 0
+                gas = 0
+            chunk.append((key, payload, item_size, item_gas))
+            size += item_size
+            gas += item_gas
+        if chunk:
+            yield BulkWriter.repeated_keys(chunk, written)
+
+    # in sync/async modes, wait for the blocks of the chunks in `reports`: the
+    # node only builds updates of keys it has
+    @classmethod
+    def wait_landed(cls, reports):
+        wait([r['result'] for r in reports if isinstance(r['result'], Future)])
+
+    @classmethod
+    def repeated_keys(cls, chunk, written):
+        keys = [key for (key, _, _, _) in chunk]
+        repeated = written.intersection(keys)
+        written.update(keys)
+        return chunk, repeated
+
+    def new_batch(self, chunk, existing):
+        batch = self.client.batch()
+        batch.offline = self.offline
+        for (key, payload, _, _) in chunk:
+            # a key repeated within the chunk exists by the time it comes again
+            batch.add("post", "/crud/update" if key in existing else "/crud/create", payload)
+            existing.add(key)
+        return batch
+
+    def commit(self, chunk, repeated = ()):
+        existing = set(repeated)
+        if self.upsert:
+            existing |= BulkWriter.existing_keys(chunk, self.client.has_many([key for (key, _, _, _) in chunk]))
+        started_at = time.time()
+        result = self.commit_batch(self.new_batch(chunk, existing))
+        return self.report(chunk, result, started_at)
+
+    def commit_batch(self, batch):
+        return self.client.commit_batch(batch, self.gas_info)
+
+    def report(self, chunk, result, started_at):
+        gas = sum(item_gas for (_, _, _, item_gas) in chunk)
+        gas, fee = self.client.apply_gas_info(gas, 0, self.gas_info)
+        return {
+            "keys": len(chunk),
+            "bytes": sum(item_size for (_, _, item_size, _) in chunk),
+            "estimated_gas": gas,
+            "max_fee": fee,
+            "seconds": time.time() - started_at,
+            "result": result,
+        }
+
+    @classmethod
+    def existing_keys(cls, chunk, has):
+        existing = set()
+        for ((key, _, _, _), h) in zip(chunk, has):
+            if isinstance(h, Exception):
+                raise h
+            if h:
+                existing.add(key)
+        return existing
+
+# `BulkWriter` for the async client
+class AsyncBulkWriter(BulkWriter):
+    async def write(self, items):
+        reports = []
+        for (chunk, repeated) in self.chunks(items):
+            pending = [r['result'] for r in reports if isinstance(r['result'], asyncio.Future)]
+            if repeated and pending:
+                await asyncio.wait(pending)
+            reports.append(await self.commit(chunk, repeated))
+        return reports
+
+    async def commit(self, chunk, repeated = ()):
+        existing = set(repeated)
+        if self.upsert:
+            existing |= BulkWriter.existing_keys(chunk, await self.client.has_many([key for (key, _, _, _) in chunk]))
+        started_at = time.time()
+        result = await self.client.commit_batch(self.new_batch(chunk, existing), self.gas_info)
+        return self.report(chunk, result, started_at)
@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_READ = "read"
+CACHE_HAS = "has"
+CACHE_LEASE = "lease"
+DEFAULT_CACHE_TTL_IN_SECONDS = 5
+
+# returned by `ReadCache.get` when nothing usable is cached
+MISS = object()
+
+# bounded LRU cache of query results with a ttl per entry. Entries never
+# outlive the lease of their key when it is known, either from a `get_lease`
+# result or from a lease this client set itself.
+#
+# `lease` entries hold the absolute expiry time and are returned as the
+# seconds left, rounded up to whole blocks of `block_time` seconds so a fresh
+# entry reads back as what the node said.
+#
+# A query racing this client's own write can finish after the write
+# invalidated its key. Callers take a `generation` before querying and pass it
+# to `put`, which drops the result if the key was invalidated since. The last
+# `max_size` invalidations are remembered per key, older ones only as a floor.
+class ReadCache:
+    def __init__(self, max_size, ttl = DEFAULT_CACHE_TTL_IN_SECONDS, block_time = 1):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.block_time = block_time
+        self.entries = OrderedDict()
+        self.leases = {}
+        self.counter = 0
+        self.invalidated = OrderedDict()
+        self.floor = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, kind, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get((kind, key), None)
+            if entry == None:
+                self.misses += 1
+                return MISS
+            value, expires_at = entry
+            if expires_at <= now:
+                del self.entries[(kind, key)]
+                self.misses += 1
+                return MISS
+            self.entries.move_to_end((kind, key))
+            self.hits += 1
+        if kind == CACHE_LEASE:
+            return int(math.ceil((value - now) / self.block_time)) * self.block_time
+        return value
+
+    # token to pass to `put` for a query started now
+    def generation(self):
+        with self.lock:
+            return self.counter
+
+    def put(self, kind, key, value, generation = None):
+        now = time.time()
+        expires_at = now + self.ttl
+        stored = value
+        with self.lock:
+            if generation != None and (generation < self.floor or self.invalidated.get(key, 0) > generation):
+                return value
+            if kind == CACHE_LEASE:
+                stored = now + value
+                self.leases[key] = stored
+            lease_expires_at = self.leases.get(key, None)
+            if lease_expires_at != None and lease_expires_at < expires_at:
+                expires_at = lease_expires_at
+            self.entries[(kind, key)] = (stored, expires_at)
+            self.entries.move_to_end((kind, key))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    # record a lease set by this client, in seconds from now
+    def set_lease(self, key, seconds):
+        with self.lock:
+            self.leases[key] = time.time() + seconds
+
+    def invalidate(self, key):
+        with self.lock:
+            self.counter += 1
+            self.invalidated[key] = self.counter
+            self.invalidated.move_to_end(key)
+            while len(self.invalidated) > self.max_size:
+                _, invalidated_at = self.invalidated.popitem(last=False)
+                self.floor = max(self.floor, invalidated_at)
+            for kind in [CACHE_READ, CACHE_HAS, CACHE_LEASE]:
+                if self.entries.pop((kind, key), None) != None:
+                    self.invalidations += 1
+            self.leases.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.counter += 1
+            self.floor = self.counter
+            self.invalidated.clear()
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.leases.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
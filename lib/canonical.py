@@ -0,0 +1,45 @@
+import re
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND_ORJSON = "orjson"
+JSON_BACKEND_JSON = "json"
+JSON_BACKEND = JSON_BACKEND_ORJSON if orjson != None else JSON_BACKEND_JSON
+
+# characters escaped besides the JSON ones, as ascii bytes and as text
+ESCAPES = [
+    (b"&", b"\\u0026", "&", "\\u0026"),
+    (b"<", b"\\u003c", "<", "\\u003c"),
+    (b">", b"\\u003e", ">", "\\u003e"),
+]
+
+# bytes orjson leaves as is but json.dumps escapes to `\uXXXX`
+NON_ASCII = re.compile(b"[\x7f-\xff]")
+
+# the canonical form of `payload` as ascii bytes: keys sorted, no whitespace,
+# non ascii characters as `\uXXXX` escapes and `&<>` escaped, byte for byte
+# what `json.dumps(payload, sort_keys=True, separators=(',', ':'))` with
+# `&<>` escaped gave before. Used for both the sign bytes and the `/txs`
+# body, with orjson when installed.
+def canonical_json(payload):
+    if orjson == None:
+        return canonical_json_stdlib(payload)
+    out = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    # orjson can't escape non ascii characters, leave those to json.dumps
+    if NON_ASCII.search(out):
+        return canonical_json_stdlib(payload)
+    for (raw, escaped, _, _) in ESCAPES:
+        if raw in out:
+            out = out.replace(raw, escaped)
+    return out
+
+def canonical_json_stdlib(payload):
+    out = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    for (_, _, raw, escaped) in ESCAPES:
+        if raw in out:
+            out = out.replace(raw, escaped)
+    return out.encode("ascii")
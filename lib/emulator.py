@@ -0,0 +1,708 @@
+#!/usr/bin/env python
+# in process emulator of a bluzelle node's REST interface, to run and load
+# test clients without a chain:
+#
+#   with NodeEmulator(block_time=0.1) as node:
+#       client = new_client({..., 'endpoint': node.endpoint})
+#
+# or standalone: python -m lib.emulator --port 1317 --block-time 5
+#
+# it serves `/auth/accounts/{address}`, `/node_info`, `/blocks/latest`, the
+# `/crud/*` queries and tx builders, and `/txs` in block, sync and async modes.
+# Of tendermint's rpc, it serves `/abci_query` of crud store keys with iavl
+# style merkle proofs and the app hash of `/commit` headers, for proven reads.
+# Blocks are committed every `block_time` seconds, txs in the mempool are
+# applied then. Accounts are created on first use; txs are checked for their
+# account number and sequence (and signature with `verify_signatures`), msgs
+# for key ownership and existence and for running out of gas. Leases count
+# down in blocks and keys are dropped once theirs runs out. `latency` (+ up to
+# `jitter`) seconds are added to every request.
+#
+# `FakeNode` answers single routes with canned json instead, and
+# `new_offline_client` makes a client signing for `SAMPLE_MNEMONIC` without
+# asking a node for its account.
+import argparse
+import base64
+import hashlib
+import heapq
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ecdsa import VerifyingKey, SECP256k1, BadSignatureError
+from ecdsa.util import sigdecode_string
+from .canonical import canonical_json
+from .bluzelle import Client
+from .proof import encode_fields, byte_slice, sha256, leaf_hash, inner_hash, multistore_root, PROOF_OP_IAVL_VALUE, PROOF_OP_MULTISTORE
+
+BLOCK_TIME_IN_SECONDS = 5
+DEFAULT_CHAIN_ID = "bluzelle"
+APP_VERSION = "0.0.0-emulator"
+# 10 days of 5s blocks, the lease of keys created without one
+DEFAULT_LEASE_BLOCKS = 172800
+TX_GAS = 20000
+MSG_GAS = 10000
+BYTE_GAS = 10
+BLOCK_WAIT_TIMEOUT_IN_SECONDS = 60
+CRUD_STORE_QUERY_PATH = "/store/crud/key"
+# app hashes kept for `/commit` headers
+MAX_APP_HASHES = 1000
+
+CODE_UNAUTHORIZED = 4
+CODE_OUT_OF_GAS = 11
+CODE_INSUFFICIENT_FEE = 13
+CODE_INVALID_REQUEST = 18
+CODE_WRONG_SEQUENCE = 32
+
+KEY_ALREADY_EXISTS = "Key already exists"
+KEY_DOES_NOT_EXIST = "Key does not exist"
+INCORRECT_OWNER = "Incorrect Owner"
+INVALID_LEASE = "Invalid lease time"
+UNKNOWN_MSG = "Unrecognized crud Msg type: %s"
+KEY_NOT_FOUND = "key not found"
+TX_NOT_FOUND = "Tx: response error: RPC error -32603 - Internal error: tx (%s) not found"
+
+# msg failed, the tx is reverted and answered with `code`
+class MsgError(Exception):
+    def __init__(self, log, code = CODE_INVALID_REQUEST):
+        super().__init__(log)
+        self.log = log
+        self.code = code
+
+# merkle tree over the sorted (key, value) pairs of a store, shaped like an
+# iavl tree (values at the leaves, inner nodes with their height and size) so
+# its proofs verify as iavl ones
+class ProofTree:
+    def __init__(self, items, version):
+        self.version = version
+        self.root = self.build(items)
+
+    def build(self, items):
+        if len(items) == 1:
+            key, value = items[0]
+            value_hash = sha256(value)
+            return {"height": 0, "key": key, "value": value, "value_hash": value_hash, "hash": leaf_hash(key, value_hash, self.version)}
+        mid = len(items) // 2
+        left, right = self.build(items[:mid]), self.build(items[mid:])
+        height = max(left["height"], right["height"]) + 1
+        return {
+            "height": height,
+            "size": len(items),
+            "split": items[mid][0],
+            "left": left,
+            "right": right,
+            "hash": inner_hash(height, len(items), self.version, left["hash"], b"", right["hash"]),
+        }
+
+    # (leaf, inner nodes from the root down) of `key`, leaf is None when it is not in the tree
+    def find(self, key):
+        node = self.root
+        path = []
+        while node["height"] > 0:
+            if key < node["split"]:
+                path.append((node["height"], node["size"], self.version, b"", node["right"]["hash"]))
+                node = node["left"]
+            else:
+                path.append((node["height"], node["size"], self.version, node["left"]["hash"], b""))
+                node = node["right"]
+        return (node if node["key"] == key else None), path
+
+    # amino encoded `ValueOp` proving `leaf`
+    def value_op(self, leaf, path):
+        nodes = [(1, encode_fields([(1, h), (2, size), (3, version), (4, left), (5, right)])) for (h, size, version, left, right) in path]
+        proof = nodes + [(3, encode_fields([(1, leaf["key"]), (2, leaf["value_hash"]), (3, self.version)]))]
+        return byte_slice(encode_fields([(1, encode_fields(proof))]))
+
+# amino encoded `MultiStoreProofOp` of stores [(name, root)]
+def multistore_op(store_infos, version):
+    infos = [(1, encode_fields([(1, name.encode("utf-8")), (2, encode_fields([(1, encode_fields([(1, version), (2, root)]))]))])) for (name, root) in store_infos]
+    return byte_slice(encode_fields([(1, encode_fields(infos))]))
+
+def b64(b):
+    return base64.b64encode(b).decode("ascii")
+
+# gas meter of a tx, raises once `limit` is used up
+class GasMeter:
+    def __init__(self, limit = None):
+        self.limit = limit
+        self.used = 0
+
+    def consume(self, gas, location):
+        self.used += gas
+        if self.limit != None and self.used > self.limit:
+            raise MsgError(
+                "out of gas in location: %s; gasWanted: %d, gasUsed: %d: out of gas" % (location, self.limit, self.used),
+                CODE_OUT_OF_GAS
+            )
+
+class NodeEmulator:
+    def __init__(self, block_time = BLOCK_TIME_IN_SECONDS, latency = 0, jitter = 0, chain_id = DEFAULT_CHAIN_ID, verify_signatures = False, min_gas_price = 0, host = "127.0.0.1", port = 0):
+        self.block_time = block_time
+        self.latency = latency
+        self.jitter = jitter
+        self.chain_id = chain_id
+        self.verify_signatures = verify_signatures
+        self.min_gas_price = min_gas_price
+        self.host = host
+        self.port = port
+        self.lock = threading.Condition()
+        self.height = 1
+        # address => {account_number, sequence}, the sequence counts txs accepted into the mempool
+        self.accounts = {}
+        # uuid => key => (value, owner, expiry height)
+        self.stores = {}
+        # (expiry height, uuid, key), entries whose key was renewed or deleted since are skipped
+        self.expiries = []
+        self.mempool = []
+        # txhash => tx result, once included in a block
+        self.txs = {}
+        self.requests = 0
+        self.rejected = 0
+        # (height, proof tree, multistore infos), built on the first proven query of a height
+        self.proof_state = None
+        # height => app hash of the state after that block, for the header of the next one
+        self.app_hashes = {}
+        self.server = None
+        self.stopped = threading.Event()
+
+    # serving
+
+    @property
+    def endpoint(self):
+        return "http://%s:%d" % (self.host, self.server.server_address[1])
+
+    def start(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = 1024 * 1024
+
+            def log_message(self, *args):
+                pass
+
+            def handle_any(self):
+                length = int(self.headers.get("content-length", 0))
+                body = self.rfile.read(length) if length else b""
+                status, data = node.handle(self.command, self.path, body)
+                out = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            do_GET = do_POST = do_DELETE = handle_any
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="bluzelle-emulator", daemon=True).start()
+        threading.Thread(target=self.produce_blocks, name="bluzelle-emulator-blocks", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        with self.lock:
+            self.lock.notify_all()
+        if self.server != None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "height": self.height,
+                "txs": len(self.txs),
+                "mempool": len(self.mempool),
+                "rejected": self.rejected,
+                "requests": self.requests,
+            }
+
+    # (status, json) of a request
+    def handle(self, method, path, body):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        with self.lock:
+            self.requests += 1
+        parts = [urllib.parse.unquote(p) for p in path.split("?")[0].split("/")[1:]]
+        try:
+            if method == "GET":
+                return self.handle_query(parts, urllib.parse.parse_qs(urllib.parse.urlparse(path).query))
+            data = json.loads(body) if body else {}
+            if parts == ["txs"]:
+                return self.broadcast(data.get("tx", {}), data.get("mode", "sync"))
+            if len(parts) == 2 and parts[0] == "crud":
+                return self.build_transaction(parts[1], data)
+        except MsgError as e:
+            return 400, {"error": e.log}
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": "invalid request: %s" % e}
+        return 404, {"error": "unknown route %s %s" % (method, path)}
+
+    def handle_query(self, parts, params = {}):
+        with self.lock:
+            if parts == ["abci_query"]:
+                return self.abci_query(params)
+            if parts == ["commit"]:
+                return self.commit(params)
+            if len(parts) == 3 and parts[:2] == ["auth", "accounts"]:
+                account = self.account(parts[2])
+                return 200, self.with_height({"type": "cosmos-sdk/Account", "value": {
+                    "address": parts[2],
+                    "coins": [],
+                    "public_key": "",
+                    "account_number": account["account_number"],
+                    "sequence": account["sequence"],
+                }})
+            if parts == ["blocks", "latest"]:
+                return 200, {"block": {"header": {"chain_id": self.chain_id, "height": str(self.height)}}}
+            if parts == ["node_info"]:
+                return 200, {
+                    "node_info": {"network": self.chain_id, "moniker": "emulator"},
+                    "application_version": {"name": "BluzelleService", "version": APP_VERSION},
+                }
+            if len(parts) == 2 and parts[0] == "txs":
+                result = self.txs.get(parts[1].upper(), None)
+                if result == None:
+                    return 404, {"error": TX_NOT_FOUND % parts[1]}
+                return 200, result
+            if len(parts) < 3 or parts[0] != "crud":
+                return 404, {"error": "unknown route GET /%s" % "/".join(parts)}
+            name, uuid, args = parts[1], parts[2], parts[3:]
+            if name == "pread":
+                name = "read"
+            fields = {"UUID": uuid}
+            if name == "getnshortestleases" and args:
+                fields["N"] = args[0]
+            elif args:
+                fields["Key"] = "/".join(args)
+            try:
+                return 200, self.with_height(self.query(name, fields))
+            except MsgError as e:
+                if e.log == KEY_DOES_NOT_EXIST:
+                    return 404, {"error": KEY_NOT_FOUND}
+                return 400, {"error": e.log}
+
+    # tendermint rpc
+
+    def abci_query(self, params):
+        path = params.get("path", [""])[0].strip('"')
+        if path != CRUD_STORE_QUERY_PATH:
+            return self.rpc_error("no such query path %s" % path)
+        data = params.get("data", [""])[0]
+        store_key = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+        tree, store_infos = self.proven_state()
+        response = {"code": 0, "log": "", "key": b64(store_key), "value": None, "proof": None, "height": str(self.height)}
+        leaf = None
+        if tree != None:
+            leaf, path = tree.find(store_key)
+        if leaf != None:
+            response["value"] = b64(leaf["value"])
+            response["proof"] = {"ops": [
+                {"type": PROOF_OP_IAVL_VALUE, "key": b64(store_key), "data": b64(tree.value_op(leaf, path))},
+                {"type": PROOF_OP_MULTISTORE, "key": b64(b"crud"), "data": b64(multistore_op(store_infos, self.height))},
+            ]}
+        return self.rpc_result({"response": response})
+
+    def commit(self, params):
+        height = int(params.get("height", [str(self.height)])[0])
+        if height > self.height:
+            return self.rpc_error("height %d must be less than or equal to the current blockchain height %d" % (height, self.height))
+        return self.rpc_result({"signed_header": {
+            "header": {"chain_id": self.chain_id, "height": str(height), "app_hash": self.app_hashes.get(height - 1, b"").hex().upper()},
+            "commit": None,
+        }, "canonical": True})
+
+    # proof tree of the crud store and roots of the multistore at the current height. Keys are
+    # `uuid \0 key`, values amino encoded with the value first
+    def proven_state(self):
+        if self.proof_state == None or self.proof_state[0] != self.height:
+            items = sorted(
+                (uuid.encode("utf-8") + b"\x00" + key.encode("utf-8"), encode_fields([(1, value.encode("utf-8")), (2, owner.encode("utf-8"))]))
+                for (uuid, store) in self.stores.items() for (key, (value, owner, _)) in store.items()
+            )
+            tree = ProofTree(items, self.height) if items else None
+            store_infos = [("acc", sha256(json.dumps(self.accounts, sort_keys=True).encode("utf-8"))), ("crud", tree.root["hash"] if tree != None else b"")]
+            self.proof_state = (self.height, tree, store_infos)
+            self.app_hashes[self.height] = multistore_root(store_infos)
+            self.app_hashes.pop(self.height - MAX_APP_HASHES, None)
+        return self.proof_state[1], self.proof_state[2]
+
+    def rpc_result(self, result):
+        return 200, {"jsonrpc": "2.0", "id": -1, "result": result}
+
+    def rpc_error(self, data):
+        return 500, {"jsonrpc": "2.0", "id": -1, "error": {"code": -32603, "message": "Internal error", "data": data}}
+
+    def with_height(self, result):
+        return {"height": str(self.height), "result": result}
+
+    def account(self, address):
+        account = self.accounts.get(address, None)
+        if account == None:
+            account = self.accounts[address] = {"account_number": len(self.accounts), "sequence": 0}
+        return account
+
+    # tx builders: the unsigned tx for a msg, sized by simulating it
+
+    def build_transaction(self, name, fields):
+        fields = dict(fields)
+        fields.pop("BaseReq", None)
+        msg = {"type": "crud/" + name, "value": fields}
+        with self.lock:
+            undo = []
+            meter = GasMeter()
+            try:
+                meter.consume(TX_GAS, "tx")
+                self.apply_msg(msg, meter, undo)
+            finally:
+                self.revert(undo)
+        return 200, {"type": "cosmos-sdk/StdTx", "value": {
+            "msg": [msg],
+            "fee": {"amount": [], "gas": str(meter.used)},
+            "signatures": None,
+            "memo": "",
+        }}
+
+    # broadcasting
+
+    def broadcast(self, tx, mode):
+        txhash = NodeEmulator.tx_hash(tx)
+        with self.lock:
+            error = self.check_transaction(tx)
+            if error != None:
+                self.rejected += 1
+                if mode == "async":
+                    return 200, {"height": "0", "txhash": txhash}
+                code, log = error
+                return 200, {"height": "0", "txhash": txhash, "code": code, "raw_log": log}
+            self.mempool.append((txhash, tx))
+            if mode == "async":
+                return 200, {"height": "0", "txhash": txhash}
+            if mode == "sync":
+                return 200, {"height": "0", "txhash": txhash, "raw_log": "[]"}
+            deadline = time.time() + max(BLOCK_WAIT_TIMEOUT_IN_SECONDS, self.block_time * 2)
+            while not (txhash in self.txs) and not self.stopped.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return 500, {"error": "timed out waiting for tx %s to be committed" % txhash}
+                self.lock.wait(remaining)
+            result = dict(self.txs.get(txhash, {}))
+            result.pop("tx", None)
+            return 200, result
+
+    # ante handler: (code, log) when the tx can't go into the mempool. An accepted
+    # tx takes its account's next sequence
+    def check_transaction(self, tx):
+        msgs = tx.get("msg") or []
+        signatures = tx.get("signatures") or []
+        if not msgs or len(signatures) != 1:
+            return CODE_UNAUTHORIZED, "unauthorized: wrong number of signers"
+        owner = msgs[0]["value"].get("Owner", "")
+        account = self.account(owner)
+        signature = signatures[0]
+        if int(signature.get("account_number", -1)) != account["account_number"]:
+            return CODE_UNAUTHORIZED, "unauthorized: signature verification failed; verify correct account number"
+        if int(signature.get("sequence", -1)) != account["sequence"]:
+            return CODE_WRONG_SEQUENCE, "account sequence mismatch, expected %d, got %s: incorrect account sequence" % (account["sequence"], signature.get("sequence"))
+        if self.verify_signatures and not self.verify_signature(tx, signature):
+            return CODE_UNAUTHORIZED, "unauthorized: signature verification failed; verify correct account sequence and chain-id"
+        fee = tx.get("fee", {})
+        paid = sum(int(a["amount"]) for a in fee.get("amount") or [])
+        if paid < int(fee.get("gas", 0)) * self.min_gas_price:
+            return CODE_INSUFFICIENT_FEE, "insufficient fees; got: %dubnt required: %dubnt" % (paid, int(fee.get("gas", 0)) * self.min_gas_price)
+        account["sequence"] += 1
+        return None
+
+    def verify_signature(self, tx, signature):
+        sign_bytes = {
+            "account_number": signature["account_number"],
+            "chain_id": self.chain_id,
+            "fee": tx["fee"],
+            "memo": tx.get("memo", ""),
+            "msgs": tx["msg"],
+            "sequence": signature["sequence"],
+        }
+        try:
+            key = VerifyingKey.from_string(base64.b64decode(signature["pub_key"]["value"]), curve=SECP256k1)
+            return key.verify(base64.b64decode(signature["signature"]), canonical_json(sign_bytes), hashfunc=hashlib.sha256, sigdecode=sigdecode_string)
+        except (BadSignatureError, ValueError, KeyError):
+            return False
+
+    # blocks
+
+    def produce_blocks(self):
+        while not self.stopped.wait(self.block_time):
+            self.commit_block()
+
+    def commit_block(self):
+        with self.lock:
+            self.height += 1
+            txs, self.mempool = self.mempool, []
+            for (txhash, tx) in txs:
+                self.txs[txhash] = self.deliver_transaction(txhash, tx)
+            self.expire_leases()
+            self.lock.notify_all()
+
+    # applies every msg of `tx` or, when one fails, none of them
+    def deliver_transaction(self, txhash, tx):
+        meter = GasMeter(int(tx.get("fee", {}).get("gas", 0)))
+        undo = []
+        results = []
+        result = {
+            "height": str(self.height),
+            "txhash": txhash,
+            "tx": {"type": "cosmos-sdk/StdTx", "value": tx},
+        }
+        try:
+            meter.consume(TX_GAS, "tx")
+            for msg in tx["msg"]:
+                results.append(self.apply_msg(msg, meter, undo))
+        except MsgError as e:
+            self.revert(undo)
+            result.update({"code": e.code, "raw_log": e.log, "gas_wanted": tx["fee"]["gas"], "gas_used": str(meter.used)})
+            return result
+        logs = [{"msg_index": i, "log": "", "events": []} for i in range(len(results))]
+        result.update({"raw_log": json.dumps(logs), "logs": logs, "gas_wanted": tx["fee"]["gas"], "gas_used": str(meter.used)})
+        data = "".join(json.dumps(r, separators=(",", ":")) for r in results if r != None)
+        if data:
+            result["data"] = data.encode("ascii").hex().upper()
+        return result
+
+    def expire_leases(self):
+        while self.expiries and self.expiries[0][0] <= self.height:
+            (expiry, uuid, key) = heapq.heappop(self.expiries)
+            entry = self.stores.get(uuid, {}).get(key, None)
+            if entry != None and entry[2] == expiry:
+                del self.stores[uuid][key]
+
+    # crud msgs, applied to the store with an undo log. Query msgs return their result
+
+    def apply_msg(self, msg, meter, undo):
+        name = msg["type"].split("/")[-1]
+        fields = msg["value"]
+        meter.consume(MSG_GAS + BYTE_GAS * len(json.dumps(fields)), name)
+        if name in ["read", "has", "count", "keys", "keyvalues", "getlease", "getnshortestleases"]:
+            result = self.query(name, fields)
+            meter.consume(BYTE_GAS * len(json.dumps(result)), name)
+            return result
+        uuid = fields["UUID"]
+        owner = fields["Owner"]
+        store = self.stores.setdefault(uuid, {})
+        if name == "create":
+            if fields["Key"] in store:
+                raise MsgError(KEY_ALREADY_EXISTS)
+            self.put(uuid, fields["Key"], fields["Value"], owner, self.lease_expiry(fields), undo)
+        elif name == "update":
+            (_, _, expiry) = self.owned(store, fields["Key"], owner)
+            if int(fields.get("Lease", 0) or 0) > 0:
+                expiry = self.lease_expiry(fields)
+            self.put(uuid, fields["Key"], fields["Value"], owner, expiry, undo)
+        elif name == "multiupdate":
+            for kv in fields["KeyValues"]:
+                (_, _, expiry) = self.owned(store, kv["key"], owner)
+                self.put(uuid, kv["key"], kv["value"], owner, expiry, undo)
+        elif name == "delete":
+            self.owned(store, fields["Key"], owner)
+            self.put(uuid, fields["Key"], None, owner, None, undo)
+        elif name == "rename":
+            (value, _, expiry) = self.owned(store, fields["Key"], owner)
+            if fields["NewKey"] in store:
+                raise MsgError(KEY_ALREADY_EXISTS)
+            self.put(uuid, fields["Key"], None, owner, None, undo)
+            self.put(uuid, fields["NewKey"], value, owner, expiry, undo)
+        elif name == "renewlease":
+            (value, _, _) = self.owned(store, fields["Key"], owner)
+            self.put(uuid, fields["Key"], value, owner, self.lease_expiry(fields), undo)
+        elif name == "renewleaseall":
+            expiry = self.lease_expiry(fields)
+            for (key, (value, key_owner, _)) in list(store.items()):
+                if key_owner == owner:
+                    self.put(uuid, key, value, owner, expiry, undo)
+        elif name == "deleteall":
+            undo.append((uuid, None, dict(store)))
+            for (key, (_, key_owner, _)) in list(store.items()):
+                if key_owner == owner:
+                    del store[key]
+        else:
+            raise MsgError(UNKNOWN_MSG % name)
+        return None
+
+    def query(self, name, fields):
+        uuid = fields["UUID"]
+        store = self.stores.get(uuid, {})
+        if name == "read":
+            return {"UUID": uuid, "key": fields["Key"], "value": self.existing(store, fields["Key"])[0]}
+        if name == "has":
+            return {"UUID": uuid, "key": fields["Key"], "has": fields["Key"] in store}
+        if name == "count":
+            return {"UUID": uuid, "count": str(len(store))}
+        if name == "keys":
+            return {"UUID": uuid, "keys": sorted(store.keys())}
+        if name == "keyvalues":
+            return {"UUID": uuid, "keyvalues": [{"key": key, "value": store[key][0]} for key in sorted(store.keys())]}
+        if name == "getlease":
+            return {"UUID": uuid, "key": fields["Key"], "lease": str(self.existing(store, fields["Key"])[2] - self.height)}
+        if name == "getnshortestleases":
+            leases = sorted((expiry - self.height, key) for (key, (_, _, expiry)) in store.items())
+            return {"UUID": uuid, "keyleases": [{"key": key, "lease": str(lease)} for (lease, key) in leases[:int(fields["N"])]]}
+        raise MsgError(UNKNOWN_MSG % name)
+
+    def existing(self, store, key):
+        entry = store.get(key, None)
+        if entry == None:
+            raise MsgError(KEY_DOES_NOT_EXIST)
+        return entry
+
+    def owned(self, store, key, owner):
+        entry = self.existing(store, key)
+        if entry[1] != owner:
+            raise MsgError(INCORRECT_OWNER)
+        return entry
+
+    def lease_expiry(self, fields):
+        lease = int(fields.get("Lease", 0) or 0)
+        if lease < 0:
+            raise MsgError(INVALID_LEASE)
+        return self.height + (lease or DEFAULT_LEASE_BLOCKS)
+
+    # `value` None deletes the key
+    def put(self, uuid, key, value, owner, expiry, undo):
+        store = self.stores.setdefault(uuid, {})
+        undo.append((uuid, key, store.get(key, None)))
+        if value == None:
+            store.pop(key, None)
+            return
+        store[key] = (value, owner, expiry)
+        heapq.heappush(self.expiries, (expiry, uuid, key))
+
+    def revert(self, undo):
+        for (uuid, key, previous) in reversed(undo):
+            store = self.stores.setdefault(uuid, {})
+            if key == None:
+                store.clear()
+                store.update(previous)
+            elif previous == None:
+                store.pop(key, None)
+            else:
+                store[key] = previous
+
+    # hash of the tx json, standing in for the hash of its amino encoding
+    @classmethod
+    def tx_hash(cls, tx):
+        return hashlib.sha256(json.dumps(tx, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest().upper()
+
+SAMPLE_MNEMONIC = 'around buzz diagram captain obtain detail salon mango muffin brother morning jeans display attend knife carry green dwarf vendor hungry fan route pumpkin car'
+
+# a client that never asks the node for its account, ready to sign offline
+def new_offline_client(options = {}, cls = Client):
+    opts = {
+        'mnemonic': SAMPLE_MNEMONIC,
+        'uuid': 'test',
+        'endpoint': 'http://127.0.0.1:1',
+        'chain_id': 'bluzelle',
+        'debug': False,
+    }
+    opts.update(options)
+    client = cls(opts)
+    client.setup_logging()
+    client.set_private_key()
+    client.set_address()
+    client.bluzelle_account = {'account_number': 0, 'sequence': 0}
+    return client
+
+# local keep-alive http server answering canned json, for tests and benchmarks
+# of single routes; routes are matched by method and path prefix:
+#   node.route('GET', '/crud/read/', lambda req: {...})
+class FakeNode:
+    def __init__(self):
+        self.routes = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # send headers and body in one write, two small writes stall on delayed acks
+            wbufsize = 1024 * 1024
+
+            def log_message(self, *args):
+                pass
+
+            def handle_any(self):
+                length = int(self.headers.get('content-length', 0))
+                body = self.rfile.read(length) if length else b''
+                status, data = node.dispatch(self.command, self.path, body)
+                out = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            do_GET = do_POST = do_DELETE = handle_any
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def route(self, method, prefix, handler):
+        self.routes.append((method, prefix, handler))
+
+    def dispatch(self, method, path, body):
+        for (m, prefix, handler) in self.routes:
+            if m == method and path.startswith(prefix):
+                res = handler({
+                    'path': path,
+                    'body': json.loads(body) if body else None,
+                    'raw': body,
+                })
+                if type(res) is tuple:
+                    return res
+                return 200, res
+        return 404, {'error': 'unknown route %s %s' % (method, path)}
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="bluzelle REST node emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1317)
+    parser.add_argument("--block-time", type=float, default=BLOCK_TIME_IN_SECONDS)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0, help="up to as many random seconds added on top")
+    parser.add_argument("--chain-id", default=DEFAULT_CHAIN_ID)
+    parser.add_argument("--verify-signatures", action="store_true")
+    parser.add_argument("--min-gas-price", type=int, default=0)
+    args = parser.parse_args()
+    node = NodeEmulator(
+        block_time=args.block_time,
+        latency=args.latency,
+        jitter=args.jitter,
+        chain_id=args.chain_id,
+        verify_signatures=args.verify_signatures,
+        min_gas_price=args.min_gas_price,
+        host=args.host,
+        port=args.port,
+    ).start()
+    print("emulating a bluzelle node at %s" % node.endpoint)
+    try:
+        node.stopped.wait()
+    except KeyboardInterrupt:
+        node.stop()
+
+if __name__ == "__main__":
+    main()
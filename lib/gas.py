@@ -0,0 +1,130 @@
+import threading
+
+DEFAULT_GAS_MARGIN = 0.2
+GAS_MODEL_MIN_SAMPLES = 8
+# an out of gas tx doubles the margin of its message type
+OUT_OF_GAS_MARGIN_FACTOR = 2
+RIDGE = 1e-3
+
+# features of a crud msg value or payload: items, key bytes, value bytes and
+# whether a lease is set. Multi updates hold their pairs in `KeyValues`.
+def gas_features(fields):
+    kvs = fields.get('KeyValues') or [fields]
+    key_bytes = 0
+    value_bytes = 0
+    for kv in kvs:
+        key_bytes += len(kv.get('Key', kv.get('key', '')).encode('utf-8'))
+        key_bytes += len(kv.get('NewKey', '').encode('utf-8'))
+        value_bytes += len(kv.get('Value', kv.get('value', '')).encode('utf-8'))
+    lease = 1 if int(fields.get('Lease', 0) or 0) > 0 else 0
+    return [1, len(kvs), key_bytes, value_bytes, lease]
+
+# least squares fit of gas over features, kept as running sums of X'X and
+# X'y so every sample is O(1) and nothing is stored per tx. A small ridge
+# term keeps it solvable while features are still collinear.
+class LinearFit:
+    def __init__(self, n):
+        self.n = n
+        self.xtx = [[0.0] * n for _ in range(n)]
+        self.xty = [0.0] * n
+        self.samples = 0
+        # worst actual / predicted gas seen once the fit was in use
+        self.max_ratio = 1.0
+        # least gas seen, a floor for extrapolations far from the samples
+        self.min_y = None
+        self.weights = None
+
+    def add(self, x, y):
+        for i in range(self.n):
+            self.xty[i] += x[i] * y
+            for j in range(self.n):
+                self.xtx[i][j] += x[i] * x[j]
+        self.samples += 1
+        if self.min_y == None or y < self.min_y:
+            self.min_y = y
+        self.weights = None
+
+    def predict(self, x):
+        if self.samples == 0:
+            return None
+        if self.weights == None:
+            self.weights = LinearFit.solve(
+                [[v + (RIDGE if i == j else 0) for (j, v) in enumerate(row)] for (i, row) in enumerate(self.xtx)],
+                list(self.xty)
+            )
+        return sum(w * v for (w, v) in zip(self.weights, x))
+
+    # gaussian elimination with partial pivoting
+    @classmethod
+    def solve(cls, a, b):
+        n = len(b)
+        for i in range(n):
+            p = max(range(i, n), key=lambda r: abs(a[r][i]))
+            a[i], a[p] = a[p], a[i]
+            b[i], b[p] = b[p], b[i]
+            for r in range(i + 1, n):
+                f = a[r][i] / a[i][i]
+                for c in range(i, n):
+                    a[r][c] -= f * a[i][c]
+                b[r] -= f * b[i]
+        x = [0.0] * n
+        for i in reversed(range(n)):
+            x[i] = (b[i] - sum(a[i][c] * x[c] for c in range(i + 1, n))) / a[i][i]
+        return x
+
+# learns the gas used by each crud message type from included single message
+# txs and predicts the gas of new ones, so they can be built without asking
+# the node to simulate them. Predictions are padded by `margin` and by the
+# worst underestimate seen so far, and never below the least gas a tx of
+# that type used; an out of gas tx widens the margin.
+class GasModel:
+    def __init__(self, margin = DEFAULT_GAS_MARGIN, min_samples = GAS_MODEL_MIN_SAMPLES):
+        self.margin = margin
+        self.min_samples = min_samples
+        self.fits = {}
+        self.margins = {}
+        self.lock = threading.Lock()
+        self.predictions = 0
+        self.misses = 0
+
+    def observe(self, msg_type, fields, gas_used):
+        x = gas_features(fields)
+        with self.lock:
+            fit = self.fits.get(msg_type, None)
+            if fit == None:
+                fit = self.fits[msg_type] = LinearFit(len(x))
+            if fit.samples >= self.min_samples:
+                predicted = fit.predict(x)
+                if predicted > 0:
+                    fit.max_ratio = max(fit.max_ratio, gas_used / predicted)
+            fit.add(x, gas_used)
+
+    def ready(self, msg_type):
+        with self.lock:
+            fit = self.fits.get(msg_type, None)
+            return fit != None and fit.samples >= self.min_samples
+
+    # predicted gas, or None while there are too few samples
+    def predict(self, msg_type, fields):
+        x = gas_features(fields)
+        with self.lock:
+            fit = self.fits.get(msg_type, None)
+            if fit == None or fit.samples < self.min_samples:
+                return None
+            gas = fit.predict(x) * fit.max_ratio * (1 + self.margins.get(msg_type, self.margin))
+            self.predictions += 1
+            return max(int(gas) + 1, int(fit.min_y))
+
+    def miss(self, msg_type):
+        with self.lock:
+            self.margins[msg_type] = self.margins.get(msg_type, self.margin) * OUT_OF_GAS_MARGIN_FACTOR
+            self.misses += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "predictions": self.predictions,
+                "misses": self.misses,
+                "samples": dict((t, fit.samples) for (t, fit) in self.fits.items()),
+                "margins": dict((t, self.margins.get(t, self.margin)) for t in self.fits.keys()),
+            }
@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+# shared HTTP gateway in front of the chain, one client (one account) serving
+# many callers:
+#
+#   POST /       {"method": "read", "args": ["key"]} => result
+#   POST /batch  [{"method": ..., "args": [...]}, ...] => [{"result": ...} or {"error": ...}, ...]
+#   GET  /stats  per method counts and latencies, write queue, cache and retry stats
+#   GET  /metrics  the client's metrics in the prometheus text format
+#
+# methods and args are the client's. Reads run concurrently on the request
+# threads and are cached (the gateway's own writes drop cached entries).
+# Writes go through a queue to a single writer thread, the only one signing,
+# so sequences never race; writes waiting together are committed as one
+# transaction.
+#
+#   bluzelle-gateway --port 4562  # client settings from the environment / .env
+#
+# needs the `gateway` extra: pip install bluzelle[gateway]
+import os
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask, request, jsonify, Response
+from werkzeug.exceptions import HTTPException
+
+from .bluzelle import new_client, Client, APIError, OptionsError
+from .metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_MAX_BATCH_OPS = 100
+DEFAULT_BATCH_WAIT_IN_SECONDS = 0.005
+DEFAULT_WRITE_TIMEOUT_IN_SECONDS = 120
+DEFAULT_CONCURRENCY = 32
+LATENCY_SAMPLES = 1024
+
+READ_METHODS = ["account", "version", "read", "has", "count", "keys", "key_values", "get_lease", "get_n_shortest_leases"]
+# write methods => position of their gas_info argument
+WRITE_METHODS = {
+    "create": 2,
+    "update": 2,
+    "delete": 1,
+    "rename": 2,
+    "delete_all": 0,
+    "multi_update": 1,
+    "renew_lease": 1,
+    "renew_lease_all": 0,
+    "renew_all_leases": 0,
+    "tx_read": 1,
+    "tx_has": 1,
+    "tx_count": 0,
+    "tx_keys": 0,
+    "tx_key_values": 0,
+    "tx_get_lease": 1,
+    "tx_get_n_shortest_leases": 1,
+}
+# batch method of a write method
+BATCH_METHODS = {"renew_all_leases": "renew_lease_all"}
+
+UNKNOWN_METHOD = "unknown method %s"
+METHOD_AND_ARGS_REQUIRED = "both method and args are required"
+ARGS_MUST_BE_A_LIST = "args should be a list"
+BATCH_MUST_BE_A_LIST = "batch should be a list of {method, args}"
+GAS_INFO_REQUIRED = "gas_info is required"
+GATEWAY_CLOSED = "gateway is closed"
+
+# a queued write
+class Write:
+    def __init__(self, method, args, solo = False):
+        self.method = method
+        self.args = args
+        self.solo = solo
+        self.future = Future()
+        self.gas_info = args[WRITE_METHODS[method]]
+
+    # args without the gas info, as the batch method takes them
+    def batch_args(self):
+        i = WRITE_METHODS[self.method]
+        return self.args[:i] + self.args[i + 1:]
+
+    # writes with the same key can share a transaction and sum their budgets
+    def group_key(self):
+        return (self.gas_info.get('gas_price', 0), self.gas_info.get('max_gas', 0) == 0, self.gas_info.get('max_fee', 0) == 0)
+
+# the single writer: takes writes off the queue, waits `batch_wait` seconds
+# for more and commits up to `max_batch_ops` of them as one transaction. When
+# the node rejects that transaction its writes are retried one by one, so only
+# the failing ones fail.
+class WriteQueue:
+    def __init__(self, client, max_batch_ops = DEFAULT_MAX_BATCH_OPS, batch_wait = DEFAULT_BATCH_WAIT_IN_SECONDS):
+        self.client = client
+        self.max_batch_ops = max_batch_ops
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.writes = 0
+        self.transactions = 0
+        self.isolated = 0
+        self.worker = threading.Thread(target=self.run, name='bluzelle-gateway-writer', daemon=True)
+        self.worker.start()
+
+    def submit(self, method, args):
+        if len(args) <= WRITE_METHODS[method] or args[WRITE_METHODS[method]] == None:
+            raise OptionsError(GAS_INFO_REQUIRED)
+        Client.validate_gas_info(args[WRITE_METHODS[method]])
+        if self.closed:
+            raise APIError(GATEWAY_CLOSED)
+        write = Write(method, args)
+        self.queue.put(write)
+        return write.future
+
+    def run(self):
+        while True:
+            write = self.queue.get()
+            if write == None:
+                return
+            writes = [write]
+            deadline = time.time() + self.batch_wait
+            while not write.solo and len(writes) < self.max_batch_ops:
+                try:
+                    more = self.queue.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if more == None:
+                    self.queue.put(None)
+                    break
+                writes.append(more)
+            groups = {}
+            for w in writes:
+                if w.solo:
+                    self.commit([w])
+                else:
+                    groups.setdefault(w.group_key(), []).append(w)
+            for group in groups.values():
+                self.commit(group)
+
+    def commit(self, writes):
+        with self.lock:
+            self.writes += len(writes)
+            self.transactions += 1
+        if len(writes) == 1:
+            w = writes[0]
+            try:
+                WriteQueue.resolve(getattr(self.client, w.method)(*w.args), w.future.set_result, w.future.set_exception)
+            except Exception as e:
+                w.future.set_exception(e)
+            return
+        batch = self.client.batch()
+        batched = []
+        for w in writes:
+            try:
+                getattr(batch, BATCH_METHODS.get(w.method, w.method))(*w.batch_args())
+                batched.append(w)
+            except Exception as e:
+                w.future.set_exception(e)
+        if not batched:
+            return
+        def done(results):
+            for (w, result) in zip(batched, results):
+                w.future.set_result(result)
+        try:
+            res = self.client.commit_batch(batch, WriteQueue.merge_gas_info([w.gas_info for w in batched]))
+        except Exception as e:
+            self.isolate(batched, e)
+            return
+        WriteQueue.resolve(res, done, lambda e: self.isolate(batched, e))
+
+    # retry the writes of a transaction the node rejected one by one, on the writer
+    # thread. After any other error the tx may have landed, the writes fail with it
+    # rather than being applied twice
+    def isolate(self, writes, error):
+        if len(writes) == 1 or not WriteQueue.rejected(error):
+            for w in writes:
+                w.future.set_exception(error)
+            return
+        with self.lock:
+            self.isolated += len(writes)
+        for w in writes:
+            solo = Write(w.method, w.args, solo=True)
+            solo.future = w.future
+            self.queue.put(solo)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "writes": self.writes,
+                "transactions": self.transactions,
+                "isolated": self.isolated,
+            }
+
+    def close(self):
+        self.closed = True
+        self.queue.put(None)
+        self.worker.join()
+
+    # call `on_result`/`on_error` with a tx result, right away in block mode or once
+    # the `TxFuture` of the sync/async modes resolves
+    @classmethod
+    def resolve(cls, result, on_result, on_error):
+        if not isinstance(result, Future):
+            on_result(result)
+            return
+        def done(f):
+            try:
+                on_result(f.result())
+            except Exception as e:
+                on_error(e)
+        result.add_done_callback(done)
+
+    # whether the node definitely took none of a tx: it refused to build it (a 4xx) or
+    # rejected it with a code. Timeouts and txs never seen in a block may still land
+    @classmethod
+    def rejected(cls, error):
+        if not isinstance(error, APIError):
+            return False
+        if type(error.api_error) is dict and 'code' in error.api_error:
+            return True
+        status = getattr(error.api_response, 'status_code', None)
+        return status != None and 400 <= status < 500
+
+    # budget of a transaction merging writes: their max gas and max fees add up
+    @classmethod
+    def merge_gas_info(cls, gas_infos):
+        return {
+            "gas_price": gas_infos[0].get('gas_price', 0),
+            "max_gas": sum(g.get('max_gas', 0) for g in gas_infos),
+            "max_fee": sum(g.get('max_fee', 0) for g in gas_infos),
+        }
+
+# call counts, errors and recent latencies per method
+class LatencyStats:
+    def __init__(self, samples = LATENCY_SAMPLES):
+        self.samples = samples
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    def record(self, method, seconds, error = False):
+        with self.lock:
+            m = self.methods.get(method, None)
+            if m == None:
+                m = self.methods[method] = {"count": 0, "errors": 0, "seconds": 0.0, "latencies": deque(maxlen=self.samples)}
+            m["count"] += 1
+            m["seconds"] += seconds
+            m["latencies"].append(seconds)
+            if error:
+                m["errors"] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = {}
+            for (method, m) in self.methods.items():
+                latencies = sorted(m["latencies"])
+                stats[method] = {
+                    "count": m["count"],
+                    "errors": m["errors"],
+                    "mean_ms": m["seconds"] / m["count"] * 1000,
+                    "p50_ms": LatencyStats.percentile(latencies, 0.5) * 1000,
+                    "p99_ms": LatencyStats.percentile(latencies, 0.99) * 1000,
+                }
+            return stats
+
+    @classmethod
+    def percentile(cls, latencies, p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+class Gateway:
+    def __init__(self, client, max_batch_ops = DEFAULT_MAX_BATCH_OPS, batch_wait = DEFAULT_BATCH_WAIT_IN_SECONDS, write_timeout = DEFAULT_WRITE_TIMEOUT_IN_SECONDS, concurrency = DEFAULT_CONCURRENCY):
+        self.client = client
+        self.write_timeout = write_timeout
+        self.writes = WriteQueue(client, max_batch_ops, batch_wait)
+        self.latencies = LatencyStats()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bluzelle-gateway')
+
+    def call(self, method, args):
+        return self.start(method, args).result(self.write_timeout)
+
+    # calls of a batch request run concurrently, each gets its result or error
+    def call_many(self, calls):
+        futures = []
+        for c in calls:
+            future = Future()
+            try:
+                future = self.start(c['method'], c['args'])
+            except Exception as e:
+                future.set_exception(e)
+            futures.append(future)
+        results = []
+        for future in futures:
+            try:
+                results.append({"result": future.result(self.write_timeout)})
+            except Exception as e:
+                results.append({"error": Gateway.error_message(e)})
+        return results
+
+    # future of a call: reads on the gateway's threads, writes through the write queue
+    def start(self, method, args):
+        started_at = time.perf_counter()
+        if method in READ_METHODS:
+            future = self.executor.submit(getattr(self.client, method), *args)
+        elif method in WRITE_METHODS:
+            future = self.writes.submit(method, args)
+        else:
+            raise APIError(UNKNOWN_METHOD % method)
+        future.add_done_callback(lambda f: self.record(method, started_at, f.exception() != None))
+        return future
+
+    def record(self, method, started_at, error):
+        seconds = time.perf_counter() - started_at
+        self.latencies.record(method, seconds, error)
+        if self.client.metrics != None:
+            self.client.metrics.observe("gateway_request_seconds", seconds, {"method": method})
+
+    def stats(self):
+        return {
+            "methods": self.latencies.stats(),
+            "writes": self.writes.stats(),
+            "cache": self.client.cache_stats(),
+            "coalesce": self.client.coalesce_stats(),
+            "retry": self.client.retry_stats(),
+            "transport": self.client.transport_stats(),
+        }
+
+    def close(self):
+        self.writes.close()
+        self.executor.shutdown()
+        self.client.close()
+
+    @classmethod
+    def error_message(cls, e):
+        if isinstance(e, APIError):
+            return e.api_error
+        return str(e)
+
+def create_app(gateway):
+    app = Flask(__name__)
+
+    @app.errorhandler(Exception)
+    def handle_error(e):
+        code = 500
+        msg = str(e)
+        if isinstance(e, HTTPException):
+            code = e.code
+        elif isinstance(e, (APIError, OptionsError)):
+            msg = Gateway.error_message(e)
+            code = 400
+        return jsonify(msg), code
+
+    @app.route("/", methods = ['POST'])
+    def call():
+        req = request.json
+        if type(req) is not dict or not ('method' in req and 'args' in req):
+            raise APIError(METHOD_AND_ARGS_REQUIRED)
+        if type(req['args']) is not list:
+            raise APIError(ARGS_MUST_BE_A_LIST)
+        return jsonify(gateway.call(req['method'], req['args']))
+
+    @app.route("/batch", methods = ['POST'])
+    def batch():
+        calls = request.json
+        if type(calls) is not list or not all(type(c) is dict and type(c.get('args', None)) is list and 'method' in c for c in calls):
+            raise APIError(BATCH_MUST_BE_A_LIST)
+        return jsonify(gateway.call_many(calls))
+
+    @app.route("/stats", methods = ['GET'])
+    def stats():
+        return jsonify(gateway.stats())
+
+    @app.route("/metrics", methods = ['GET'])
+    def metrics():
+        if not isinstance(gateway.client.metrics, MetricsRegistry):
+            return jsonify("metrics are not kept in process"), 404
+        return Response(gateway.client.metrics.to_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    return app
+
+# a gateway over a new client, reads are cached and metrics kept unless `options` say otherwise
+def new_gateway(options, **gateway_options):
+    options = dict(options)
+    if options.get('cache_size', None) == None:
+        options['cache_size'] = DEFAULT_CACHE_SIZE
+    if options.get('metrics', None) == None:
+        options['metrics'] = MetricsRegistry()
+    return Gateway(new_client(options), **gateway_options)
+
+def main():
+    from dotenv import load_dotenv
+    from werkzeug.serving import make_server
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="bluzelle HTTP gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4562)
+    parser.add_argument("--max-batch-ops", type=int, default=DEFAULT_MAX_BATCH_OPS)
+    parser.add_argument("--batch-wait", type=float, default=DEFAULT_BATCH_WAIT_IN_SECONDS)
+    args = parser.parse_args()
+    gateway = new_gateway({
+        'mnemonic': os.getenv('MNEMONIC', ''),
+        'uuid':     os.getenv('UUID', ''),
+        'endpoint': os.getenv('ENDPOINT', ''),
+        'chain_id':  os.getenv('CHAIN_ID', ''),
+    }, max_batch_ops=args.max_batch_ops, batch_wait=args.batch_wait)
+    server = make_server(args.host, args.port, create_app(gateway), threaded=True)
+    print("bluzelle gateway at http://%s:%d" % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+import bech32
+from .mnemonic_utils import mnemonic_to_private_key, derive_public_key
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+IDENTITY_FILE_VERSION = b'\x02'
+IDENTITY_NONCE_SIZE = 12
+IDENTITY_SALT_FILE = 'salt'
+IDENTITY_SALT_SIZE = 16
+# scrypt cost, 4MB and tens of ms per identity read from disk
+IDENTITY_KDF_N = 2 ** 12
+IDENTITY_KDF_R = 8
+IDENTITY_KDF_P = 1
+
+# the keys and address derived from a mnemonic and hd path
+class Identity:
+    def __init__(self, private_key, public_key, address):
+        self.private_key = private_key
+        self.public_key = public_key
+        self.address = address
+
+    def to_bytes(self):
+        return self.private_key + self.public_key + self.address.encode('ascii')
+
+    @classmethod
+    def from_bytes(cls, b):
+        return Identity(b[:32], b[32:65], b[65:].decode('ascii'))
+
+# mnemonic to private key is a 2048 round pbkdf2 plus bip32 point
+# multiplications, so derived identities are kept per process and, with a
+# `cache_dir` and the `cryptography` package installed, encrypted on disk
+# across processes. Without `cryptography` nothing is written to disk.
+#
+# cache files are encrypted with AES-GCM under a key derived from the
+# mnemonic and hd path with scrypt, salted per directory, and named after an
+# hmac under that key. Files of earlier versions, encrypted with a homemade
+# cipher, are removed when found.
+class IdentityCache:
+    def __init__(self):
+        self.identities = {}
+        self.lock = threading.Lock()
+
+    def load(self, mnemonic, hd_path, address_prefix, cache_dir = None):
+        secret = IdentityCache.secret(mnemonic, hd_path, address_prefix)
+        with self.lock:
+            identity = self.identities.get(secret, None)
+        if identity != None:
+            return identity
+        if cache_dir != None and AESGCM != None:
+            IdentityCache.remove_legacy_file(cache_dir, secret)
+            identity = IdentityCache.load_file(cache_dir, secret, lambda: derive_identity(mnemonic, hd_path, address_prefix))
+        else:
+            identity = derive_identity(mnemonic, hd_path, address_prefix)
+        with self.lock:
+            self.identities[secret] = identity
+        return identity
+
+    def clear(self):
+        with self.lock:
+            self.identities.clear()
+
+    @classmethod
+    def secret(cls, mnemonic, hd_path, address_prefix):
+        return hashlib.sha256('\x00'.join([mnemonic, hd_path, address_prefix]).encode('utf-8')).digest()
+
+    @classmethod
+    def derive_key(cls, secret, salt):
+        return hashlib.scrypt(secret, salt=salt, n=IDENTITY_KDF_N, r=IDENTITY_KDF_R, p=IDENTITY_KDF_P, dklen=32)
+
+    # the identity in `cache_dir`, or `derive()`d and written there
+    @classmethod
+    def load_file(cls, cache_dir, secret, derive):
+        try:
+            salt = IdentityCache.read_salt(cache_dir)
+        except OSError:
+            # the cache is an optimization only
+            return derive()
+        key = IdentityCache.derive_key(secret, salt)
+        name = hmac.new(key, b'bluzelle-identity-id', hashlib.sha256).hexdigest()
+        identity = IdentityCache.read_file(os.path.join(cache_dir, name), key, name)
+        if identity == None:
+            identity = derive()
+            IdentityCache.write_file(cache_dir, name, key, identity)
+        return identity
+
+    # random salt of the directory, made on first use
+    @classmethod
+    def read_salt(cls, cache_dir):
+        path = os.path.join(cache_dir, IDENTITY_SALT_FILE)
+        try:
+            with open(path, 'rb') as f:
+                salt = f.read()
+            if len(salt) == IDENTITY_SALT_SIZE:
+                return salt
+        except FileNotFoundError:
+            pass
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        salt = os.urandom(IDENTITY_SALT_SIZE)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # another process made it first
+            with open(path, 'rb') as f:
+                return f.read()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(salt)
+        return salt
+
+    @classmethod
+    def read_file(cls, path, key, name):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:1] != IDENTITY_FILE_VERSION:
+            return None
+        nonce = data[1:1 + IDENTITY_NONCE_SIZE]
+        try:
+            return Identity.from_bytes(AESGCM(key).decrypt(nonce, data[1 + IDENTITY_NONCE_SIZE:], name.encode('ascii')))
+        except Exception:
+            return None
+
+    @classmethod
+    def write_file(cls, cache_dir, name, key, identity):
+        nonce = os.urandom(IDENTITY_NONCE_SIZE)
+        ciphertext = AESGCM(key).encrypt(nonce, identity.to_bytes(), name.encode('ascii'))
+        try:
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(IDENTITY_FILE_VERSION + nonce + ciphertext)
+            os.replace(tmp, os.path.join(cache_dir, name))
+        except OSError:
+            pass
+
+    # version 1 files, named after an hmac of the unsalted secret
+    @classmethod
+    def remove_legacy_file(cls, cache_dir, secret):
+        name = hmac.new(secret, b'bluzelle-identity-id', hashlib.sha256).hexdigest()
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
+
+def derive_identity(mnemonic, hd_path, address_prefix):
+    private_key = mnemonic_to_private_key(mnemonic, str_derivation_path=hd_path)
+    public_key = derive_public_key(private_key)
+    r = hashlib.new('ripemd160', hashlib.sha256(public_key).digest()).digest()
+    address = bech32.bech32_encode(address_prefix, bech32.convertbits(r, 8, 5, True))
+    return Identity(private_key, public_key, address)
+
+# shared by every client of the process
+identity_cache = IdentityCache()
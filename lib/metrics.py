@@ -0,0 +1,142 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PREFIX = "bluzelle_"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# metrics hook of a client, passed as the `metrics` option. The client calls
+#   observe(name, value, labels) for histograms, e.g. ('phase_seconds', 0.002, {'phase': 'sign'})
+#   inc(name, amount, labels) for counters, e.g. ('sent_bytes_total', 512, {})
+# subclass to forward them elsewhere, or use `MetricsRegistry` to keep them
+# in process
+class Metrics:
+    def observe(self, name, value, labels = None):
+        pass
+
+    def inc(self, name, amount = 1, labels = None):
+        pass
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+# in process counters and histograms, by name and labels, exported in the
+# prometheus text format with `to_prometheus()` or `serve_metrics`
+class MetricsRegistry(Metrics):
+    def __init__(self, buckets = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def series(self, name, kind):
+        metric = self.metrics.get(name, None)
+        if metric == None:
+            metric = self.metrics[name] = (kind, {})
+        return metric[1]
+
+    def observe(self, name, value, labels = None):
+        key = MetricsRegistry.labels_key(labels)
+        with self.lock:
+            series = self.series(name, HISTOGRAM)
+            histogram = series.get(key, None)
+            if histogram == None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount = 1, labels = None):
+        key = MetricsRegistry.labels_key(labels)
+        with self.lock:
+            series = self.series(name, COUNTER)
+            series[key] = series.get(key, 0) + amount
+
+    # counter value or histogram {count, sum} of a series, None if never recorded
+    def get(self, name, labels = None):
+        key = MetricsRegistry.labels_key(labels)
+        with self.lock:
+            kind, series = self.metrics.get(name, (None, {}))
+            value = series.get(key, None)
+            if kind == HISTOGRAM and value != None:
+                return {"count": value.count, "sum": value.sum}
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.metrics.clear()
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name in sorted(self.metrics.keys()):
+                kind, series = self.metrics[name]
+                full_name = METRICS_PREFIX + name
+                lines.append("# TYPE %s %s" % (full_name, kind))
+                for key in sorted(series.keys()):
+                    value = series[key]
+                    if kind == COUNTER:
+                        lines.append("%s%s %s" % (full_name, MetricsRegistry.format_labels(key), MetricsRegistry.format_value(value)))
+                        continue
+                    cumulative = 0
+                    for (le, count) in zip(list(self.buckets) + ["+Inf"], value.counts):
+                        cumulative += count
+                        labels = MetricsRegistry.format_labels(key + (("le", MetricsRegistry.format_value(le)),))
+                        lines.append("%s_bucket%s %d" % (full_name, labels, cumulative))
+                    lines.append("%s_sum%s %s" % (full_name, MetricsRegistry.format_labels(key), MetricsRegistry.format_value(value.sum)))
+                    lines.append("%s_count%s %d" % (full_name, MetricsRegistry.format_labels(key), value.count))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def labels_key(cls, labels):
+        if not labels:
+            return ()
+        return tuple(sorted((k, str(v)) for (k, v) in labels.items()))
+
+    @classmethod
+    def format_labels(cls, key):
+        if not key:
+            return ""
+        return "{%s}" % ",".join('%s="%s"' % (k, MetricsRegistry.escape(v)) for (k, v) in key)
+
+    @classmethod
+    def format_value(cls, value):
+        if type(value) is str or type(value) is int:
+            return str(value)
+        return repr(float(value))
+
+    @classmethod
+    def escape(cls, v):
+        return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# serve `registry` at http://host:port/metrics from a daemon thread, call
+# `shutdown()` on the returned server to stop
+def serve_metrics(registry, port = 9464, host = "127.0.0.1"):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("content-type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,343 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from .bluzelle import new_client, OptionsError, APIError, HD_PATH
+from .batch import Batch
+from .bulk import BulkWriter, DEFAULT_BULK_MAX_BYTES
+from .tracker import TxFuture
+
+ACCOUNTS_MUST_BE_AN_INT = 'accounts must be a positive int'
+MNEMONICS_MUST_BE_A_LIST = 'mnemonics must be a non empty list of strings'
+KEYS_OF_MANY_ACCOUNTS = 'keys %s belong to different pool accounts, write them in separate calls'
+HD_PATH_PREFIX = HD_PATH.rsplit('/', 1)[0]
+# the node's rejection of a write to a key owned by another account
+INCORRECT_OWNER = 'Incorrect Owner'
+# writes a key's owner makes, proving it owns the key
+OWNER_ENDPOINTS = ["/crud/create", "/crud/update", "/crud/multiupdate", "/crud/renewlease"]
+
+# spreads transactions over many signing accounts. Every account has its own
+# sequence, so writes from N accounts are not serialized behind each other and
+# N transactions fit in a block instead of one.
+#
+# Each call goes to the account with the fewest calls in flight, except that
+# keys with a write in flight stay on that account so writes to a key keep
+# their order, and keys the pool knows the owner of go to that account. The
+# pool learns owners from its own successful writes. Other keys (written
+# before a restart, by another client, ...) are routed best effort: a write
+# the node rejects with "Incorrect Owner" is tried again on the other
+# accounts. A call writing keys of different known owners is refused, a tx
+# is signed by one account. Queries go to the first account, which shares
+# its read cache, key filter and last write height with the others so
+# writes from any account show up in them.
+class PoolClient:
+    def __init__(self, clients):
+        self.clients = clients
+        clients[0].share_read_state(clients[1:])
+        self.inflight = [0] * len(clients)
+        self.locks = [threading.Lock() for _ in clients]
+        self.key_accounts = {}
+        # key => account owning it on chain, only the owner can write it
+        self.owners = {}
+        self.cond = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=len(clients), thread_name_prefix='bluzelle-pool')
+
+    def __len__(self):
+        return len(self.clients)
+
+    @property
+    def primary(self):
+        return self.clients[0]
+
+    # the account to write `keys` from, other than those `tried`
+    def acquire(self, keys, tried = ()):
+        with self.cond:
+            owners = set(self.owners[k] for k in keys if k in self.owners)
+            if len(owners) > 1:
+                raise APIError(KEYS_OF_MANY_ACCOUNTS % ', '.join(k for k in keys if k in self.owners))
+            pinned = list(owners) + [self.key_accounts[k][0] for k in keys if k in self.key_accounts]
+            pinned = [i for i in pinned if not (i in tried)]
+            if pinned:
+                i = pinned[0]
+            else:
+                i = min((i for i in range(len(self.clients)) if not (i in tried)), key=lambda i: self.inflight[i])
+            self.inflight[i] += 1
+            for k in keys:
+                _, count = self.key_accounts.get(k, (i, 0))
+                self.key_accounts[k] = (i, count + 1)
+            return i
+
+    def release(self, i, keys):
+        with self.cond:
+            self.inflight[i] -= 1
+            for k in keys:
+                _, count = self.key_accounts[k]
+                if count == 1:
+                    del self.key_accounts[k]
+                else:
+                    self.key_accounts[k] = (i, count - 1)
+
+    # ownership changes of the [(endpoint, payload)] `ops` committed from account `i`
+    def own(self, i, ops):
+        with self.cond:
+            for (endpoint, payload) in ops:
+                if endpoint == "/crud/rename":
+                    self.owners.pop(payload["Key"], None)
+                    self.owners[payload["NewKey"]] = i
+                elif endpoint == "/crud/delete":
+                    self.owners.pop(payload["Key"], None)
+                elif endpoint in OWNER_ENDPOINTS:
+                    for key in [payload["Key"]] if "Key" in payload else [kv['key'] for kv in payload["KeyValues"]]:
+                        self.owners[key] = i
+
+    # whether a call rejected with `error` after trying accounts `tried` goes to
+    # another account: the owner of its keys is not who the pool thought
+    def reroutes(self, error, keys, tried):
+        if not (isinstance(error, APIError) and INCORRECT_OWNER in error.message):
+            return False
+        with self.cond:
+            for k in keys:
+                if self.owners.get(k, None) in tried:
+                    del self.owners[k]
+        return len(tried) < len(self.clients)
+
+    # run `method` on the owner of `keys` or else the least busy account,
+    # blocking while the account finishes its previous transaction. `ops`
+    # are the writes the call makes, they move ownership once committed
+    def dispatch(self, keys, method, *args, ops = (), tried = ()):
+        while True:
+            i = self.acquire(keys, tried)
+            try:
+                with self.locks[i]:
+                    res = getattr(self.clients[i], method)(*args)
+            except Exception as e:
+                if not self.reroutes(e, keys, tried + (i,)):
+                    raise
+                tried += (i,)
+                continue
+            finally:
+                self.release(i, keys)
+            break
+        if not isinstance(res, Future):
+            self.own(i, ops)
+            return res
+        # sync/async broadcast modes: the tx landed or was rejected once `res` resolves
+        future = TxFuture(getattr(res, 'txhash', None))
+        def done(f):
+            error = f.exception()
+            if error == None:
+                self.own(i, ops)
+                future.set_result(f.result())
+            elif self.reroutes(error, keys, tried + (i,)):
+                retry = self.executor.submit(self.dispatch, keys, method, *args, ops=ops, tried=tried + (i,))
+                PoolClient.forward(retry, future)
+            else:
+                future.set_exception(error)
+        res.add_done_callback(done)
+        return future
+
+    # resolve `future` with the outcome of `source`, following futures it resolves to
+    @classmethod
+    def forward(cls, source, future):
+        def done(f):
+            error = f.exception()
+            if error != None:
+                future.set_exception(error)
+            elif isinstance(f.result(), Future):
+                PoolClient.forward(f.result(), future)
+            else:
+                future.set_result(f.result())
+        source.add_done_callback(done)
+
+    # same as calling `method` but returns a future, runs on the pool's own
+    # threads (one per account)
+    def submit(self, method, *args):
+        return self.executor.submit(getattr(self, method), *args)
+
+    def stats(self):
+        with self.cond:
+            return [{
+                "address": c.address,
+                "inflight": self.inflight[i],
+                "sequence": c.bluzelle_account['sequence'],
+            } for (i, c) in enumerate(self.clients)]
+
+    # mutate methods
+
+    def create(self, key, value, gas_info, lease_info = None):
+        return self.dispatch([key], 'create', key, value, gas_info, lease_info, ops=[("/crud/create", {"Key": key})])
+
+    def update(self, key, value, gas_info, lease_info = None):
+        return self.dispatch([key], 'update', key, value, gas_info, lease_info, ops=[("/crud/update", {"Key": key})])
+
+    def delete(self, key, gas_info):
+        return self.dispatch([key], 'delete', key, gas_info, ops=[("/crud/delete", {"Key": key})])
+
+    def rename(self, key, new_key, gas_info):
+        return self.dispatch([key, new_key], 'rename', key, new_key, gas_info, ops=[("/crud/rename", {"Key": key, "NewKey": new_key})])
+
+    def multi_update(self, payload, gas_info):
+        return self.dispatch([kv['key'] for kv in payload], 'multi_update', payload, gas_info, ops=[("/crud/multiupdate", {"KeyValues": payload})])
+
+    def renew_lease(self, key, gas_info, lease_info = None):
+        return self.dispatch([key], 'renew_lease', key, gas_info, lease_info, ops=[("/crud/renewlease", {"Key": key})])
+
+    # every account, keys belong to the account that wrote them
+    def delete_all(self, gas_info):
+        for i in range(len(self.clients)):
+            with self.locks[i]:
+                self.clients[i].delete_all(gas_info)
+            with self.cond:
+                self.owners = {k: o for (k, o) in self.owners.items() if o != i}
+
+    def renew_all_leases(self, *args, **kwargs):
+        return self.renew_lease_all(*args, **kwargs)
+
+    def renew_lease_all(self, gas_info, lease_info = None):
+        for i in range(len(self.clients)):
+            with self.locks[i]:
+                self.clients[i].renew_lease_all(gas_info, lease_info)
+
+    def batch(self):
+        return PoolBatch(self)
+
+    # chunks are committed concurrently, one per account at a time
+    def bulk_write(self, items, gas_info, upsert = False, lease_info = None, max_bytes = DEFAULT_BULK_MAX_BYTES, max_gas = None, offline = True):
+        return PoolBulkWriter(self, gas_info, upsert, lease_info, max_bytes, max_gas, offline).write(items)
+
+    def commit_batch(self, batch, gas_info):
+        keys = [payload[k] for (_, _, payload, _) in batch.ops for k in ["Key", "NewKey"] if k in payload]
+        ops = [(endpoint, payload) for (_, endpoint, payload, _) in batch.ops]
+        return self.dispatch(keys, 'commit_batch', batch, gas_info, ops=ops)
+
+    # query tx methods
+
+    def tx_read(self, key, gas_info):
+        return self.dispatch([key], 'tx_read', key, gas_info)
+
+    def tx_has(self, key, gas_info):
+        return self.dispatch([key], 'tx_has', key, gas_info)
+
+    def tx_count(self, gas_info):
+        return self.dispatch([], 'tx_count', gas_info)
+
+    def tx_keys(self, gas_info):
+        return self.dispatch([], 'tx_keys', gas_info)
+
+    def tx_key_values(self, gas_info):
+        return self.dispatch([], 'tx_key_values', gas_info)
+
+    def tx_get_lease(self, key, gas_info):
+        return self.dispatch([key], 'tx_get_lease', key, gas_info)
+
+    def tx_get_n_shortest_leases(self, n, gas_info):
+        return self.dispatch([], 'tx_get_n_shortest_leases', n, gas_info)
+
+    # query methods
+
+    def account(self):
+        return self.primary.account()
+
+    def version(self):
+        return self.primary.version()
+
+    def read(self, key, proof = None):
+        return self.primary.read(key, proof)
+
+    def has(self, key):
+        return self.primary.has(key)
+
+    def count(self):
+        return self.primary.count()
+
+    def keys(self):
+        return self.primary.keys()
+
+    def key_values(self):
+        return self.primary.key_values()
+
+    def read_many(self, keys, proof = None):
+        return self.primary.read_many(keys, proof)
+
+    def has_many(self, keys):
+        return self.primary.has_many(keys)
+
+    def get_lease_many(self, keys):
+        return self.primary.get_lease_many(keys)
+
+    def iter_keys(self, limit = None):
+        return self.primary.iter_keys(limit)
+
+    def iter_key_values(self, limit = None):
+        return self.primary.iter_key_values(limit)
+
+    def get_lease(self, key):
+        return self.primary.get_lease(key)
+
+    def get_n_shortest_leases(self, n):
+        return self.primary.get_n_shortest_leases(n)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for c in self.clients:
+            c.close()
+
+# `Batch` committed through the pool, on the account owning its keys
+class PoolBatch(Batch):
+    def __init__(self, pool):
+        super().__init__(pool.primary)
+        self.pool = pool
+
+    def commit(self, gas_info):
+        return self.pool.commit_batch(self, gas_info)
+
+# `BulkWriter` handing chunks to the pool's threads as they are read, keeping
+# at most one more chunk per account queued. A chunk writing keys of earlier
+# chunks waits for them to land, it then goes to the account owning them
+class PoolBulkWriter(BulkWriter):
+    def __init__(self, pool, *args):
+        super().__init__(pool.primary, *args)
+        self.pool = pool
+
+    def write(self, items):
+        slots = threading.BoundedSemaphore(len(self.pool) * 2)
+        def commit(chunk, repeated):
+            try:
+                return self.commit(chunk, repeated)
+            finally:
+                slots.release()
+        futures = []
+        for (chunk, repeated) in self.chunks(items):
+            if repeated:
+                wait(futures)
+                BulkWriter.wait_landed([f.result() for f in futures if f.exception() == None])
+            slots.acquire()
+            futures.append(self.pool.executor.submit(commit, chunk, repeated))
+        return [f.result() for f in futures]
+
+    def commit_batch(self, batch):
+        return self.pool.commit_batch(batch, self.gas_info)
+
+# initialize a pool of clients sharing one transport with provided `options`,
+# same as `new_client` plus one of
+#   @optional accounts number of accounts derived from `mnemonic` at consecutive
+#       hd indexes (m/44'/118'/0'/0/0, .../1, ...)
+#   @optional mnemonics list of mnemonics, one account each
+def new_pool_client(options):
+    options = dict(options)
+    mnemonics = options.pop('mnemonics', None)
+    accounts = options.pop('accounts', None)
+    if mnemonics != None:
+        if type(mnemonics) is not list or not mnemonics or any(type(m) != str for m in mnemonics):
+            raise OptionsError(MNEMONICS_MUST_BE_A_LIST)
+        account_options = [dict(options, mnemonic=m) for m in mnemonics]
+    else:
+        if type(accounts) is not int or accounts <= 0:
+            raise OptionsError(ACCOUNTS_MUST_BE_AN_INT)
+        account_options = [dict(options, hd_path='%s/%d' % (HD_PATH_PREFIX, i)) for i in range(accounts)]
+
+    first = new_client(account_options[0])
+    clients = [first]
+    for o in account_options[1:]:
+        o['transport'] = first.transport
+    with ThreadPoolExecutor(max_workers=len(account_options)) as executor:
+        clients.extend(executor.map(new_client, account_options[1:]))
+    return PoolClient(clients)
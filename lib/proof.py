@@ -0,0 +1,214 @@
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+# proofs of `abci_query` with `prove=true` are a chain of two ops: the value
+# in the module's iavl store, then the store's root in the multistore, whose
+# root is the app hash of the block header at the next height
+PROOF_OP_IAVL_VALUE = "iavl:v"
+PROOF_OP_MULTISTORE = "multistore"
+DEFAULT_VERIFIED_HEIGHTS = 100
+
+class ProofError(Exception):
+    pass
+
+# amino (protobuf compatible) binary encoding, as far as proofs need it
+
+def uvarint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+# zigzag varint, which amino hashes ints with
+def varint(n):
+    return uvarint((n << 1) ^ (n >> 63))
+
+def byte_slice(b):
+    return uvarint(len(b)) + b
+
+def read_uvarint(buf, i):
+    n = 0
+    shift = 0
+    while True:
+        if i >= len(buf):
+            raise ProofError("truncated varint")
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+# `[(field number, int or bytes)]` as a message, zero ints and empty bytes are left out
+def encode_fields(fields):
+    out = b""
+    for (num, value) in fields:
+        if type(value) is int:
+            if value != 0:
+                out += uvarint(num << 3) + uvarint(value & 0xffffffffffffffff)
+        elif value:
+            out += uvarint(num << 3 | 2) + byte_slice(value)
+    return out
+
+# field number => list of values of a message, ints for varints and bytes for the rest
+def decode_fields(buf):
+    fields = {}
+    i = 0
+    while i < len(buf):
+        tag, i = read_uvarint(buf, i)
+        num, wire_type = tag >> 3, tag & 7
+        if wire_type == 0:
+            value, i = read_uvarint(buf, i)
+            if value >= 1 << 63:
+                value -= 1 << 64
+        elif wire_type == 2:
+            n, i = read_uvarint(buf, i)
+            if i + n > len(buf):
+                raise ProofError("truncated field %d" % num)
+            value = buf[i:i + n]
+            i += n
+        else:
+            raise ProofError("unexpected wire type %d" % wire_type)
+        fields.setdefault(num, []).append(value)
+    return fields
+
+def field(fields, num, default):
+    return fields.get(num, [default])[0]
+
+def unprefix(data):
+    n, i = read_uvarint(data, 0)
+    if i + n != len(data):
+        raise ProofError("bad length prefix")
+    return data[i:]
+
+# hashing
+
+def sha256(b):
+    return hashlib.sha256(b).digest()
+
+def leaf_hash(key, value_hash, version):
+    return sha256(varint(0) + varint(1) + varint(version) + byte_slice(key) + byte_slice(value_hash))
+
+# hash of an inner node on the path to a leaf, `child` is the hash of the side
+# the path goes down, the other one is in the node
+def inner_hash(height, size, version, left, right, child):
+    out = varint(height) + varint(size) + varint(version)
+    if not left:
+        out += byte_slice(child) + byte_slice(right)
+    else:
+        out += byte_slice(left) + byte_slice(child)
+    return sha256(out)
+
+# rfc 6962 merkle root, tendermint's `SimpleHashFromByteSlices`
+def simple_hash(items):
+    if len(items) == 0:
+        return b""
+    if len(items) == 1:
+        return sha256(b"\x00" + items[0])
+    k = 1
+    while k * 2 < len(items):
+        k *= 2
+    return sha256(b"\x01" + simple_hash(items[:k]) + simple_hash(items[k:]))
+
+# app hash of a multistore from the (name, commit hash) of its stores
+def multistore_root(store_infos):
+    return simple_hash([byte_slice(name.encode("utf-8")) + byte_slice(sha256(sha256(h))) for (name, h) in sorted(store_infos)])
+
+# proof ops
+
+# (key, value hash, version of the leaf, [(height, size, version, left, right)] from the root down)
+def decode_value_op(data):
+    op = decode_fields(unprefix(data))
+    proof = decode_fields(field(op, 1, b""))
+    if 2 in proof or len(proof.get(3, [])) != 1:
+        raise ProofError("only single key existence proofs are supported")
+    path = []
+    for node in proof.get(1, []):
+        node = decode_fields(node)
+        path.append((field(node, 1, 0), field(node, 2, 0), field(node, 3, 0), field(node, 4, b""), field(node, 5, b"")))
+    leaf = decode_fields(proof[3][0])
+    return field(leaf, 1, b""), field(leaf, 2, b""), field(leaf, 3, 0), path
+
+# [(store name, commit hash)]
+def decode_multistore_op(data):
+    op = decode_fields(unprefix(data))
+    proof = decode_fields(field(op, 1, b""))
+    infos = []
+    for info in proof.get(1, []):
+        info = decode_fields(info)
+        core = decode_fields(field(info, 2, b""))
+        commit_id = decode_fields(field(core, 1, b""))
+        infos.append((field(info, 1, b"").decode("utf-8"), field(commit_id, 2, b"")))
+    return infos
+
+def check_op(op, op_type, key):
+    if op.get('type', None) != op_type:
+        raise ProofError("expected a %s op, got %s" % (op_type, op.get('type', None)))
+    if base64.b64decode(op.get('key', None) or "") != key:
+        raise ProofError("%s op is for another key" % op_type)
+    return base64.b64decode(op.get('data', None) or "")
+
+# root of the iavl store holding `value` at `key`, as proven by `op`
+def verify_value_op(op, key, value):
+    leaf_key, value_hash, version, path = decode_value_op(check_op(op, PROOF_OP_IAVL_VALUE, key))
+    if leaf_key != key:
+        raise ProofError("leaf is for another key")
+    if value_hash != sha256(value):
+        raise ProofError("value does not match the proof")
+    h = leaf_hash(leaf_key, value_hash, version)
+    for (height, size, version, left, right) in reversed(path):
+        h = inner_hash(height, size, version, left, right, h)
+    return h
+
+# check the root of `store` is `store_root` in a multistore whose root is `app_hash`
+def verify_multistore_op(op, store, store_root, app_hash):
+    infos = decode_multistore_op(check_op(op, PROOF_OP_MULTISTORE, store.encode("utf-8")))
+    if dict(infos).get(store, None) != store_root:
+        raise ProofError("%s store root does not match the proof" % store)
+    if multistore_root(infos) != app_hash:
+        raise ProofError("app hash does not match the proof")
+
+# store roots already verified against a trusted app hash, for the last
+# `max_heights` heights. Proofs of other keys at the same height then only
+# need their iavl path checked.
+class VerifiedRoots:
+    def __init__(self, max_heights = DEFAULT_VERIFIED_HEIGHTS):
+        self.max_heights = max_heights
+        self.heights = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, height):
+        with self.lock:
+            return self.heights.get(height, (None, {}))[0]
+
+    # whether `root` is the verified root of `store` at `height`
+    def verified(self, height, store, root):
+        with self.lock:
+            verified = self.heights.get(height, (None, {}))[1].get(store, None) == root
+            if verified:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return verified
+
+    def add(self, height, app_hash, store, root):
+        with self.lock:
+            _, stores = self.heights.setdefault(height, (app_hash, {}))
+            stores[store] = root
+            self.heights.move_to_end(height)
+            while len(self.heights) > self.max_heights:
+                self.heights.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "heights": len(self.heights),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
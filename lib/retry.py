@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+
+DEFAULT_MAX_RETRIES = 10
+DEFAULT_BASE_DELAY_IN_SECONDS = 0.05
+DEFAULT_MAX_DELAY_IN_SECONDS = 1
+DEFAULT_DEADLINE_IN_SECONDS = 30
+
+# how long to wait between attempts of an operation: exponential backoff from
+# `base_delay` up to `max_delay` with half of each delay jittered, so writers
+# racing for a sequence spread out. An operation gives up after `max_retries`
+# retries or once the next wait would go past `deadline` seconds since it
+# started. Call `start()` per operation; the policy itself only keeps totals.
+class RetryPolicy:
+    def __init__(self, max_retries = DEFAULT_MAX_RETRIES, base_delay = DEFAULT_BASE_DELAY_IN_SECONDS, max_delay = DEFAULT_MAX_DELAY_IN_SECONDS, deadline = DEFAULT_DEADLINE_IN_SECONDS):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.retried = 0
+        self.exhausted = 0
+        self.wait_seconds = 0.0
+        self.recovered_sequences = 0
+        self.account_queries = 0
+
+    def start(self):
+        return Retry(self)
+
+    def delay(self, attempt):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def record(self, first, delay):
+        with self.lock:
+            if delay == None:
+                self.exhausted += 1
+                return
+            self.retries += 1
+            self.wait_seconds += delay
+            if first:
+                self.retried += 1
+
+    # whether the sequence came from the node's error or an account query
+    def record_recovery(self, parsed):
+        with self.lock:
+            if parsed:
+                self.recovered_sequences += 1
+            else:
+                self.account_queries += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "retries": self.retries,
+                "retried": self.retried,
+                "exhausted": self.exhausted,
+                "wait_seconds": self.wait_seconds,
+                "recovered_sequences": self.recovered_sequences,
+                "account_queries": self.account_queries,
+            }
+
+# retry state of one operation
+class Retry:
+    def __init__(self, policy):
+        self.policy = policy
+        self.started_at = time.time()
+        self.attempts = 0
+        self.gas_attempts = 0
+
+    # seconds to wait before the next attempt, None to give up
+    def next_delay(self):
+        delay = None
+        if self.attempts < self.policy.max_retries:
+            delay = self.policy.delay(self.attempts)
+            if time.time() + delay - self.started_at > self.policy.deadline:
+                delay = None
+        self.policy.record(self.attempts == 0, delay)
+        if delay != None:
+            self.attempts += 1
+        return delay
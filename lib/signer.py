@@ -0,0 +1,59 @@
+import base64
+import hashlib
+from ecdsa import SigningKey, SECP256k1
+from ecdsa.util import sigencode_string_canonize
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+SIGNER_AUTO = "auto"
+SIGNER_ECDSA = "ecdsa"
+SIGNER_SECP256K1 = "secp256k1"
+SIGNERS = [SIGNER_AUTO, SIGNER_ECDSA, SIGNER_SECP256K1]
+COINCURVE_IS_REQUIRED = 'coincurve is required for the secp256k1 signer (pip install coincurve)'
+
+# signs sha256 digests of payloads with a secp256k1 key, producing the 64 byte
+# r || s signatures tendermint expects. Signatures are deterministic (rfc6979)
+# and low-s normalized, so every backend produces the same bytes.
+#
+# the public key strings are computed once up front as they go in every tx
+class Signer:
+    def __init__(self, private_key, public_key):
+        self.public_key = public_key
+        self.pub_key_string = base64.b64encode(public_key).decode("utf-8")
+
+    def sign(self, payload):
+        raise NotImplementedError
+
+# pure python fallback on top of python-ecdsa
+class EcdsaSigner(Signer):
+    def __init__(self, private_key, public_key):
+        super().__init__(private_key, public_key)
+        self.signing_key = SigningKey.from_string(private_key, curve=SECP256k1)
+
+    def sign(self, payload):
+        return self.signing_key.sign_deterministic(payload, hashfunc=hashlib.sha256, sigencode=sigencode_string_canonize)
+
+# libsecp256k1 through coincurve, when installed
+class Secp256k1Signer(Signer):
+    def __init__(self, private_key, public_key):
+        if coincurve == None:
+            raise ImportError(COINCURVE_IS_REQUIRED)
+        super().__init__(private_key, public_key)
+        self.signing_key = coincurve.PrivateKey(private_key)
+
+    def sign(self, payload):
+        # recoverable signatures are r || s || recovery id
+        return self.signing_key.sign_recoverable(payload, hasher=Secp256k1Signer.sha256)[:64]
+
+    @classmethod
+    def sha256(cls, payload):
+        return hashlib.sha256(payload).digest()
+
+# `auto` picks libsecp256k1 when available and falls back to python-ecdsa
+def new_signer(private_key, public_key, backend = SIGNER_AUTO):
+    if backend == SIGNER_SECP256K1 or (backend == SIGNER_AUTO and coincurve != None):
+        return Secp256k1Signer(private_key, public_key)
+    return EcdsaSigner(private_key, public_key)
@@ -0,0 +1,89 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+
+# coalesces concurrent identical calls: the first caller of a key runs the
+# call, callers of the same key arriving while it is in flight wait for it
+# and share its result or error. A call that starts after the flight landed
+# runs again. `forget()` makes calls starting from now on run again, e.g.
+# once a write may have changed their result. Every caller of a flight that
+# was joined gets its own deep copy of the result, so one mutating it does
+# not change it under the others.
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    # returns the result of `fn()` and whether it came from another caller's flight
+    def do(self, key, fn):
+        with self.lock:
+            self.calls += 1
+            flight = self.flights.get(key, None)
+            shared = flight != None
+            if shared:
+                self.deduplicated += 1
+                flight.joined += 1
+            else:
+                flight = self.flights[key] = Flight(Future())
+        if shared:
+            return copy.deepcopy(flight.future.result()), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.land(key, flight)
+            flight.future.set_exception(e)
+            raise
+        self.land(key, flight)
+        flight.future.set_result(result)
+        return SingleFlight.own(flight, result), False
+
+    # the caller's own copy of a flight's result. Once landed no one joins, so a
+    # flight nobody joined hands its result over as is
+    @classmethod
+    def own(cls, flight, result):
+        if flight.joined == 0:
+            return result
+        return copy.deepcopy(result)
+
+    def land(self, key, flight):
+        with self.lock:
+            if self.flights.get(key, None) is flight:
+                del self.flights[key]
+
+    def forget(self):
+        with self.lock:
+            self.flights.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self.flights),
+            }
+
+# `SingleFlight` of coroutines within one event loop. The flight runs as its
+# own task so a cancelled caller does not cancel it for the others.
+class AsyncSingleFlight(SingleFlight):
+    async def do(self, key, fn):
+        with self.lock:
+            self.calls += 1
+            flight = self.flights.get(key, None)
+            shared = flight != None
+            if shared:
+                self.deduplicated += 1
+                flight.joined += 1
+            else:
+                flight = self.flights[key] = Flight(asyncio.ensure_future(fn()))
+                flight.future.add_done_callback(lambda t: self.land(key, flight))
+        result = await asyncio.shield(flight.future)
+        return SingleFlight.own(flight, result), shared
+
+# a call in flight: its future (or task) and how many callers joined it
+class Flight:
+    def __init__(self, future):
+        self.future = future
+        self.joined = 0
@@ -0,0 +1,116 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+MALFORMED_STREAM = 'malformed response stream'
+
+# incremental parser pulling the items of one array out of a json document
+# as it downloads, e.g. the keys of {"height":"1","result":{"keys":[...]}}.
+# Only the item being parsed is buffered, so memory stays bounded by the
+# largest item rather than the whole response.
+#
+# Everything before the array is kept, so a document without the array
+# (an error response) is returned whole by `close`. A null array (amino's
+# nil slice, e.g. the keys of an empty uuid) has no items.
+class JSONArrayParser:
+    def __init__(self, name):
+        self.name = name
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.done = False
+
+    # returns the items completed by `chunk`
+    def feed(self, chunk):
+        self.buffer += self.utf8.decode(chunk)
+        if not self.in_array:
+            self.find_array()
+        if not self.in_array or self.done:
+            return []
+        items = self.parse_items()
+        # drop parsed items from the buffer
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        return items
+
+    # end of the stream, returns the document if it had no such array
+    def close(self):
+        self.buffer += self.utf8.decode(b'', final=True)
+        if self.done:
+            return None
+        if self.in_array:
+            raise ValueError(MALFORMED_STREAM)
+        return json.loads(self.buffer)
+
+    def skip_whitespace(self, pos):
+        while pos < len(self.buffer) and self.buffer[pos] in WHITESPACE:
+            pos += 1
+        return pos
+
+    # scan for the `"name": [` (or `"name": null`) member, strings are skipped
+    # whole so their contents never match. Stops at the start of an incomplete token.
+    def find_array(self):
+        buf = self.buffer
+        pos = self.pos
+        while pos < len(buf):
+            if buf[pos] != '"':
+                pos += 1
+                continue
+            try:
+                s, end = json.decoder.scanstring(buf, pos + 1)
+            except json.JSONDecodeError:
+                break
+            colon = self.skip_whitespace(end)
+            if colon == len(buf):
+                break
+            if buf[colon] != ':':
+                pos = end
+                continue
+            bracket = self.skip_whitespace(colon + 1)
+            if bracket == len(buf):
+                break
+            if s == self.name and buf[bracket] == '[':
+                self.in_array = True
+                self.buffer = buf[bracket + 1:]
+                self.pos = 0
+                return
+            if s == self.name and buf[bracket] == 'n':
+                if len(buf) - bracket < len('null'):
+                    break
+                if buf.startswith('null', bracket):
+                    self.in_array = True
+                    self.done = True
+                    self.buffer = ''
+                    self.pos = 0
+                    return
+            pos = bracket
+        self.pos = pos
+
+    def parse_items(self):
+        items = []
+        buf = self.buffer
+        pos = self.pos
+        while True:
+            pos = self.skip_whitespace(pos)
+            if pos == len(buf):
+                break
+            if buf[pos] == ']':
+                self.done = True
+                pos += 1
+                break
+            if buf[pos] == ',':
+                pos += 1
+                continue
+            try:
+                item, end = self.decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break
+            # a number could still be cut short
+            if end == len(buf):
+                break
+            items.append(item)
+            pos = end
+        self.pos = pos
+        return items
@@ -0,0 +1,178 @@
+import contextvars
+import json
+import random
+import threading
+import time
+from collections import deque
+
+DEFAULT_SAMPLE_RATE = 1
+DEFAULT_MAX_SPANS = 1000
+
+# span of the client call currently running in this thread or task
+active_span = contextvars.ContextVar('bluzelle_active_span', default=None)
+
+# span of a client call or of one of its http requests. Spans nest through
+# `active_span` while used as a context manager:
+#
+#   with tracer.span("create", {"key": key}) as span:
+#       span.event("retry", attempt=1)
+#
+# finished child spans are kept on their parent, finished root spans are
+# handed to the tracer's exporter. Payloads (request and response bodies,
+# sign bytes) are only attached when `capture_payloads` is set, check it
+# before building them.
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, parent = None, attributes = None):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent != None else '%016x' % random.getrandbits(64)
+        self.span_id = '%08x' % random.getrandbits(32)
+        self.capture_payloads = tracer.capture_payloads
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.children = []
+        self.error = None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.token = None
+
+    def set(self, name, value):
+        self.attributes[name] = value
+
+    def event(self, name, **attributes):
+        self.events.append((time.perf_counter() - self.start, name, attributes))
+
+    def finish(self, error = None):
+        if self.duration != None:
+            return
+        self.duration = time.perf_counter() - self.start
+        if error != None:
+            self.error = repr(error)
+        if self.parent != None:
+            self.parent.children.append(self)
+        else:
+            self.tracer.export(self)
+
+    def __enter__(self):
+        self.token = active_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        active_span.reset(self.token)
+        self.finish(exc)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "events": [{"at": at, "name": name, "attributes": attributes} for (at, name, attributes) in self.events],
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+# stands in for every span when tracing is off or the call was not sampled
+class NoopSpan:
+    recording = False
+    capture_payloads = False
+
+    def set(self, name, value):
+        pass
+
+    def event(self, name, **attributes):
+        pass
+
+    def finish(self, error = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+# root of a call that was not sampled, its nested spans are not recorded either
+class UnsampledSpan(NoopSpan):
+    def __enter__(self):
+        self.token = active_span.set(NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        active_span.reset(self.token)
+
+# the active span, or a no-op one
+def current_span():
+    return active_span.get() or NOOP_SPAN
+
+# creates spans for a client, passed as the `tracer` option. `sample_rate` is
+# the fraction of client calls traced, a call's http requests are traced
+# along with it. Finished calls go to `exporter(span)` when given, otherwise
+# the last `max_spans` are kept for `finished()`.
+class Tracer:
+    def __init__(self, sample_rate = DEFAULT_SAMPLE_RATE, capture_payloads = False, exporter = None, max_spans = DEFAULT_MAX_SPANS):
+        self.sample_rate = sample_rate
+        self.capture_payloads = capture_payloads
+        self.exporter = exporter
+        self.spans = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    def span(self, name, attributes = None):
+        parent = active_span.get()
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN
+        # e.g. a task started from a call that has returned since
+        if parent != None and parent.duration != None:
+            parent = None
+        if parent == None and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return UnsampledSpan()
+        return Span(self, name, parent, attributes)
+
+    def export(self, span):
+        if self.exporter != None:
+            self.exporter(span)
+            return
+        with self.lock:
+            self.spans.append(span)
+
+    def finished(self):
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+
+# exporter writing each finished call to `logger` at debug level, one line per span:
+#   create 12.41ms {"key": "a"}
+#     http 3.02ms {"http.method": "post", "http.url": "..."}
+class LoggingExporter:
+    def __init__(self, logger):
+        self.logger = logger
+
+    def __call__(self, span):
+        lines = []
+        LoggingExporter.format(span, 0, lines)
+        self.logger.debug("\n".join(lines))
+
+    @classmethod
+    def format(cls, span, depth, lines):
+        indent = "  " * depth
+        line = "%s%s %.2fms" % (indent, span.name, span.duration * 1000)
+        if span.attributes:
+            line += " " + json.dumps(span.attributes, default=str)
+        if span.error != None:
+            line += " error=" + span.error
+        lines.append(line)
+        for (at, name, attributes) in span.events:
+            lines.append("%s  @%.2fms %s %s" % (indent, at * 1000, name, json.dumps(attributes, default=str)))
+        for child in span.children:
+            LoggingExporter.format(child, depth + 1, lines)
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from .tracing import active_span
+
+TX_POLL_INTERVAL_SECONDS = 1
+TX_POLL_BATCH_SIZE = 100
+TX_CONFIRMATION_TIMEOUT_SECONDS = 60
+
+# future of a broadcast transaction, resolves to the decoded tx result once
+# the transaction is included in a block
+class TxFuture(Future):
+    def __init__(self, txhash):
+        super().__init__()
+        self.txhash = txhash
+        self.created_at = time.perf_counter()
+
+# apply `fn` to a transaction result which may be a plain value (block mode)
+# or a future (sync/async modes), in which case a chained future is returned
+def then(result, fn):
+    if isinstance(result, Future):
+        future = TxFuture(getattr(result, 'txhash', None))
+        def done(f):
+            try:
+                future.set_result(fn(f.result()))
+            except Exception as e:
+                future.set_exception(e)
+        result.add_done_callback(done)
+        return future
+    if isinstance(result, asyncio.Future):
+        future = result.get_loop().create_future()
+        future.txhash = getattr(result, 'txhash', None)
+        def done(f):
+            if f.cancelled():
+                future.cancel()
+                return
+            try:
+                future.set_result(fn(f.result()))
+            except Exception as e:
+                future.set_exception(e)
+        result.add_done_callback(done)
+        return future
+    return fn(result)
+
+# resolves pending transaction hashes by polling `/txs/{hash}` from a
+# background thread, up to `batch_size` hashes per poll
+class TxTracker:
+    def __init__(self, client, poll_interval = TX_POLL_INTERVAL_SECONDS, batch_size = TX_POLL_BATCH_SIZE, timeout = TX_CONFIRMATION_TIMEOUT_SECONDS):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.pending = OrderedDict()
+        self.cond = threading.Condition()
+        self.worker = None
+        self.closed = False
+
+    def track(self, txhash):
+        future = TxFuture(txhash)
+        with self.cond:
+            self.pending[txhash] = (future, time.time())
+            if self.worker == None:
+                self.worker = threading.Thread(target=self.run, name='bluzelle-tx-tracker', daemon=True)
+                self.worker.start()
+            self.cond.notify()
+        return future
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                batch = list(self.pending.items())[:self.batch_size]
+            for (txhash, (future, submitted_at)) in batch:
+                if self.poll(txhash, future, submitted_at):
+                    with self.cond:
+                        self.pending.pop(txhash, None)
+            with self.cond:
+                if self.pending and not self.closed:
+                    self.cond.wait(self.poll_interval)
+
+    # returns whether the tx is resolved
+    def poll(self, txhash, future, submitted_at):
+        response = None
+        try:
+            response = self.client.api_query("/txs/%s" % txhash)
+        except Exception as e:
+            self.client.logger.debug('tx(%s) not found yet (%s)...', txhash, e)
+        if response != None:
+            self.client.resolve_transaction(future, response)
+            return True
+        if time.time() - submitted_at > self.timeout:
+            self.client.lose_transaction(future, self.timeout)
+            return True
+        return False
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for (future, _) in pending:
+            future.cancel()
+
+# asyncio flavour of `TxTracker`, each poll checks a batch of pending hashes
+# concurrently from a single task
+class AsyncTxTracker(TxTracker):
+    def track(self, txhash):
+        future = asyncio.get_running_loop().create_future()
+        future.txhash = txhash
+        future.created_at = time.perf_counter()
+        self.pending[txhash] = (future, time.time())
+        if self.worker == None or self.worker.done():
+            self.worker = asyncio.ensure_future(self.run())
+        return future
+
+    async def run(self):
+        # the task was started from inside the call that sent the first tx, its polls are not part of it
+        active_span.set(None)
+        while self.pending and not self.closed:
+            batch = list(self.pending.items())[:self.batch_size]
+            resolved = await asyncio.gather(*[self.poll(txhash, future, submitted_at) for (txhash, (future, submitted_at)) in batch])
+            for ((txhash, _), done) in zip(batch, resolved):
+                if done:
+                    self.pending.pop(txhash, None)
+            if self.pending:
+                await asyncio.sleep(self.poll_interval)
+
+    async def poll(self, txhash, future, submitted_at):
+        response = None
+        try:
+            response = await self.client.api_query("/txs/%s" % txhash)
+        except Exception as e:
+            self.client.logger.debug('tx(%s) not found yet (%s)...', txhash, e)
+        if response != None:
+            self.client.resolve_transaction(future, response)
+            return True
+        if time.time() - submitted_at > self.timeout:
+            self.client.lose_transaction(future, self.timeout)
+            return True
+        return False
+
+    def close(self):
+        self.closed = True
+        if self.worker != None:
+            self.worker.cancel()
+        for (future, _) in self.pending.values():
+            future.cancel()
+        self.pending.clear()
@@ -0,0 +1,86 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_TIMEOUT_IN_SECONDS = 30
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# base transport, subclass and pass as the `transport` client option to
+# route the client's http traffic elsewhere
+class Transport:
+    def request(self, method, url, data = None, headers = None):
+        raise NotImplementedError
+
+    # iterate over the response body in chunks of bytes as it downloads,
+    # transports that can't stream hand over the whole body at once
+    def stream(self, method, url, headers = None):
+        yield self.request(method, url, headers=headers).content
+
+    def stats(self):
+        return {
+            "requests": 0,
+            "connections": 0,
+            "reused": 0,
+        }
+
+    def close(self):
+        pass
+
+# keep-alive http transport backed by a pooled `requests.Session`
+#   @param pool_size max kept-alive connections per endpoint (host)
+#   @param pool_connections number of endpoint pools to keep around
+#   @param timeout connect/read timeout in seconds for every request
+#   @param verify tls certificate verification, shared by all requests so
+#       queries and mutations land in the same connection pool
+class HTTPTransport(Transport):
+    def __init__(self, pool_size = DEFAULT_POOL_SIZE, pool_connections = DEFAULT_POOL_CONNECTIONS, timeout = DEFAULT_TIMEOUT_IN_SECONDS, verify = True):
+        self.timeout = timeout
+        self.verify = verify
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def request(self, method, url, data = None, headers = None):
+        return self.session.request(
+            method,
+            url,
+            data=data,
+            headers=headers,
+            verify=self.verify,
+            timeout=self.timeout
+        )
+
+    def stream(self, method, url, headers = None):
+        response = self.session.request(
+            method,
+            url,
+            headers=headers,
+            verify=self.verify,
+            timeout=self.timeout,
+            stream=True
+        )
+        try:
+            yield from response.iter_content(STREAM_CHUNK_SIZE)
+        finally:
+            response.close()
+
+    # urllib3 keeps per pool counters of opened connections and requests made,
+    # every request beyond the opened connections went over a kept-alive one
+    def stats(self):
+        pools = self.adapter.poolmanager.pools
+        connections = 0
+        num_requests = 0
+        for k in pools.keys():
+            pool = pools[k]
+            connections += pool.num_connections
+            num_requests += pool.num_requests
+        return {
+            "requests": num_requests,
+            "connections": connections,
+            "reused": max(num_requests - connections, 0),
+        }
+
+    def close(self):
+        self.session.close()
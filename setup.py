@@ -21,8 +21,18 @@ setup(
     keywords="bluzelle tendermint cosmos",
     url="https://github.com/bluzelle/blzpy",
     install_requires=['requests', 'base58', 'ecdsa', 'bech32'],
+    extras_require={
+        'async': ['aiohttp'],
+        'secp256k1': ['coincurve'],
+        'orjson': ['orjson'],
+        'gateway': ['flask', 'python-dotenv'],
+        'identity_cache': ['cryptography'],
+    },
     packages=['bluzelle'],
     package_dir={'bluzelle': 'lib'},
+    entry_points={
+        'console_scripts': ['bluzelle-gateway=bluzelle.gateway:main'],
+    },
     classifiers=[
         "Topic :: Utilities",
     ],
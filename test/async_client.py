@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import json
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+
+class TestAsyncClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/crud/read/test/', lambda req: {
+            'result': {'value': req['path'].split('/')[-1]},
+        })
+        cls.node.route('GET', '/crud/has/test/', lambda req: {
+            'result': {'has': False},
+        })
+        cls.node.route('GET', '/crud/getnshortestleases/test/2', lambda req: {
+            'result': {'keyleases': [{'key': 'a', 'lease': '2'}]},
+        })
+        cls.node.route('POST', '/crud/read', lambda req: {
+            'value': {'msg': [{'type': 'crud/read', 'value': req['body']}], 'fee': {'gas': '100'}},
+        })
+        cls.broadcasts = []
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+
+    @classmethod
+    def on_broadcast(cls, req):
+        cls.broadcasts.append(req['body'])
+        key = req['body']['tx']['msg'][0]['value']['Key']
+        data = json.dumps({'value': key}).encode('ascii').hex()
+        return {'height': '1', 'txhash': 'AB', 'data': data}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def run_with_client(self, fn):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                return await fn(client)
+        return asyncio.run(run())
+
+    def test_concurrent_reads(self):
+        async def fn(client):
+            keys = ['%d' % i for i in range(50)]
+            values = await asyncio.gather(*[client.read(k) for k in keys])
+            return keys, values, client.transport_stats()
+        keys, values, stats = self.run_with_client(fn)
+        self.assertEqual(values, keys)
+        self.assertEqual(stats['requests'], 50)
+        self.assertTrue(stats['connections'] <= 10)
+
+    def test_shares_query_parsing(self):
+        async def fn(client):
+            return await client.has('foo'), await client.get_n_shortest_leases(2)
+        has, kls = self.run_with_client(fn)
+        self.assertFalse(has)
+        self.assertEqual(kls, [{'key': 'a', 'lease': 10}])
+
+    def test_shares_validation(self):
+        async def fn(client):
+            with self.assertRaisesRegex(bluzelle.OptionsError, 'Key cannot contain a slash'):
+                await client.read('a/b')
+            with self.assertRaisesRegex(bluzelle.APIError, 'Key must be a string'):
+                await client.has(1)
+        self.run_with_client(fn)
+
+    def test_tx_methods_sign_and_broadcast(self):
+        async def fn(client):
+            values = await asyncio.gather(*[client.tx_read(k, {'max_fee': 10}) for k in ['a', 'b']])
+            return values, client.bluzelle_account['sequence']
+        values, sequence = self.run_with_client(fn)
+        self.assertEqual(values, ['a', 'b'])
+        self.assertEqual(sequence, 2)
+        sequences = sorted(b['tx']['signatures'][0]['sequence'] for b in self.broadcasts[-2:])
+        self.assertEqual(sequences, ['0', '1'])
+        self.assertEqual(self.broadcasts[-1]['tx']['fee']['amount'][0]['amount'], '10')
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import json
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('POST', '/crud/', cls.on_validate)
+        cls.node.route('DELETE', '/crud/', cls.on_validate)
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.broadcasts = []
+
+    @classmethod
+    def on_validate(cls, req):
+        time.sleep(cls.build_delay)
+        body = dict(req['body'])
+        del body['BaseReq']
+        return {
+            'value': {
+                'msg': [{'type': 'crud' + req['path'][5:], 'value': body}],
+                'fee': {'gas': '100', 'amount': [{'denom': 'ubnt', 'amount': '10'}]},
+                'memo': '',
+                'signatures': None,
+            },
+        }
+
+    # query messages produce their key back as the value, data is concatenated
+    @classmethod
+    def on_broadcast(cls, req):
+        tx = req['body']['tx']
+        cls.broadcasts.append(tx)
+        data = ''
+        for msg in tx['msg']:
+            if msg['type'] == 'crud/read':
+                data += json.dumps({'value': msg['value']['Key']})
+            elif msg['type'] == 'crud/count':
+                data += json.dumps({'count': str(len(tx['msg']))})
+        res = {'height': '1', 'txhash': 'AB'}
+        if data:
+            res['data'] = data.encode('ascii').hex()
+        return res
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.build_delay = 0
+        self.client = new_offline_client({'endpoint': self.node.endpoint})
+
+    def test_commits_one_signed_transaction(self):
+        batch = self.client.batch()
+        for i in range(20):
+            batch.create('key%d' % i, 'value', {'seconds': 10})
+        batch.update('a', 'b').delete('c').rename('d', 'e').renew_lease('f')
+        results = batch.commit({'max_fee': 0})
+        self.assertEqual(results, [None] * 24)
+        tx = self.broadcasts[-1]
+        self.assertEqual(len(tx['msg']), 24)
+        self.assertEqual(len(tx['signatures']), 1)
+        self.assertEqual(tx['fee']['gas'], '2400')
+        self.assertEqual(tx['fee']['amount'][0]['amount'], '240')
+        self.assertEqual(tx['msg'][21]['type'], 'crud/delete')
+        self.assertEqual(self.client.bluzelle_account['sequence'], 1)
+
+    def test_builds_transactions_concurrently(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'concurrency': 8})
+        self.__class__.build_delay = 0.1
+        batch = client.batch()
+        for i in range(8):
+            batch.create('key%d' % i, 'value')
+        started_at = time.time()
+        batch.commit({})
+        self.assertLess(time.time() - started_at, 0.5)
+        self.assertEqual([m['value']['Key'] for m in self.broadcasts[-1]['msg']], ['key%d' % i for i in range(8)])
+        client.close()
+
+    def test_returns_per_op_results(self):
+        batch = self.client.batch().tx_read('x').create('y', 'v').tx_count().tx_read('z')
+        self.assertEqual(batch.commit({}), ['x', None, 4, 'z'])
+
+    def test_missing_query_results(self):
+        batch = self.client.batch().tx_read('x').tx_read('y')
+        with self.assertRaisesRegex(bluzelle.APIError, 'expected 2 query results in the transaction data, got 1'):
+            batch.results({'value': 'x'})
+        with self.assertRaisesRegex(bluzelle.APIError, 'got 0'):
+            batch.results(None)
+        self.assertEqual(batch.results([{'value': 'x'}, {'value': 'y'}]), ['x', 'y'])
+
+    def test_single_query_op(self):
+        self.assertEqual(self.client.batch().create('y', 'v').tx_read('x').commit({}), [None, 'x'])
+
+    def test_validates_ops(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'Key cannot contain a slash'):
+            self.client.batch().create('a/b', 'v')
+        with self.assertRaisesRegex(bluzelle.APIError, 'Batch has no operations'):
+            self.client.batch().commit({})
+
+    def test_sync_mode(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'broadcast_mode': 'sync'})
+        self.node.route('GET', '/txs/AB', lambda req: {
+            'height': '1', 'txhash': 'AB', 'data': json.dumps({'value': 'x'}).encode('ascii').hex(),
+        })
+        future = client.batch().tx_read('x').delete('y').commit({})
+        self.assertEqual(future.result(5), ['x', None])
+        client.close()
+
+    def test_async_client(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                return await client.batch().tx_read('p').tx_read('q').commit({})
+        self.assertEqual(asyncio.run(run()), ['p', 'q'])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import unittest
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.bloom import BloomFilter, KeyFilter
+
+class TestBloomFilter(unittest.TestCase):
+    def test_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = ['key%d' % i for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_respects_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add('key%d' % i)
+        fps = sum(1 for i in range(10000) if ('other%d' % i) in bloom)
+        self.assertTrue(fps < 300)
+
+class TestKeyFilter(unittest.TestCase):
+    def test_keeps_keys_added_during_resync(self):
+        f = KeyFilter()
+        self.assertTrue(f.might_contain('a'))
+        self.assertTrue(f.begin_sync())
+        self.assertFalse(f.begin_sync())
+        f.add('b')
+        f.finish_sync(['a'])
+        self.assertTrue(f.might_contain('a'))
+        self.assertTrue(f.might_contain('b'))
+        self.assertFalse(f.might_contain('c'))
+
+    def test_carries_keys_added_before_resync(self):
+        f = KeyFilter()
+        f.add('a')
+        self.assertTrue(f.begin_sync())
+        f.finish_sync([])
+        self.assertTrue(f.might_contain('a'))
+        f.add('b')
+        self.assertTrue(f.begin_sync())
+        f.fail_sync()
+        self.assertTrue(f.begin_sync())
+        f.finish_sync([])
+        self.assertTrue(f.might_contain('b'))
+        self.assertTrue(f.begin_sync())
+        f.finish_sync([])
+        self.assertFalse(f.might_contain('a'))
+        self.assertFalse(f.might_contain('b'))
+
+class TestClientKeyFilter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.queries = []
+        cls.node.route('GET', '/crud/keys/', cls.on_query)
+        cls.node.route('GET', '/crud/read/', cls.on_query)
+        cls.node.route('GET', '/crud/has/', cls.on_query)
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [], 'fee': {'gas': '1'}}})
+        cls.node.route('POST', '/txs', lambda req: {'height': '1', 'txhash': 'AB'})
+
+    @classmethod
+    def on_query(cls, req):
+        cls.queries.append(req['path'])
+        if req['path'].startswith('/crud/keys/'):
+            return {'result': {'keys': ['a', 'b']}}
+        if req['path'].startswith('/crud/has/'):
+            return {'result': {'has': True}}
+        return {'result': {'value': 'v'}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        del self.queries[:]
+        self.client = new_offline_client({'endpoint': self.node.endpoint, 'key_filter': True, 'key_filter_resync_interval': 60})
+
+    def test_answers_definite_misses_locally(self):
+        self.assertFalse(self.client.has('missing'))
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            self.client.read('missing')
+        self.assertEqual(self.queries, ['/crud/keys/test'])
+        self.assertTrue(self.client.has('a'))
+        self.assertEqual(self.client.read('b'), 'v')
+        self.assertEqual(len(self.queries), 3)
+        self.assertEqual(self.client.key_filter_stats()['negatives'], 2)
+
+    def test_tracks_own_writes(self):
+        self.client.has('a')
+        self.client.create('c', 'v', {})
+        self.client.rename('c', 'd', {})
+        self.assertTrue(self.client.has('c'))
+        self.assertTrue(self.client.has('d'))
+        self.client.delete_all({})
+        self.assertFalse(self.client.has('a'))
+
+    def test_resyncs_periodically(self):
+        self.client.key_filter.resync_interval = 0.05
+        self.client.has('a')
+        time.sleep(0.06)
+        self.client.has('a')
+        time.sleep(0.05)
+        self.assertEqual(self.client.key_filter_stats()['resyncs'], 2)
+
+    def test_validates_options(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'key_filter_fp_rate must be a number between 0 and 1'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'key_filter_fp_rate': 1})
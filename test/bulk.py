@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import threading
+from .util import new_offline_client, SAMPLE_MNEMONIC, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+from lib.emulator import NodeEmulator
+
+class TestBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.lock = threading.Lock()
+        cls.existing = {'a'}
+        cls.txs = []
+        cls.node.route('GET', '/auth/accounts/', lambda req: {'result': {'value': {'account_number': 1, 'sequence': 0}}})
+        cls.node.route('GET', '/crud/has/', lambda req: {'result': {'has': req['path'].split('/')[-1] in cls.existing}})
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.node.route('POST', '/crud/', cls.on_build)
+        cls.node.route('GET', '/txs/', lambda req: {'height': '2', 'txhash': 'H', 'raw_log': '[]'})
+
+    @classmethod
+    def on_broadcast(cls, req):
+        tx = req['body']['tx']
+        with cls.lock:
+            cls.txs.append(tx)
+            return {'height': '1', 'txhash': 'H%d' % len(cls.txs), 'raw_log': '[]'}
+
+    @classmethod
+    def on_build(cls, req):
+        with cls.lock:
+            cls.builds += 1
+        body = dict(req['body'])
+        del body['BaseReq']
+        return {'value': {'msg': [{'type': 'crud' + req['path'][5:], 'value': body}], 'fee': {'gas': '100'}, 'memo': '', 'signatures': None}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.txs.clear()
+        self.__class__.builds = 0
+
+    def new_client(self, cls = bluzelle.bluzelle.Client):
+        return new_offline_client({
+            'endpoint': self.node.endpoint,
+            'offline_transactions': True,
+            'offline_gas': 100,
+        }, cls)
+
+    def msgs(self):
+        return [[(m['type'], m['value']['Key']) for m in tx['msg']] for tx in self.txs]
+
+    def test_chunks_by_estimated_gas(self):
+        client = self.new_client()
+        rows = [('k%d' % i, 'v') for i in range(10)]
+        report = client.bulk_write(iter(rows), {'max_fee': 5, 'max_gas': 350})
+        self.assertEqual([r['keys'] for r in report], [3, 3, 3, 1])
+        self.assertEqual([r['estimated_gas'] for r in report], [300, 300, 300, 100])
+        self.assertEqual([r['max_fee'] for r in report], [5, 5, 5, 5])
+        self.assertEqual([len(tx['msg']) for tx in self.txs], [3, 3, 3, 1])
+        self.assertEqual([tx['signatures'][0]['sequence'] for tx in self.txs], ['0', '1', '2', '3'])
+        client.close()
+
+    def test_chunks_by_bytes(self):
+        client = self.new_client()
+        rows = [('k%d' % i, 'x' * 1000) for i in range(10)]
+        report = client.bulk_write(rows, {'gas_price': 1}, max_bytes=2500)
+        self.assertEqual([r['keys'] for r in report], [2, 2, 2, 2, 2])
+        self.assertTrue(all(r['bytes'] <= 2500 for r in report))
+        self.assertEqual(report[0]['max_fee'], 200)
+        client.close()
+
+    def test_upsert_updates_existing_keys(self):
+        client = self.new_client()
+        client.bulk_write([('a', '1'), ('b', '2'), ('b', '3')], {'max_fee': 1}, upsert=True)
+        self.assertEqual(self.msgs(), [[('crud/update', 'a'), ('crud/create', 'b'), ('crud/update', 'b')]])
+        client.close()
+
+    def test_keys_of_earlier_chunks_are_updated(self):
+        client = self.new_client()
+        client.options['broadcast_mode'] = 'sync'
+        client.options['confirmation_poll_interval'] = 0.01
+        rows = [('b', '1'), ('c', '1'), ('b', '2')]
+        for upsert in [True, False]:
+            self.txs.clear()
+            client.bulk_write(rows, {'max_fee': 1}, upsert=upsert, max_bytes=1)
+            self.assertEqual(self.msgs(), [[('crud/create', 'b')], [('crud/create', 'c')], [('crud/update', 'b')]])
+        client.close()
+
+    def test_builds_chunks_locally(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        rows = [('k%d' % i, 'v') for i in range(6)]
+        client.bulk_write(rows, {'max_fee': 1})
+        self.assertEqual((len(self.txs), self.builds), (1, 0))
+        client.bulk_write(rows, {'max_fee': 1}, offline=False)
+        self.assertEqual((len(self.txs), self.builds), (2, 6))
+        self.assertEqual(self.msgs(), [[('crud/create', 'k%d' % i) for i in range(6)]] * 2)
+        client.close()
+
+    def test_pool_spreads_chunks_over_accounts(self):
+        pool = bluzelle.new_pool_client({
+            'mnemonic': SAMPLE_MNEMONIC,
+            'uuid': 'test',
+            'endpoint': self.node.endpoint,
+            'offline_transactions': True,
+            'offline_gas': 100,
+            'accounts': 2,
+        })
+        report = pool.bulk_write([('k%d' % i, 'v') for i in range(8)], {'max_fee': 1, 'max_gas': 200})
+        self.assertEqual(len(report), 4)
+        self.assertEqual(len(set(tx['msg'][0]['value']['Owner'] for tx in self.txs)), 2)
+        pool.close()
+
+    def test_async_bulk_write(self):
+        async def run():
+            async with self.new_client(AsyncClient) as client:
+                return await client.bulk_write([('a', '1'), ('c', '2')], {'max_fee': 1, 'max_gas': 100}, upsert=True)
+        report = asyncio.run(run())
+        self.assertEqual(len(report), 2)
+        self.assertEqual(self.msgs(), [[('crud/update', 'a')], [('crud/create', 'c')]])
+
+class TestPoolBulkUpsert(unittest.TestCase):
+    def test_keys_repeated_across_chunks_land_on_their_owner(self):
+        with NodeEmulator(block_time=0.05) as node:
+            pool = bluzelle.new_pool_client({
+                'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': node.endpoint, 'accounts': 2,
+                'broadcast_mode': 'sync', 'confirmation_poll_interval': 0.02,
+            })
+            rows = [('a', '1'), ('b', '1'), ('a', '2'), ('c', '1'), ('b', '2')]
+            report = pool.bulk_write(rows, {'max_fee': 4000001}, upsert=True, max_bytes=1)
+            self.assertEqual([r['result'].result(5) for r in report], [[None]] * 5)
+            self.assertEqual(pool.key_values(), [{'key': 'a', 'value': '2'}, {'key': 'b', 'value': '2'}, {'key': 'c', 'value': '1'}])
+            self.assertEqual(node.stats()['rejected'], 0)
+            pool.close()
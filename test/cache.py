@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+import unittest
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.cache import ReadCache, MISS, CACHE_READ, CACHE_LEASE
+
+class TestReadCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = ReadCache(2)
+        cache.put(CACHE_READ, 'a', '1')
+        cache.put(CACHE_READ, 'b', '2')
+        cache.get(CACHE_READ, 'a')
+        cache.put(CACHE_READ, 'c', '3')
+        self.assertEqual(cache.get(CACHE_READ, 'b'), MISS)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), '1')
+        self.assertEqual(cache.stats(), {'size': 2, 'hits': 2, 'misses': 1, 'evictions': 1, 'invalidations': 0})
+
+    def test_expires_after_ttl(self):
+        cache = ReadCache(10, ttl=0.05)
+        cache.put(CACHE_READ, 'a', '1')
+        time.sleep(0.06)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), MISS)
+
+    def test_never_outlives_lease(self):
+        cache = ReadCache(10, ttl=60)
+        cache.set_lease('a', 0.05)
+        cache.put(CACHE_READ, 'a', '1')
+        self.assertEqual(cache.get(CACHE_READ, 'a'), '1')
+        time.sleep(0.06)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), MISS)
+
+    def test_counts_down_leases(self):
+        cache = ReadCache(10, ttl=60, block_time=5)
+        cache.put(CACHE_LEASE, 'a', 20)
+        self.assertEqual(cache.get(CACHE_LEASE, 'a'), 20)
+        cache.put(CACHE_LEASE, 'b', 18)
+        self.assertEqual(cache.get(CACHE_LEASE, 'b'), 20)
+
+    def test_drops_results_of_queries_racing_invalidations(self):
+        cache = ReadCache(10)
+        generation = cache.generation()
+        cache.invalidate('a')
+        cache.put(CACHE_READ, 'a', 'stale', generation)
+        cache.put(CACHE_READ, 'b', '2', generation)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), MISS)
+        self.assertEqual(cache.get(CACHE_READ, 'b'), '2')
+        cache.put(CACHE_READ, 'a', '1', cache.generation())
+        self.assertEqual(cache.get(CACHE_READ, 'a'), '1')
+
+    def test_drops_racing_results_after_forgetting_invalidations(self):
+        cache = ReadCache(2)
+        generation = cache.generation()
+        for key in ['a', 'b', 'c']:
+            cache.invalidate(key)
+        cache.put(CACHE_READ, 'a', 'stale', generation)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), MISS)
+        generation = cache.generation()
+        cache.clear()
+        cache.put(CACHE_READ, 'a', 'stale', generation)
+        self.assertEqual(cache.get(CACHE_READ, 'a'), MISS)
+
+class TestClientCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.reads = 0
+        cls.node.route('GET', '/crud/read/', cls.on_read)
+        cls.node.route('GET', '/crud/pread/', cls.on_read)
+        cls.node.route('GET', '/crud/has/', lambda req: {'result': {'has': True}})
+        cls.node.route('GET', '/crud/getlease/', lambda req: {'result': {'lease': '100'}})
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [], 'fee': {'gas': '1'}}})
+        cls.node.route('DELETE', '/crud/', lambda req: {'value': {'msg': [], 'fee': {'gas': '1'}}})
+        cls.node.route('POST', '/txs', lambda req: {'height': '1', 'txhash': 'AB'})
+
+    @classmethod
+    def on_read(cls, req):
+        cls.reads += 1
+        return {'result': {'value': 'v%d' % cls.reads}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.client = new_offline_client({'endpoint': self.node.endpoint, 'cache_size': 100, 'cache_ttl': 60})
+
+    def test_serves_hot_keys_locally(self):
+        first = self.client.read('a')
+        self.assertEqual(self.client.read('a'), first)
+        self.assertEqual(self.client.read('a', True), 'v%d' % self.reads)
+        self.assertTrue(self.client.has('a'))
+        self.assertTrue(self.client.has('a'))
+        self.assertEqual(self.client.get_lease('a'), 500)
+        self.assertEqual(self.client.get_lease('a'), 500)
+        self.assertEqual(self.client.cache_stats()['hits'], 3)
+
+    def test_own_writes_invalidate(self):
+        first = self.client.read('a')
+        self.client.update('a', 'x', {})
+        second = self.client.read('a')
+        self.assertNotEqual(first, second)
+        self.client.read('b')
+        self.client.rename('b', 'c', {})
+        self.client.batch().multi_update([{'key': 'a', 'value': 'y'}]).commit({})
+        self.assertEqual(self.client.cache_stats()['size'], 0)
+        self.client.read('d')
+        self.client.delete_all({})
+        self.assertEqual(self.client.cache_stats()['size'], 0)
+
+    def test_own_leases_cap_entries(self):
+        self.client.create('a', 'x', {}, {'seconds': 0})
+        self.client.cache.set_lease('a', 0.05)
+        self.client.read('a')
+        time.sleep(0.06)
+        reads = self.reads
+        self.client.read('a')
+        self.assertEqual(self.reads, reads + 1)
+
+    def test_disabled_by_default(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        reads = self.reads
+        client.read('a')
+        client.read('a')
+        self.assertEqual(self.reads, reads + 2)
+        self.assertEqual(client.cache_stats(), None)
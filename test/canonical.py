@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import unittest
+import json
+import base64
+from .util import new_offline_client, legacy_sign_bytes, FakeNode
+from lib import canonical
+from lib.canonical import canonical_json, canonical_json_stdlib
+
+PAYLOADS = [
+    {},
+    {"b": 1, "a": [3, 2, {"z": None, "y": True, "x": False}], "c": ""},
+    {"Key": "a&b<c>d", "Value": "<script>alert('&amp;')</script>", "Lease": "10"},
+    {"msg": [{"type": "crud/create", "value": {"Key": "k", "Value": "quotes \" and \\ and \n\t\r\b\f and \x01"}}]},
+    {"nested": {"deeper": {"deepest": ["a", 1, -2, 10 ** 15]}}, "A": "upper sorts first"},
+]
+
+NON_ASCII_PAYLOADS = [
+    {"k": "café"},
+    {"k": "café ☃ \U0001f600 \u2028\u2029 &<>", "n": [1, {"b": 2, "a": 1}]},
+    {"ключ": "значение", "键": "值", "\x7f": "del"},
+    {"msg": [{"type": "crud/create", "value": {"Key": "ü<>", "Value": "\ud7ff\ue000\uffff\U0010ffff"}}]},
+]
+
+class TestCanonicalJSON(unittest.TestCase):
+    def setUp(self):
+        self.client = new_offline_client()
+
+    def test_matches_previous_sign_bytes(self):
+        for payload in PAYLOADS:
+            self.assertEqual(canonical_json(payload), legacy_sign_bytes(payload))
+            self.assertEqual(canonical_json_stdlib(payload), legacy_sign_bytes(payload))
+
+    def test_matches_previous_sign_bytes_for_non_ascii(self):
+        for payload in NON_ASCII_PAYLOADS:
+            self.assertEqual(canonical_json(payload), legacy_sign_bytes(payload))
+            self.assertEqual(canonical_json_stdlib(payload), legacy_sign_bytes(payload))
+
+    def test_non_ascii_is_escaped(self):
+        self.assertEqual(canonical_json({"k": "café\u2028<"}), b'{"k":"caf\\u00e9\\u2028\\u003c"}')
+
+    def test_uses_orjson_when_installed(self):
+        self.assertEqual(canonical.JSON_BACKEND, 'orjson' if canonical.orjson != None else 'json')
+
+    def test_signatures_are_unchanged(self):
+        txn = {
+            'msg': [{'type': 'crud/create', 'value': self.client.transaction_payload(self.client.key_value_payload('a&b', '<v>'))}],
+            'fee': {'gas': '200000', 'amount': [{'denom': 'ubnt', 'amount': '10'}]},
+            'memo': 'memo',
+        }
+        expected = self.client.signer.sign(legacy_sign_bytes({
+            "account_number": "0",
+            "chain_id": "bluzelle",
+            "fee": txn["fee"],
+            "memo": "memo",
+            "msgs": txn["msg"],
+            "sequence": "0",
+        }))
+        self.assertEqual(base64.b64decode(self.client.sign_transaction(txn)), expected)
+
+class TestBroadcastBody(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bodies = []
+        cls.node = FakeNode()
+        def txs(req):
+            cls.bodies.append(req['raw'])
+            return {'height': '1', 'txhash': 'H', 'raw_log': '[]'}
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [{'type': 'crud/create', 'value': req['body']}], 'fee': {'gas': '1000'}}})
+        cls.node.route('POST', '/txs', txs)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_body_is_canonical(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        client.create('a&b', '<v>', {'max_fee': 1})
+        body = self.bodies[-1]
+        self.assertEqual(body, canonical_json(json.loads(body)))
+        self.assertIn(b'"Key":"a\\u0026b"', body)
+        client.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+import unittest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .util import bluzelle, SAMPLE_MNEMONIC
+from lib.emulator import NodeEmulator
+
+GAS_INFO = {'max_fee': 4000001}
+
+# one client shared by many threads
+class TestConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.node = NodeEmulator(block_time=0.2).start()
+
+    def tearDown(self):
+        self.node.stop()
+
+    def new_client(self, options = {}):
+        opts = {'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint, 'confirmation_poll_interval': 0.05}
+        opts.update(options)
+        return bluzelle.new_client(opts)
+
+    def create_from_threads(self, client, n):
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            return list(executor.map(lambda i: client.create('key%d' % i, str(i), GAS_INFO), range(n)))
+
+    def test_block_mode_threads_take_turns(self):
+        client = self.new_client()
+        self.assertEqual(self.create_from_threads(client, 5), [None] * 5)
+        self.assertEqual(client.count(), 5)
+        self.assertEqual(client.retry_stats()['retries'], 0)
+        self.assertEqual(self.node.stats()['rejected'], 0)
+        client.close()
+
+    def test_pipelined_threads_share_blocks(self):
+        client = self.new_client({'pipeline': True})
+        height = self.node.stats()['height']
+        started_at = time.time()
+        self.assertEqual(self.create_from_threads(client, 20), [None] * 20)
+        self.assertLess(self.node.stats()['height'] - height, 10)
+        self.assertLess(time.time() - started_at, 2)
+        self.assertEqual(client.count(), 20)
+        self.assertEqual(client.retry_stats()['retries'], 0)
+        self.assertEqual(client.tx_read('key3', GAS_INFO), '3')
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key already exists'):
+            client.create('key3', 'x', GAS_INFO)
+        client.close()
+
+    def test_sync_mode_threads(self):
+        client = self.new_client({'broadcast_mode': 'sync'})
+        futures = self.create_from_threads(client, 20)
+        self.assertEqual([f.result() for f in futures], [None] * 20)
+        self.assertEqual(client.count(), 20)
+        self.assertEqual(self.node.stats()['rejected'], 0)
+        client.close()
+
+    def test_validates_pipeline(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'pipeline must be a bool'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'pipeline': 'yes'})
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+from .util import new_offline_client, bluzelle, FakeNode, SAMPLE_MNEMONIC
+from lib.bluzelle import Client
+from lib.async_client import AsyncClient
+from lib.emulator import NodeEmulator
+
+GAS_INFO = {'max_fee': 4000001}
+
+# a node whose queries lag behind the block holding the writes, it catches up
+# by `catch_up` heights per query
+class TestReadYourWrites(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/crud/read/', cls.on_read)
+        cls.node.route('GET', '/crud/count/', lambda req: cls.answer({'count': '1'}))
+        cls.node.route('GET', '/crud/keys/', lambda req: cls.answer({'keys': []}))
+        cls.node.route('GET', '/blocks/latest', cls.on_latest_block)
+        cls.node.route('GET', '/crud/has/', lambda req: {'result': {'has': True}})
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [], 'fee': {'gas': '1'}}})
+        cls.node.route('POST', '/txs', lambda req: {'height': '10', 'txhash': 'AB', 'raw_log': '[]'})
+
+    @classmethod
+    def answer(cls, result):
+        cls.queries += 1
+        height = cls.height
+        cls.height += cls.catch_up
+        return {'height': str(height), 'result': result}
+
+    # keys written at `found_from` are not found below it, an error telling no height
+    @classmethod
+    def on_read(cls, req):
+        if cls.height < cls.found_from:
+            cls.queries += 1
+            cls.height += cls.catch_up
+            return 404, {'error': 'key not found'}
+        return cls.answer({'value': 'v'})
+
+    @classmethod
+    def on_latest_block(cls, req):
+        cls.blocks += 1
+        height = cls.height
+        cls.height += cls.catch_up
+        return {'block': {'header': {'height': str(height)}}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.queries = 0
+        self.__class__.height = 7
+        self.__class__.catch_up = 1
+        self.__class__.found_from = 0
+        self.__class__.blocks = 0
+
+    def new_client(self, options = {}, cls = Client):
+        opts = {'endpoint': self.node.endpoint, 'consistency': 'read_your_writes', 'consistency_timeout': 5}
+        opts.update(options)
+        return new_offline_client(opts, cls)
+
+    def test_queries_wait_for_the_last_write(self):
+        metrics = bluzelle.MetricsRegistry()
+        client = self.new_client({'metrics': metrics})
+        client.create('a', 'v', {})
+        self.assertEqual(client.write_height, 10)
+        self.assertEqual(client.read('a'), 'v')
+        self.assertEqual(self.queries, 4)
+        self.assertIn('bluzelle_behind_queries_total{method="read"} 3', metrics.to_prometheus())
+        self.assertEqual(client.count(), 1)
+        self.assertEqual(self.queries, 5)
+        client.close()
+
+    def test_eventual_queries_do_not_wait(self):
+        client = self.new_client({'consistency': 'eventual'})
+        client.create('a', 'v', {})
+        self.assertEqual(client.read('a'), 'v')
+        self.assertEqual(self.queries, 1)
+        client.close()
+
+    def test_queries_before_any_write_do_not_wait(self):
+        client = self.new_client()
+        self.assertEqual(client.read('a'), 'v')
+        self.assertEqual(self.queries, 1)
+        client.close()
+
+    def test_responses_without_height_wait_for_the_latest_block(self):
+        client = self.new_client()
+        client.create('a', 'v', {})
+        self.assertTrue(client.has('a'))
+        self.assertEqual(self.blocks, 4)
+        client.close()
+
+    def test_not_found_waits_for_the_last_write(self):
+        self.__class__.found_from = 10
+        client = self.new_client()
+        client.create('a', 'v', {})
+        self.assertEqual(client.read('a'), 'v')
+        self.assertEqual((self.queries, self.blocks), (3, 2))
+        client.close()
+
+    def test_not_found_once_caught_up(self):
+        self.__class__.found_from = 100
+        client = self.new_client()
+        client.create('a', 'v', {})
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            client.read('a')
+        self.assertEqual(self.queries, 3)
+        client.close()
+
+    def test_not_found_fails_when_the_node_does_not_catch_up(self):
+        self.__class__.found_from = 10
+        self.__class__.catch_up = 0
+        client = self.new_client({'consistency_timeout': 0.3})
+        client.create('a', 'v', {})
+        with self.assertRaisesRegex(bluzelle.APIError, 'node is at height 7, behind'):
+            client.read('a')
+        client.close()
+
+    def test_key_filter_reads_wait_for_the_last_write(self):
+        self.__class__.found_from = 10
+        client = self.new_client({'key_filter': True})
+        client.create('a', 'v', {})
+        self.assertEqual(client.read('a'), 'v')
+        self.assertFalse(client.has('b'))
+        client.close()
+
+    def test_eventual_not_found_does_not_wait(self):
+        self.__class__.found_from = 10
+        client = self.new_client({'consistency': 'eventual'})
+        client.create('a', 'v', {})
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            client.read('a')
+        self.assertEqual(self.blocks, 0)
+        client.close()
+
+    def test_fails_when_the_node_does_not_catch_up(self):
+        self.__class__.catch_up = 0
+        client = self.new_client({'consistency_timeout': 0.3})
+        client.create('a', 'v', {})
+        with self.assertRaisesRegex(bluzelle.APIError, 'behind'):
+            client.read('a')
+        client.close()
+
+    def test_async_queries_wait_for_the_last_write(self):
+        async def run():
+            async with self.new_client({}, AsyncClient) as client:
+                await client.create('a', 'v', {})
+                return await client.read('a')
+        self.assertEqual(asyncio.run(run()), 'v')
+        self.assertEqual(self.queries, 4)
+
+    def test_async_not_found_waits_for_the_last_write(self):
+        self.__class__.found_from = 10
+        async def run():
+            async with self.new_client({}, AsyncClient) as client:
+                await client.create('a', 'v', {})
+                return await client.read('a')
+        self.assertEqual(asyncio.run(run()), 'v')
+        self.assertEqual((self.queries, self.blocks), (3, 2))
+
+    def test_streams_wait_for_the_last_write(self):
+        client = self.new_client()
+        client.create('a', 'v', {})
+        self.assertEqual(list(client.iter_keys()), [])
+        self.assertEqual(self.blocks, 4)
+        client.close()
+
+    def test_eventual_streams_do_not_wait(self):
+        client = self.new_client({'consistency': 'eventual'})
+        client.create('a', 'v', {})
+        self.assertEqual(list(client.iter_keys()), [])
+        self.assertEqual(self.blocks, 0)
+        client.close()
+
+    def test_streams_fail_when_the_node_does_not_catch_up(self):
+        self.__class__.catch_up = 0
+        client = self.new_client({'consistency_timeout': 0.3})
+        client.create('a', 'v', {})
+        with self.assertRaisesRegex(bluzelle.APIError, 'node is at height 7, behind'):
+            list(client.iter_keys())
+        client.close()
+
+    def test_async_streams_wait_for_the_last_write(self):
+        async def run():
+            async with self.new_client({}, AsyncClient) as client:
+                await client.create('a', 'v', {})
+                return [key async for key in client.iter_keys()]
+        self.assertEqual(asyncio.run(run()), [])
+        self.assertEqual(self.blocks, 4)
+
+    def test_validates_consistency(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'consistency must be one of'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'consistency': 'strong'})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'consistency_timeout must be a positive number'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'consistency_timeout': 0})
+
+class TestTrackedWriteHeight(unittest.TestCase):
+    def test_sync_mode_writes_record_their_block(self):
+        with NodeEmulator(block_time=0.1) as node:
+            client = bluzelle.new_client({
+                'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': node.endpoint,
+                'broadcast_mode': 'sync', 'confirmation_poll_interval': 0.05, 'consistency': 'read_your_writes',
+            })
+            client.create('a', 'v', GAS_INFO).result()
+            self.assertGreater(client.write_height, 0)
+            self.assertLessEqual(client.write_height, node.stats()['height'])
+            self.assertEqual(client.read('a'), 'v')
+            with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+                client.read('b')
+            client.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import unittest
+import time
+from .util import bluzelle, SAMPLE_MNEMONIC
+from lib.emulator import NodeEmulator
+
+GAS_INFO = {'max_fee': 4000001}
+
+class TestEmulator(unittest.TestCase):
+    def setUp(self):
+        self.node = NodeEmulator(block_time=0.05).start()
+
+    def tearDown(self):
+        self.node.stop()
+
+    def new_client(self, options = {}):
+        opts = {'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint}
+        opts.update(options)
+        return bluzelle.new_client(opts)
+
+    def test_crud(self):
+        client = self.new_client()
+        self.assertEqual(client.account()['account_number'], 0)
+        client.create('a', '1', GAS_INFO, {'hours': 1})
+        client.create('b', '2', GAS_INFO)
+        self.assertEqual(client.read('a'), '1')
+        self.assertTrue(client.has('a'))
+        self.assertFalse(client.has('x'))
+        self.assertEqual(client.count(), 2)
+        self.assertEqual(client.keys(), ['a', 'b'])
+        client.update('a', '3', GAS_INFO)
+        client.rename('b', 'c', GAS_INFO)
+        client.multi_update([{'key': 'a', 'value': '4'}, {'key': 'c', 'value': '5'}], GAS_INFO)
+        self.assertEqual(client.key_values(), [{'key': 'a', 'value': '4'}, {'key': 'c', 'value': '5'}])
+        self.assertTrue(3500 < client.get_lease('a') <= 3600)
+        self.assertEqual(client.get_n_shortest_leases(1)[0]['key'], 'a')
+        self.assertEqual(client.tx_read('c', GAS_INFO), '5')
+        self.assertEqual(client.tx_count(GAS_INFO), 2)
+        client.delete('c', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            client.read('c')
+        client.delete_all(GAS_INFO)
+        self.assertEqual(client.count(), 0)
+        client.close()
+
+    def test_msg_errors(self):
+        client = self.new_client()
+        client.create('a', '1', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key already exists'):
+            client.create('a', '1', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key does not exist'):
+            client.update('x', '1', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'out of gas'):
+            client.update('a', '2', {'max_gas': 1000, 'max_fee': 1})
+        self.assertEqual(client.read('a'), '1')
+        client.close()
+
+    def test_batches_are_atomic(self):
+        client = self.new_client()
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key already exists'):
+            client.batch().create('a', '1').create('a', '2').commit(GAS_INFO)
+        self.assertEqual(client.count(), 0)
+        client.close()
+
+    def test_checks_sequences(self):
+        client = self.new_client()
+        client.bluzelle_account['sequence'] += 2
+        client.create('a', '1', GAS_INFO)
+        self.assertEqual(client.retry_stats()['recovered_sequences'], 1)
+        self.assertEqual(client.account()['sequence'], 1)
+        self.assertEqual(self.node.stats()['rejected'], 1)
+        client.close()
+
+    def test_leases_count_down(self):
+        client = self.new_client()
+        client.create('a', '1', GAS_INFO, {'seconds': 10})
+        deadline = time.time() + 5
+        while client.has('a') and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(client.has('a'))
+        client.close()
+
+    def test_sync_and_async_modes(self):
+        for mode in ['sync', 'async']:
+            client = self.new_client({'broadcast_mode': mode, 'confirmation_poll_interval': 0.02})
+            future = client.create(mode, '1', GAS_INFO)
+            self.assertEqual(future.result(5), None)
+            self.assertEqual(client.read(mode), '1')
+            self.assertEqual(client.tx_has(mode, GAS_INFO).result(5), True)
+            client.close()
+
+    def test_verifies_signatures(self):
+        self.node.verify_signatures = True
+        client = self.new_client()
+        client.create('a', '1', GAS_INFO)
+        other = self.new_client({'chain_id': 'other', 'retry_policy': bluzelle.RetryPolicy(max_retries=1, base_delay=0.01)})
+        with self.assertRaisesRegex(bluzelle.APIError, 'max retry attempts'):
+            other.create('b', '1', GAS_INFO)
+        client.close()
+        other.close()
+
+    def test_injects_latency(self):
+        self.node.latency = 0.05
+        client = self.new_client()
+        started_at = time.time()
+        client.version()
+        self.assertTrue(time.time() - started_at >= 0.05)
+        client.close()
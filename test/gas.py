@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import unittest
+import threading
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.gas import GasModel, gas_features
+
+def gas_used(fields):
+    (_, _, key_bytes, value_bytes, lease) = gas_features(fields)
+    return 20000 + 30 * key_bytes + 10 * value_bytes + 5000 * lease
+
+class TestGasModel(unittest.TestCase):
+    def test_learns_gas_from_key_and_value_sizes(self):
+        model = GasModel(margin=0.1)
+        samples = [{'Key': 'k' * i, 'Value': 'v' * (i * i % 17), 'Lease': '1' if i % 3 == 0 else '0'} for i in range(1, 12)]
+        for (i, fields) in enumerate(samples):
+            self.assertEqual(model.predict('crud/create', fields) == None, i < 8)
+            model.observe('crud/create', fields, gas_used(fields))
+        fields = {'Key': 'k' * 40, 'Value': 'v' * 1000, 'Lease': '10'}
+        self.assertAlmostEqual(model.predict('crud/create', fields) / gas_used(fields), 1.1, delta=0.02)
+        self.assertEqual(model.predict('crud/update', fields), None)
+
+    def test_never_predicts_less_than_seen(self):
+        model = GasModel(margin=0.1, min_samples=2)
+        model.observe('crud/create', {'Key': 'a', 'Value': ''}, 20000)
+        model.observe('crud/create', {'Key': 'a', 'Value': 'v' * 1000}, 10000)
+        self.assertEqual(model.predict('crud/create', {'Key': 'a', 'Value': 'v' * 5000}), 10000)
+
+    def test_out_of_gas_widens_margin(self):
+        model = GasModel(margin=0.1, min_samples=1)
+        model.observe('crud/create', {'Key': 'a', 'Value': 'b'}, 1000)
+        model.miss('crud/create')
+        self.assertEqual(model.stats()['margins'], {'crud/create': 0.2})
+        self.assertEqual(model.stats()['misses'], 1)
+
+class TestClientGasModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.lock = threading.Lock()
+        cls.node.route('GET', '/auth/accounts/', cls.on_account)
+        cls.node.route('POST', '/crud/', cls.on_build)
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+
+    @classmethod
+    def on_account(cls, req):
+        return {'result': {'value': {'account_number': 1, 'sequence': cls.sequence}}}
+
+    @classmethod
+    def on_build(cls, req):
+        cls.builds += 1
+        value = dict(req['body'])
+        del value['BaseReq']
+        return {'value': {'msg': [{'type': 'crud/create', 'value': value}], 'fee': {'gas': '1000000', 'amount': []}}}
+
+    # keys named `heavy` take 3x the gas, out of gas txs still use up their sequence
+    @classmethod
+    def on_broadcast(cls, req):
+        tx = req['body']['tx']
+        value = tx['msg'][0]['value']
+        used = gas_used(value) * (3 if value['Key'] == 'heavy' else 1)
+        with cls.lock:
+            cls.sequence += 1
+            cls.gas_wanted.append(int(tx['fee']['gas']))
+        if used > int(tx['fee']['gas']):
+            return {'height': '1', 'txhash': 'H', 'code': 11, 'raw_log': 'out of gas in location: WriteFlat', 'gas_used': tx['fee']['gas']}
+        return {'height': '1', 'txhash': 'H', 'raw_log': '[]', 'gas_used': str(used)}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.builds = 0
+        self.__class__.sequence = 0
+        self.__class__.gas_wanted = []
+        self.client = new_offline_client({'endpoint': self.node.endpoint, 'gas_model': True, 'gas_margin': 0.1})
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_skips_simulation_once_learned(self):
+        for i in range(12):
+            self.client.create('k' * (i + 1), 'v' * (i * i % 17), {'gas_price': 1}, {'seconds': 5 * (i % 3)})
+        self.assertEqual(self.builds, 8)
+        self.assertTrue(all(gas < 30000 for gas in self.gas_wanted[8:]))
+        self.assertEqual(self.client.gas_model_stats()['predictions'], 4)
+
+    def test_resends_out_of_gas_txs_with_more_gas(self):
+        for i in range(8):
+            self.client.create('k' * (i + 1), 'v' * (i * i % 17), {'gas_price': 1}, {'seconds': 5 * (i % 3)})
+        self.client.create('heavy', 'v', {'gas_price': 1})
+        self.assertEqual(len(self.gas_wanted), 11)
+        self.assertEqual(self.gas_wanted[9], self.gas_wanted[8] * 2)
+        self.assertEqual(self.gas_wanted[10], self.gas_wanted[9] * 2)
+        self.assertEqual(self.client.bluzelle_account['sequence'], 11)
+        self.assertEqual(self.client.gas_model_stats()['misses'], 2)
+
+    def test_out_of_gas_is_raised_within_max_gas(self):
+        for i in range(8):
+            self.client.create('k' * (i + 1), 'v' * (i * i % 17), {'gas_price': 1}, {'seconds': 5 * (i % 3)})
+        with self.assertRaisesRegex(bluzelle.APIError, 'out of gas'):
+            self.client.create('heavy', 'v', {'gas_price': 1, 'max_gas': 30000})
+
+    def test_validates_gas_options(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'gas_model must be a bool'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'gas_model': 1})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'gas_margin must be a positive number'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'gas_margin': -1})
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+import unittest
+import threading
+from .util import SAMPLE_MNEMONIC
+from lib.emulator import NodeEmulator
+from lib.bluzelle import APIError
+from lib.gateway import create_app, new_gateway, WriteQueue
+
+GAS_INFO = {'max_fee': 4000001}
+
+class TestGateway(unittest.TestCase):
+    def setUp(self):
+        self.node = NodeEmulator(block_time=0.05).start()
+        self.gateway = new_gateway({'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint}, batch_wait=0.02)
+        self.app = create_app(self.gateway)
+
+    def tearDown(self):
+        self.gateway.close()
+        self.node.stop()
+
+    def call(self, method, *args):
+        res = self.app.test_client().post('/', json={'method': method, 'args': list(args)})
+        return res.status_code, res.json
+
+    def test_calls(self):
+        self.assertEqual(self.call('create', 'a', '1', GAS_INFO), (200, None))
+        self.assertEqual(self.call('read', 'a'), (200, '1'))
+        self.assertEqual(self.call('tx_read', 'a', GAS_INFO), (200, '1'))
+        self.assertEqual(self.call('keys'), (200, ['a']))
+
+    def test_errors(self):
+        self.assertEqual(self.call('read', 'x'), (400, {'error': 'key not found'}))
+        self.assertEqual(self.call('close'), (400, 'unknown method close'))
+        self.assertEqual(self.call('create', 'a', '1'), (400, 'gas_info is required'))
+        res = self.app.test_client().post('/', json={'method': 'read'})
+        self.assertEqual(res.status_code, 400)
+
+    def test_concurrent_writes_share_transactions(self):
+        results = {}
+        def create(i):
+            results[i] = self.call('create', 'key%d' % i, str(i), GAS_INFO)
+        threads = [threading.Thread(target=create, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(list(results.values()), [(200, None)] * 20)
+        self.assertEqual(self.call('count'), (200, 20))
+        stats = self.gateway.stats()['writes']
+        self.assertEqual(stats['writes'], 20)
+        self.assertLess(stats['transactions'], 20)
+
+    def test_batch_endpoint(self):
+        self.call('create', 'a', '1', GAS_INFO)
+        res = self.app.test_client().post('/batch', json=[
+            {'method': 'create', 'args': ['b', '2', GAS_INFO]},
+            {'method': 'create', 'args': ['a', '1', GAS_INFO]},
+            {'method': 'update', 'args': ['a', '3', GAS_INFO]},
+            {'method': 'read', 'args': ['a']},
+            {'method': 'nope', 'args': []},
+        ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json[0], {'result': None})
+        self.assertIn('Key already exists', res.json[1]['error']['error'])
+        self.assertEqual(res.json[2], {'result': None})
+        self.assertIn(res.json[3], [{'result': '1'}, {'result': '3'}])
+        self.assertEqual(res.json[4], {'error': 'unknown method nope'})
+        self.assertEqual(self.call('key_values'), (200, [{'key': 'a', 'value': '3'}, {'key': 'b', 'value': '2'}]))
+        self.assertEqual(self.gateway.stats()['writes']['isolated'], 3)
+        res = self.app.test_client().post('/batch', json={'method': 'read'})
+        self.assertEqual(res.status_code, 400)
+
+    def test_reads_are_cached(self):
+        self.call('create', 'a', '1', GAS_INFO)
+        self.call('read', 'a')
+        self.call('read', 'a')
+        self.assertGreaterEqual(self.gateway.stats()['cache']['hits'], 1)
+        self.call('update', 'a', '2', GAS_INFO)
+        self.assertEqual(self.call('read', 'a'), (200, '2'))
+
+    def test_stats_and_metrics(self):
+        self.call('create', 'a', '1', GAS_INFO)
+        self.call('read', 'a')
+        self.call('read', 'x')
+        stats = self.app.test_client().get('/stats').json
+        self.assertEqual(stats['methods']['read']['count'], 2)
+        self.assertEqual(stats['methods']['read']['errors'], 1)
+        self.assertGreater(stats['methods']['create']['p99_ms'], 0)
+        res = self.app.test_client().get('/metrics')
+        self.assertIn('gateway_request_seconds', res.get_data(as_text=True))
+
+    def test_ambiguous_failures_are_not_isolated(self):
+        gateway = new_gateway({
+            'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint,
+            'broadcast_mode': 'sync', 'confirmation_timeout': 0.3, 'confirmation_poll_interval': 0.05,
+        }, batch_wait=0.2)
+        self.node.stopped.set()
+        try:
+            results = gateway.call_many([{'method': 'create', 'args': ['k%d' % i, 'v', GAS_INFO]} for i in range(3)])
+        finally:
+            gateway.close()
+        self.assertTrue(all('not included' in r['error'] for r in results))
+        self.assertEqual(gateway.stats()['writes'], {'queued': 0, 'writes': 3, 'transactions': 1, 'isolated': 0})
+
+    def test_rejected(self):
+        self.assertTrue(WriteQueue.rejected(APIError('Key already exists', {'code': 18, 'raw_log': 'Key already exists'})))
+        self.assertFalse(WriteQueue.rejected(APIError('transaction H not included after 60s')))
+        self.assertFalse(WriteQueue.rejected(TimeoutError()))
+
+    def test_merge_gas_info(self):
+        gas_info = WriteQueue.merge_gas_info([{'gas_price': 10, 'max_gas': 100}, {'gas_price': 10, 'max_gas': 50}])
+        self.assertEqual(gas_info, {'gas_price': 10, 'max_gas': 150, 'max_fee': 0})
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import unittest
+import os
+import tempfile
+from .util import new_offline_client, SAMPLE_MNEMONIC
+from lib.bluzelle import HD_PATH, ADDRESS_PREFIX
+import hmac
+import hashlib
+from lib import identity as identity_module
+from lib.identity import IdentityCache, derive_identity, AESGCM
+
+SAMPLE_ADDRESS = 'bluzelle1upsfjftremwgxz3gfy0wf3xgvwpymqx754ssu9'
+
+class TestIdentity(unittest.TestCase):
+    def test_derives_address(self):
+        self.assertEqual(derive_identity(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX).address, SAMPLE_ADDRESS)
+
+    def test_client_uses_cached_identity(self):
+        a = new_offline_client()
+        b = new_offline_client()
+        self.assertEqual(a.address, SAMPLE_ADDRESS)
+        self.assertTrue(a.identity is b.identity)
+        self.assertEqual(a.signer.public_key, a.identity.public_key)
+
+    @unittest.skipIf(AESGCM == None, 'cryptography not installed')
+    def test_disk_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as d:
+            identity = IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+            files = [name for name in os.listdir(d) if name != 'salt']
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(d, files[0]), 'rb') as f:
+                self.assertFalse(identity.private_key in f.read())
+            cached = IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+            self.assertEqual(cached.to_bytes(), identity.to_bytes())
+
+    @unittest.skipIf(AESGCM == None, 'cryptography not installed')
+    def test_disk_cache_is_salted_per_directory(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, a)
+            IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, b)
+            self.assertNotEqual(sorted(os.listdir(a)), sorted(os.listdir(b)))
+
+    @unittest.skipIf(AESGCM == None, 'cryptography not installed')
+    def test_disk_cache_ignores_tampered_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            identity = IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+            path = os.path.join(d, [name for name in os.listdir(d) if name != 'salt'][0])
+            with open(path, 'rb') as f:
+                data = bytearray(f.read())
+            data[20] ^= 1
+            with open(path, 'wb') as f:
+                f.write(data)
+            cached = IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+            self.assertEqual(cached.address, identity.address)
+
+    @unittest.skipIf(AESGCM == None, 'cryptography not installed')
+    def test_disk_cache_removes_legacy_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            secret = IdentityCache.secret(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX)
+            legacy = os.path.join(d, hmac.new(secret, b'bluzelle-identity-id', hashlib.sha256).hexdigest())
+            with open(legacy, 'wb') as f:
+                f.write(b'\x01')
+            IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+            self.assertFalse(os.path.exists(legacy))
+
+    def test_disk_cache_needs_cryptography(self):
+        aesgcm = identity_module.AESGCM
+        identity_module.AESGCM = None
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                identity = IdentityCache().load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX, d)
+                self.assertEqual(identity.address, SAMPLE_ADDRESS)
+                self.assertEqual(os.listdir(d), [])
+        finally:
+            identity_module.AESGCM = aesgcm
+
+    def test_keys_by_hd_path(self):
+        cache = IdentityCache()
+        a = cache.load(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX)
+        b = cache.load(SAMPLE_MNEMONIC, "m/44'/118'/0'/0/1", ADDRESS_PREFIX)
+        self.assertNotEqual(a.address, b.address)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import urllib.request
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient, AsyncTransport, AsyncResponse
+from lib.metrics import MetricsRegistry, serve_metrics
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_exports_prometheus_text(self):
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.inc('requests_total', 1, {'method': 'read'})
+        registry.inc('requests_total', 2, {'method': 'read'})
+        registry.inc('sent_bytes_total', 10)
+        registry.observe('phase_seconds', 0.05, {'phase': 'sign'})
+        registry.observe('phase_seconds', 0.5, {'phase': 'sign'})
+        registry.observe('phase_seconds', 5, {'phase': 'sign'})
+        self.assertEqual(registry.to_prometheus(), '\n'.join([
+            '# TYPE bluzelle_phase_seconds histogram',
+            'bluzelle_phase_seconds_bucket{phase="sign",le="0.1"} 1',
+            'bluzelle_phase_seconds_bucket{phase="sign",le="1"} 2',
+            'bluzelle_phase_seconds_bucket{phase="sign",le="+Inf"} 3',
+            'bluzelle_phase_seconds_sum{phase="sign"} 5.55',
+            'bluzelle_phase_seconds_count{phase="sign"} 3',
+            '# TYPE bluzelle_requests_total counter',
+            'bluzelle_requests_total{method="read"} 3',
+            '# TYPE bluzelle_sent_bytes_total counter',
+            'bluzelle_sent_bytes_total 10',
+        ]) + '\n')
+
+    def test_escapes_label_values(self):
+        registry = MetricsRegistry()
+        registry.inc('x', 1, {'v': 'a"b\\c\nd'})
+        self.assertIn('bluzelle_x{v="a\\"b\\\\c\\nd"} 1', registry.to_prometheus())
+
+    def test_serves_metrics(self):
+        registry = MetricsRegistry()
+        registry.inc('x')
+        server = serve_metrics(registry, port=0)
+        try:
+            url = 'http://127.0.0.1:%d/metrics' % server.server_address[1]
+            with urllib.request.urlopen(url) as res:
+                self.assertEqual(res.read().decode('utf-8'), registry.to_prometheus())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+class TestClientMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/crud/read/', lambda req: {'result': {'value': 'v'}})
+        cls.node.route('GET', '/crud/has/', lambda req: (404, {'error': 'unknown'}))
+        cls.node.route('GET', '/txs/', lambda req: {'height': '2', 'txhash': 'H', 'gas_used': '700'})
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [{'type': 'crud/x', 'value': {}}], 'fee': {'gas': '1000'}}})
+        cls.node.route('POST', '/txs', lambda req: {'height': '1', 'txhash': 'H', 'raw_log': '[]', 'gas_used': '900'})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_records_phases_requests_gas_and_fees(self):
+        metrics = MetricsRegistry()
+        client = new_offline_client({'endpoint': self.node.endpoint, 'metrics': metrics})
+        client.read('a')
+        with self.assertRaises(bluzelle.APIError):
+            client.has('a')
+        client.create('a', 'b', {'max_fee': 5})
+        for phase in ['validate', 'sign', 'broadcast']:
+            self.assertEqual(metrics.get('phase_seconds', {'phase': phase})['count'], 1)
+        self.assertEqual(metrics.get('requests_total', {'kind': 'query', 'method': 'read'}), 1)
+        self.assertEqual(metrics.get('request_errors_total', {'kind': 'query', 'method': 'has'}), 1)
+        self.assertEqual(metrics.get('requests_total', {'kind': 'mutate', 'method': 'create'}), 1)
+        self.assertEqual(metrics.get('requests_total', {'kind': 'mutate', 'method': 'txs'}), 1)
+        self.assertEqual(metrics.get('transactions_total', {'method': 'create'}), 1)
+        self.assertEqual(metrics.get('gas_used_total'), 900)
+        self.assertEqual(metrics.get('fee_paid_total', {'denom': 'ubnt'}), 5)
+        self.assertTrue(metrics.get('sent_bytes_total') > 0)
+        self.assertTrue(metrics.get('received_bytes_total') > 0)
+        client.close()
+
+    def test_records_block_wait(self):
+        metrics = MetricsRegistry()
+        client = new_offline_client({
+            'endpoint': self.node.endpoint,
+            'metrics': metrics,
+            'broadcast_mode': 'sync',
+            'confirmation_poll_interval': 0.01,
+        })
+        client.tx_count({'max_fee': 1}).exception(5)
+        self.assertEqual(metrics.get('phase_seconds', {'phase': 'block_wait'})['count'], 1)
+        self.assertEqual(metrics.get('gas_used_total'), 700)
+        client.close()
+
+    def test_async_client(self):
+        metrics = MetricsRegistry()
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint, 'metrics': metrics}, AsyncClient) as client:
+                await client.read('a')
+                await client.create('a', 'b', {'max_fee': 1})
+        asyncio.run(run())
+        self.assertEqual(metrics.get('requests_total', {'kind': 'query', 'method': 'read'}), 1)
+        self.assertEqual(metrics.get('phase_seconds', {'phase': 'sign'})['count'], 1)
+
+    def test_async_client_counts_received_bytes(self):
+        body = '{"result": {"value": "été ☃"}}'
+        class Transport(AsyncTransport):
+            async def request(self, method, url, data = None, headers = None):
+                return AsyncResponse(200, body)
+        metrics = MetricsRegistry()
+        async def run():
+            async with new_offline_client({'transport': Transport(), 'metrics': metrics}, AsyncClient) as client:
+                return await client.read('a')
+        self.assertEqual(asyncio.run(run()), 'été ☃')
+        self.assertEqual(metrics.get('received_bytes_total'), len(body.encode('utf-8')))
+        self.assertNotEqual(len(body.encode('utf-8')), len(body))
+
+    def test_validates_metrics(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'metrics must be a Metrics'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'metrics': {}})
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import unittest
+from .util import new_offline_client, bluzelle, FakeNode
+
+class TestOfflineTransactions(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('POST', '/crud/', cls.on_validate)
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.validated = []
+        cls.broadcasts = []
+
+    @classmethod
+    def on_validate(cls, req):
+        cls.validated.append(req['path'])
+        return {'value': {'msg': [], 'fee': {'gas': '1234', 'amount': []}, 'signatures': None, 'memo': ''}}
+
+    @classmethod
+    def on_broadcast(cls, req):
+        cls.broadcasts.append(req['body']['tx'])
+        return {'height': '1', 'txhash': 'AB'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.client = new_offline_client({
+            'endpoint': self.node.endpoint,
+            'offline_transactions': True,
+            'offline_gas': 5000,
+        })
+
+    def test_skips_tx_builder_round_trip(self):
+        del self.validated[:]
+        self.client.create('foo', 'bar', {'max_fee': 1}, {'minutes': 1})
+        self.assertEqual(self.validated, [])
+        tx = self.broadcasts[-1]
+        self.assertEqual(tx['msg'], [{
+            'type': 'crud/create',
+            'value': {
+                'UUID': 'test',
+                'Key': 'foo',
+                'Value': 'bar',
+                'Lease': '12',
+                'Owner': self.client.address,
+            },
+        }])
+        self.assertEqual(tx['fee']['gas'], '5000')
+        self.assertEqual(len(tx['signatures']), 1)
+
+    def test_fills_zero_valued_fields(self):
+        self.client.batch().renew_lease('foo').delete_all().commit({})
+        msgs = self.broadcasts[-1]['msg']
+        self.assertEqual(msgs[0]['value']['Lease'], '0')
+        self.assertEqual(msgs[1], {'type': 'crud/deleteall', 'value': {'UUID': 'test', 'Owner': self.client.address}})
+        self.assertEqual(self.broadcasts[-1]['fee']['gas'], '10000')
+
+    def test_reuses_gas_reported_by_node(self):
+        self.client.options['offline_transactions'] = False
+        self.client.delete_all({})
+        self.client.options['offline_transactions'] = True
+        self.client.delete_all({})
+        self.client.delete('foo', {})
+        self.assertEqual(self.broadcasts[-2]['fee']['gas'], '1234')
+        self.assertEqual(self.broadcasts[-1]['fee']['gas'], '5000')
+
+    def test_validates_options(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'offline_transactions must be a bool'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'offline_transactions': 1})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'offline_gas must be a positive int'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'offline_gas': -1})
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+import unittest
+import threading
+import time
+from .util import SAMPLE_MNEMONIC, bluzelle, FakeNode
+from lib.emulator import NodeEmulator
+
+GAS_INFO = {'max_fee': 4000001}
+
+class TestPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/auth/accounts/', cls.on_account)
+        cls.node.route('POST', '/crud/', lambda req: {
+            'value': {'msg': [{'type': 'crud/x', 'value': req['body']}], 'fee': {'gas': '100'}},
+        })
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.lock = threading.Lock()
+        cls.txs = []
+
+    @classmethod
+    def on_account(cls, req):
+        return {'result': {'value': {'account_number': 1, 'sequence': 0}}}
+
+    # every tx takes a while to land so concurrent calls overlap
+    @classmethod
+    def on_broadcast(cls, req):
+        time.sleep(0.05)
+        tx = req['body']['tx']
+        with cls.lock:
+            cls.txs.append((tx['msg'][0]['value']['Owner'], tx['msg'][0]['value'].get('Key'), tx['signatures'][0]['sequence']))
+        return {'height': '1', 'txhash': 'H', 'raw_log': '[]'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        with self.lock:
+            self.txs.clear()
+
+    def new_pool(self, options):
+        opts = {
+            'mnemonic': SAMPLE_MNEMONIC,
+            'uuid': 'test',
+            'endpoint': self.node.endpoint,
+        }
+        opts.update(options)
+        return bluzelle.new_pool_client(opts)
+
+    def test_derives_accounts_at_consecutive_hd_indexes(self):
+        pool = self.new_pool({'accounts': 3})
+        addresses = [c.address for c in pool.clients]
+        self.assertEqual(len(set(addresses)), 3)
+        self.assertEqual(addresses[0], 'bluzelle1upsfjftremwgxz3gfy0wf3xgvwpymqx754ssu9')
+        self.assertTrue(all(c.transport is pool.primary.transport for c in pool.clients))
+        pool.close()
+
+    def test_spreads_concurrent_writes_over_accounts(self):
+        pool = self.new_pool({'accounts': 3})
+        futures = [pool.submit('create', 'key%d' % i, 'v', {'max_fee': 1}) for i in range(6)]
+        [f.result(5) for f in futures]
+        owners = {}
+        for (owner, _, sequence) in self.txs:
+            owners.setdefault(owner, []).append(sequence)
+        self.assertEqual(len(owners), 3)
+        for sequences in owners.values():
+            self.assertEqual(sequences, [str(i) for i in range(len(sequences))])
+        self.assertEqual(sum(s['sequence'] for s in pool.stats()), 6)
+        pool.close()
+
+    def test_keeps_writes_to_a_key_on_one_account(self):
+        pool = self.new_pool({'accounts': 3})
+        futures = [pool.submit('update', 'same', str(i), {'max_fee': 1}) for i in range(4)]
+        [f.result(5) for f in futures]
+        self.assertEqual(len(set(owner for (owner, _, _) in self.txs)), 1)
+        pool.close()
+
+    def test_delete_all_runs_on_every_account(self):
+        pool = self.new_pool({'mnemonics': [SAMPLE_MNEMONIC, SAMPLE_MNEMONIC]})
+        pool.delete_all({'max_fee': 1})
+        self.assertEqual(len(self.txs), 2)
+        pool.close()
+
+    def test_does_not_change_the_options(self):
+        options = {'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint, 'accounts': 2}
+        bluzelle.new_pool_client(options).close()
+        self.assertEqual(options['accounts'], 2)
+
+    def test_validates_accounts(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'accounts must be a positive int'):
+            bluzelle.new_pool_client({'mnemonic': '...', 'uuid': '...', 'accounts': 0})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'mnemonics must be a non empty list of strings'):
+            bluzelle.new_pool_client({'uuid': '...', 'mnemonics': []})
+
+# keys belong on chain to the account that created them
+class TestPoolOwnership(unittest.TestCase):
+    def setUp(self):
+        self.node = NodeEmulator(block_time=0.2).start()
+        self.pool = bluzelle.new_pool_client({'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint, 'accounts': 2})
+
+    def tearDown(self):
+        self.pool.close()
+        self.node.stop()
+
+    # keeps `account` busy with a create of `key` until the returned future is done
+    def busy(self, account, key):
+        with self.pool.cond:
+            self.pool.inflight[1 - account] += 1
+        future = self.pool.submit('create', key, 'v', GAS_INFO)
+        while self.pool.inflight[account] == 0:
+            time.sleep(0.001)
+        with self.pool.cond:
+            self.pool.inflight[1 - account] -= 1
+        return future
+
+    def test_writes_go_to_the_owner_while_it_is_busy(self):
+        self.pool.create('a', '1', GAS_INFO)
+        owner = self.pool.owners['a']
+        busy = self.busy(owner, 'b')
+        self.pool.update('a', '2', GAS_INFO)
+        busy.result(5)
+        self.assertEqual(self.pool.read('a'), '2')
+        self.pool.rename('a', 'c', GAS_INFO)
+        self.assertEqual(self.pool.owners, {'b': owner, 'c': owner})
+        busy = self.busy(owner, 'd')
+        self.pool.batch().update('c', '3').renew_lease('b').commit(GAS_INFO)
+        self.pool.delete('c', GAS_INFO)
+        busy.result(5)
+        self.assertEqual(self.pool.keys(), ['b', 'd'])
+        self.assertNotIn('c', self.pool.owners)
+
+    def test_learns_owners_of_keys_written_elsewhere(self):
+        self.pool.clients[1].create('a', '1', GAS_INFO)
+        self.pool.clients[1].create('b', '1', GAS_INFO)
+        self.pool.update('a', '2', GAS_INFO)
+        self.assertEqual(self.pool.owners, {'a': 1})
+        self.pool.renew_lease('b', GAS_INFO)
+        self.pool.rename('b', 'c', GAS_INFO)
+        self.pool.delete('a', GAS_INFO)
+        self.assertEqual(self.pool.owners, {'c': 1})
+        self.assertEqual(self.pool.key_values(), [{'key': 'c', 'value': '1'}])
+
+    def test_refuses_keys_of_different_owners(self):
+        self.pool.clients[0].create('a', '1', GAS_INFO)
+        self.pool.clients[1].create('b', '1', GAS_INFO)
+        self.pool.update('a', '2', GAS_INFO)
+        self.pool.update('b', '2', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'keys a, b belong to different pool accounts'):
+            self.pool.multi_update([{'key': 'a', 'value': '3'}, {'key': 'b', 'value': '3'}], GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'belong to different pool accounts'):
+            self.pool.batch().update('a', '3').update('b', '3').commit(GAS_INFO)
+        self.assertEqual(self.pool.read('a'), '2')
+
+    def test_failed_creates_do_not_take_ownership(self):
+        self.pool.clients[1].create('a', '1', GAS_INFO)
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key already exists'):
+            self.pool.create('a', '2', GAS_INFO)
+        self.assertNotIn('a', self.pool.owners)
+
+# queries go to the first account, writes from any account must show up in them
+class TestPoolReadState(unittest.TestCase):
+    def setUp(self):
+        self.node = NodeEmulator(block_time=0.05).start()
+
+    def tearDown(self):
+        self.node.stop()
+
+    def new_pool(self, options):
+        opts = {'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint, 'accounts': 2}
+        opts.update(options)
+        return bluzelle.new_pool_client(opts)
+
+    def test_key_filter_sees_every_account_writes(self):
+        pool = self.new_pool({'key_filter': True})
+        self.assertEqual(pool.keys(), [])
+        self.assertFalse(pool.has('a'))
+        pool.clients[1].create('a', '1', GAS_INFO)
+        self.assertEqual(pool.read('a'), '1')
+        pool.close()
+
+    def test_cache_is_invalidated_by_every_account(self):
+        pool = self.new_pool({'cache_size': 10, 'cache_ttl': 60})
+        pool.clients[1].create('a', '1', GAS_INFO)
+        self.assertEqual(pool.read('a'), '1')
+        pool.clients[1].update('a', '2', GAS_INFO)
+        self.assertEqual(pool.read('a'), '2')
+        pool.close()
+
+    def test_read_your_writes_waits_for_every_account(self):
+        pool = self.new_pool({'consistency': 'read_your_writes'})
+        pool.clients[1].create('a', '1', GAS_INFO)
+        self.assertEqual(pool.primary.write_height, pool.clients[1].reader.write_height)
+        self.assertGreater(pool.primary.write_height, 0)
+        pool.close()
+
+# in sync broadcast mode writes are rejected once their tx is in a block: `taken`
+# already exists and keys starting with `b` belong to the second account
+class TestPoolTxResults(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/auth/accounts/', lambda req: {'result': {'value': {'account_number': 1, 'sequence': 0}}})
+        cls.node.route('POST', '/crud/', lambda req: {
+            'value': {'msg': [{'type': 'crud/x', 'value': req['body']}], 'fee': {'gas': '100'}},
+        })
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.node.route('GET', '/txs/', lambda req: cls.results[req['path'].split('/')[-1]])
+        cls.lock = threading.Lock()
+
+    @classmethod
+    def on_broadcast(cls, req):
+        msg = req['body']['tx']['msg'][0]['value']
+        with cls.lock:
+            txhash = 'H%d' % len(cls.results)
+            result = {'height': '5', 'txhash': txhash, 'raw_log': '[]'}
+            if msg.get('Key') == 'taken':
+                result.update({'code': 18, 'raw_log': 'Key already exists'})
+            elif msg.get('Key', '').startswith('b') and msg['Owner'] != cls.second:
+                result.update({'code': 4, 'raw_log': 'Incorrect Owner'})
+            cls.results[txhash] = result
+        return {'height': '0', 'txhash': txhash, 'raw_log': '[]'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.results = {}
+        self.pool = bluzelle.new_pool_client({
+            'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': self.node.endpoint, 'accounts': 2,
+            'broadcast_mode': 'sync', 'confirmation_poll_interval': 0.02,
+        })
+        self.__class__.second = self.pool.clients[1].address
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_rejected_creates_do_not_take_ownership(self):
+        future = self.pool.create('taken', 'v', GAS_INFO)
+        self.assertNotIn('taken', self.pool.owners)
+        with self.assertRaisesRegex(bluzelle.APIError, 'Key already exists'):
+            future.result(5)
+        self.assertNotIn('taken', self.pool.owners)
+        self.pool.create('a', 'v', GAS_INFO).result(5)
+        self.assertEqual(self.pool.owners, {'a': 0})
+
+    def test_rejected_owners_are_tried_on_the_other_accounts(self):
+        self.pool.update('b1', 'v', GAS_INFO).result(5)
+        self.assertEqual(self.pool.owners, {'b1': 1})
+        self.assertEqual(len(self.results), 2)
+        self.pool.update('b1', 'w', GAS_INFO).result(5)
+        self.assertEqual(len(self.results), 3)
+
+    def test_keys_no_account_owns_fail(self):
+        self.__class__.second = None
+        with self.assertRaisesRegex(bluzelle.APIError, 'Incorrect Owner'):
+            self.pool.update('b1', 'v', GAS_INFO).result(5)
+        self.assertEqual(len(self.results), 2)
+        self.assertEqual(self.pool.owners, {})
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import base64
+from .util import new_offline_client, bluzelle, FakeNode, SAMPLE_MNEMONIC
+from lib.bluzelle import Client
+from lib.async_client import AsyncClient
+from lib.emulator import NodeEmulator
+from lib.proof import encode_fields, decode_fields, simple_hash, sha256
+
+class TestProofEncoding(unittest.TestCase):
+    def test_fields_round_trip(self):
+        buf = encode_fields([(1, 300), (2, b'abc'), (3, 0), (4, b''), (5, -1)])
+        self.assertEqual(decode_fields(buf), {1: [300], 2: [b'abc'], 5: [-1]})
+
+    def test_simple_hash(self):
+        a, b, c = b'a', b'b', b'c'
+        leaf = lambda x: sha256(b'\x00' + x)
+        inner = lambda l, r: sha256(b'\x01' + l + r)
+        self.assertEqual(simple_hash([a]), leaf(a))
+        self.assertEqual(simple_hash([a, b, c]), inner(inner(leaf(a), leaf(b)), leaf(c)))
+
+# proofs of a fixed emulator state at height 7, served by a fake rpc endpoint
+class TestProvenReads(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = NodeEmulator()
+        cls.emulator.height = 7
+        cls.emulator.stores = {'test': dict(('k%d' % i, ('v%d' % i, 'owner', 100)) for i in range(10))}
+        cls.tamper = None
+        cls.node = FakeNode()
+        cls.node.route('GET', '/abci_query', cls.on_query)
+        cls.node.route('GET', '/crud/pread/test/k1', lambda req: {'result': {'value': 'pv'}})
+
+    @classmethod
+    def on_query(cls, req):
+        status, res = cls.emulator.handle('GET', req['path'], b'')
+        if cls.tamper != None:
+            cls.tamper(res['result']['response'])
+        return status, res
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.tamper = None
+        self.app_hash_heights = []
+
+    def app_hash_source(self, height):
+        self.app_hash_heights.append(height)
+        self.emulator.proven_state()
+        return self.emulator.app_hashes[height]
+
+    def new_client(self, options = {}, cls = Client):
+        opts = {'endpoint': self.node.endpoint, 'rpc_endpoint': self.node.endpoint, 'app_hash_source': self.app_hash_source}
+        opts.update(options)
+        return new_offline_client(opts, cls)
+
+    def test_verifies_the_root_once_per_height(self):
+        client = self.new_client()
+        self.assertEqual([client.read('k%d' % i, True) for i in range(10)], ['v%d' % i for i in range(10)])
+        self.assertEqual(self.app_hash_heights, [7])
+        self.assertEqual(client.proof_stats(), {'heights': 1, 'hits': 9, 'misses': 1})
+        client.close()
+
+    def test_missing_key(self):
+        client = self.new_client()
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            client.read('nope', True)
+        client.close()
+
+    def test_rejects_a_tampered_value(self):
+        self.__class__.tamper = lambda res: res.update({'value': base64.b64encode(encode_fields([(1, b'forged')])).decode()})
+        client = self.new_client()
+        with self.assertRaisesRegex(bluzelle.APIError, 'invalid proof: value does not match the proof'):
+            client.read('k1', True)
+        client.close()
+
+    def test_rejects_a_proof_for_another_key(self):
+        client = self.new_client()
+        client.read('k2', True)
+        def swap(res):
+            other = self.emulator.handle('GET', '/abci_query?path=%22/store/crud/key%22&data=0x' + b'test\x00k2'.hex(), b'')[1]
+            res['proof'] = other['result']['response']['proof']
+        self.__class__.tamper = swap
+        with self.assertRaisesRegex(bluzelle.APIError, 'invalid proof: iavl:v op is for another key'):
+            client.read('k3', True)
+        client.close()
+
+    def test_rejects_an_untrusted_app_hash(self):
+        client = self.new_client({'app_hash_source': lambda height: sha256(b'other')})
+        with self.assertRaisesRegex(bluzelle.APIError, 'invalid proof: app hash does not match the proof'):
+            client.read('k1', True)
+        client.close()
+
+    def test_fails_without_a_trusted_app_hash(self):
+        client = self.new_client({'app_hash_source': lambda height: None})
+        with self.assertRaisesRegex(bluzelle.APIError, 'invalid proof: no trusted app hash at height 7'):
+            client.read('k1', True)
+        client.close()
+
+    def test_reads_through_pread_without_rpc_endpoint(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        self.assertEqual(client.read('k1', True), 'pv')
+        client.close()
+
+    def test_async_reads_through_pread_without_rpc_endpoint(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                return await client.read('k1', True)
+        self.assertEqual(asyncio.run(run()), 'pv')
+
+    def test_async(self):
+        async def run():
+            async with self.new_client({}, AsyncClient) as client:
+                return await asyncio.gather(*[client.read('k%d' % i, True) for i in range(3)])
+        self.assertEqual(asyncio.run(run()), ['v0', 'v1', 'v2'])
+
+class TestProvenReadsFromEmulator(unittest.TestCase):
+    def test_reads_a_written_value(self):
+        with NodeEmulator(block_time=0.05) as node:
+            client = bluzelle.new_client({
+                'mnemonic': SAMPLE_MNEMONIC, 'uuid': 'test', 'endpoint': node.endpoint,
+                'rpc_endpoint': node.endpoint, 'app_hash_source': lambda height: node.app_hashes[height],
+            })
+            client.create('a', 'café', {'max_fee': 4000001})
+            self.assertEqual(client.read('a', True), 'café')
+            client.close()
+
+    def test_validates_options(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'rpc_endpoint must be a string'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'rpc_endpoint': 1})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'app_hash_source must be callable'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'app_hash_source': 'x'})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'app_hash_source is required with rpc_endpoint'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'rpc_endpoint': 'http://localhost:26657'})
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import threading
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+
+class TestReadMany(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.lock = threading.Lock()
+        cls.inflight = 0
+        cls.max_inflight = 0
+        cls.node.route('GET', '/crud/read/', cls.on_read)
+        cls.node.route('GET', '/crud/has/', lambda req: {'result': {'has': not req['path'].endswith('/missing')}})
+        cls.node.route('GET', '/crud/getlease/', lambda req: {'result': {'lease': '10'}})
+
+    # keys named `missing` do not exist, every read takes a while
+    @classmethod
+    def on_read(cls, req):
+        with cls.lock:
+            cls.inflight += 1
+            cls.max_inflight = max(cls.max_inflight, cls.inflight)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.inflight -= 1
+        key = req['path'].split('/')[-1]
+        if key == 'missing':
+            return 404, {'error': 'key not found'}
+        return {'result': {'value': 'v' + key}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.max_inflight = 0
+
+    def test_read_many_keeps_order_and_bounds_concurrency(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'concurrency': 4})
+        keys = ['k%d' % i for i in range(20)]
+        self.assertEqual(client.read_many(keys), ['v' + k for k in keys])
+        self.assertEqual(self.max_inflight, 4)
+        client.close()
+
+    def test_read_many_returns_errors_per_key(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        res = client.read_many(['a', 'missing', 'b/c', 5, 'd'])
+        self.assertEqual([res[0], res[4]], ['va', 'vd'])
+        self.assertEqual(res[1].message, 'key not found')
+        self.assertEqual(str(res[2]), 'Key cannot contain a slash')
+        self.assertEqual(res[3].message, 'Key must be a string')
+        client.close()
+
+    def test_has_many_and_get_lease_many(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        self.assertEqual(client.has_many(['a', 'missing']), [True, False])
+        self.assertEqual(client.get_lease_many(['a', 'b']), [50, 50])
+        client.close()
+
+    def test_async_read_many(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint, 'concurrency': 3}, AsyncClient) as client:
+                return await client.read_many(['k%d' % i for i in range(9)] + ['missing'])
+        res = asyncio.run(run())
+        self.assertEqual(res[:9], ['vk%d' % i for i in range(9)])
+        self.assertTrue(isinstance(res[9], bluzelle.APIError))
+        self.assertEqual(self.max_inflight, 3)
+
+    def test_validates_concurrency(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'concurrency must be a positive int'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'concurrency': 0})
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+from lib.bluzelle import Client
+from lib.retry import RetryPolicy
+
+OLD_SEQUENCE_ERROR = 'unauthorized: signature verification failed; verify correct account sequence and chain-id'
+SEQUENCE_ERROR = 'account sequence mismatch, expected %d, got %s: incorrect account sequence'
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backs_off_exponentially_with_jitter(self):
+        policy = RetryPolicy(max_retries=6, base_delay=0.1, max_delay=1)
+        retry = policy.start()
+        delays = [retry.next_delay() for _ in range(7)]
+        for (attempt, delay) in enumerate(delays[:6]):
+            cap = min(1, 0.1 * 2 ** attempt)
+            self.assertTrue(cap / 2 <= delay <= cap)
+        self.assertEqual(delays[6], None)
+        stats = policy.stats()
+        self.assertEqual([stats['retries'], stats['retried'], stats['exhausted']], [6, 1, 1])
+        self.assertAlmostEqual(stats['wait_seconds'], sum(delays[:6]))
+
+    def test_gives_up_past_deadline(self):
+        retry = RetryPolicy(base_delay=1, deadline=0.5).start()
+        self.assertEqual(retry.next_delay(), None)
+
+    def test_parses_expected_sequence(self):
+        self.assertEqual(Client.expected_sequence({'code': 32, 'raw_log': SEQUENCE_ERROR % (7, 5)}), 7)
+        self.assertEqual(Client.expected_sequence({'code': 4, 'raw_log': OLD_SEQUENCE_ERROR}), None)
+
+class TestClientRetry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/auth/accounts/', cls.on_account)
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+
+    @classmethod
+    def on_account(cls, req):
+        cls.account_queries += 1
+        return {'result': {'value': {'account_number': 1, 'sequence': cls.sequence}}}
+
+    # the chain is at `sequence`, `error` formats the rejection
+    @classmethod
+    def on_broadcast(cls, req):
+        sequence = req['body']['tx']['signatures'][0]['sequence']
+        cls.sent.append(sequence)
+        if int(sequence) != cls.sequence:
+            return {'height': '0', 'txhash': 'H', 'code': 4, 'raw_log': cls.error.replace('%s', sequence)}
+        cls.sequence += 1
+        return {'height': '1', 'txhash': 'H', 'raw_log': '[]'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.sequence = 7
+        self.__class__.sent = []
+        self.__class__.account_queries = 0
+        self.policy = RetryPolicy(base_delay=0.01, max_delay=0.02)
+
+    def new_client(self, cls = Client):
+        return new_offline_client({
+            'endpoint': self.node.endpoint,
+            'offline_transactions': True,
+            'retry_policy': self.policy,
+        }, cls)
+
+    def test_recovers_sequence_from_error(self):
+        self.__class__.error = SEQUENCE_ERROR % (7, '%s')
+        client = self.new_client()
+        client.create('a', 'b', {'max_fee': 1})
+        self.assertEqual(self.sent, ['0', '7'])
+        self.assertEqual(self.account_queries, 0)
+        self.assertEqual(client.bluzelle_account['sequence'], 8)
+        stats = client.retry_stats()
+        self.assertEqual([stats['retries'], stats['recovered_sequences'], stats['account_queries']], [1, 1, 0])
+        client.close()
+
+    def test_records_retries_in_metrics(self):
+        self.__class__.error = SEQUENCE_ERROR % (7, '%s')
+        metrics = bluzelle.MetricsRegistry()
+        client = self.new_client()
+        client.metrics = metrics
+        client.create('a', 'b', {'max_fee': 1})
+        self.assertEqual(metrics.get('tx_retries_total', {'reason': 'sequence'}), 1)
+        wait = metrics.get('phase_seconds', {'phase': 'retry_wait'})
+        self.assertEqual(wait['count'], 1)
+        self.assertAlmostEqual(wait['sum'], client.retry_stats()['wait_seconds'])
+        client.close()
+
+    def test_queries_account_without_expected_sequence(self):
+        self.__class__.error = OLD_SEQUENCE_ERROR
+        client = self.new_client()
+        client.create('a', 'b', {'max_fee': 1})
+        self.assertEqual(self.sent, ['0', '7'])
+        self.assertEqual(self.account_queries, 1)
+        self.assertEqual(client.retry_stats()['account_queries'], 1)
+        client.close()
+
+    def test_gives_up_after_max_retries(self):
+        self.__class__.error = OLD_SEQUENCE_ERROR
+        self.policy.max_retries = 2
+        client = self.new_client()
+        client.metrics = bluzelle.MetricsRegistry()
+        self.__class__.sequence = 100
+        self.node.routes.insert(0, ('GET', '/auth/accounts/', lambda req: {'result': {'value': {'account_number': 1, 'sequence': 0}}}))
+        try:
+            with self.assertRaisesRegex(bluzelle.APIError, 'after max retry attempts'):
+                client.create('a', 'b', {'max_fee': 1})
+        finally:
+            self.node.routes.pop(0)
+        self.assertEqual(len(self.sent), 3)
+        self.assertEqual(client.metrics.get('tx_retries_exhausted_total', {'reason': 'sequence'}), 1)
+        client.close()
+
+    def test_async_client_recovers_sequence(self):
+        self.__class__.error = SEQUENCE_ERROR % (7, '%s')
+        async def run():
+            async with self.new_client(AsyncClient) as client:
+                await client.create('a', 'b', {'max_fee': 1})
+                return client.bluzelle_account['sequence']
+        self.assertEqual(asyncio.run(run()), 8)
+        self.assertEqual(self.sent, ['0', '7'])
+
+    def test_validates_retry_policy(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'retry_policy must be a RetryPolicy'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'retry_policy': 3})
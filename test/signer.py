@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+import unittest
+import hashlib
+import base64
+from ecdsa import VerifyingKey, SECP256k1
+from .util import new_offline_client, bluzelle, SAMPLE_MNEMONIC
+from lib.bluzelle import HD_PATH, ADDRESS_PREFIX
+from lib.identity import derive_identity
+from lib import signer
+
+class TestSigner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.identity = derive_identity(SAMPLE_MNEMONIC, HD_PATH, ADDRESS_PREFIX)
+        cls.payloads = [b'{"account_number":"0","sequence":"%d"}' % i for i in range(64)]
+
+    def test_ecdsa_signatures_verify_and_are_low_s(self):
+        s = signer.EcdsaSigner(self.identity.private_key, self.identity.public_key)
+        self.assertEqual(s.signing_key.verifying_key.to_string("compressed"), self.identity.public_key)
+        vk = VerifyingKey.from_string(self.identity.public_key, curve=SECP256k1)
+        for payload in self.payloads:
+            sig = s.sign(payload)
+            self.assertTrue(vk.verify(sig, payload, hashfunc=hashlib.sha256))
+            self.assertTrue(int.from_bytes(sig[32:], 'big') <= SECP256k1.order // 2)
+
+    @unittest.skipIf(signer.coincurve == None, 'coincurve not installed')
+    def test_backends_produce_identical_signatures(self):
+        a = signer.EcdsaSigner(self.identity.private_key, self.identity.public_key)
+        b = signer.Secp256k1Signer(self.identity.private_key, self.identity.public_key)
+        self.assertEqual(a.pub_key_string, b.pub_key_string)
+        for payload in self.payloads:
+            self.assertEqual(a.sign(payload), b.sign(payload))
+
+    def test_client_signer_option(self):
+        client = new_offline_client({'signer': 'ecdsa'})
+        self.assertTrue(isinstance(client.signer, signer.EcdsaSigner))
+        self.assertEqual(client.get_pub_key_string(), base64.b64encode(self.identity.public_key).decode('utf-8'))
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'signer must be one of auto, ecdsa, secp256k1'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'signer': 'openssl'})
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import threading
+import time
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+from lib.singleflight import SingleFlight
+
+# run `fn` from `n` threads at once
+def run_threads(n, fn):
+    results = [None] * n
+    def run(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_flight(self):
+        flights = SingleFlight()
+        runs = []
+        def fn():
+            runs.append(1)
+            time.sleep(0.1)
+            return 'v'
+        results = run_threads(10, lambda: flights.do('k', fn))
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(sorted(shared for (_, shared) in results), [False] + [True] * 9)
+        self.assertEqual(set(res for (res, _) in results), {'v'})
+        self.assertEqual(flights.stats(), {'calls': 10, 'deduplicated': 9, 'in_flight': 0})
+        self.assertEqual(flights.do('k', lambda: 'w'), ('w', False))
+
+    def test_joined_callers_get_their_own_copy(self):
+        flights = SingleFlight()
+        def fn():
+            time.sleep(0.1)
+            return {'keys': ['a']}
+        results = run_threads(5, lambda: flights.do('k', fn))
+        results[0][0]['keys'].append('b')
+        self.assertEqual([res for (res, _) in results[1:]], [{'keys': ['a']}] * 4)
+        self.assertEqual(len(set(id(res) for (res, _) in results)), 5)
+        alone = {'keys': []}
+        self.assertIs(flights.do('k', lambda: alone)[0], alone)
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+        def fn():
+            time.sleep(0.1)
+            raise ValueError('boom')
+        results = run_threads(5, lambda: flights.do('k', fn))
+        self.assertTrue(all(isinstance(e, ValueError) for e in results))
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+    def test_forget(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        def slow():
+            started.set()
+            time.sleep(0.1)
+            return 'old'
+        t = threading.Thread(target=flights.do, args=('k', slow))
+        t.start()
+        started.wait()
+        flights.forget()
+        self.assertEqual(flights.do('k', lambda: 'new'), ('new', False))
+        t.join()
+
+class TestCoalescedQueries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.reads = 0
+        cls.node.route('GET', '/crud/read/', cls.on_read)
+        cls.node.route('GET', '/crud/count/', lambda req: {'result': {'count': '3'}})
+        cls.node.route('GET', '/crud/keys/', cls.on_keys)
+
+    @classmethod
+    def on_read(cls, req):
+        cls.reads += 1
+        time.sleep(0.1)
+        return {'result': {'value': 'v'}}
+
+    @classmethod
+    def on_keys(cls, req):
+        cls.keys += 1
+        time.sleep(0.1)
+        return {'result': {'keys': ['a']}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.__class__.reads = 0
+        self.__class__.keys = 0
+
+    def test_identical_reads_share_a_request(self):
+        metrics = bluzelle.MetricsRegistry()
+        client = new_offline_client({'endpoint': self.node.endpoint, 'metrics': metrics})
+        self.assertEqual(run_threads(20, lambda: client.read('k')), ['v'] * 20)
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(client.coalesce_stats()['deduplicated'], 19)
+        self.assertIn('bluzelle_coalesced_queries_total{method="read"} 19', metrics.to_prometheus())
+        client.close()
+
+    def test_coalesced_keys_are_not_shared(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        keys = run_threads(5, client.keys)
+        keys[0].append('b')
+        self.assertEqual(keys[1:], [['a']] * 4)
+        self.assertEqual(self.keys, 1)
+        client.close()
+
+    def test_async_coalesced_keys_are_not_shared(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                return await asyncio.gather(*[client.keys() for _ in range(5)])
+        keys = asyncio.run(run())
+        keys[0].append('b')
+        self.assertEqual(keys[1:], [['a']] * 4)
+        self.assertEqual(self.keys, 1)
+
+    def test_different_urls_are_not_coalesced(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        run_threads(4, lambda: client.read('k%d' % threading.get_ident()))
+        self.assertEqual(self.reads, 4)
+        client.close()
+
+    def test_can_be_turned_off(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'coalesce_queries': False})
+        run_threads(3, lambda: client.read('k'))
+        self.assertEqual(self.reads, 3)
+        self.assertEqual(client.coalesce_stats(), None)
+        client.close()
+
+    def test_async_reads_share_a_request(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                values = await asyncio.gather(*[client.read('k') for _ in range(10)])
+                return values, client.coalesce_stats()
+        values, stats = asyncio.run(run())
+        self.assertEqual(values, ['v'] * 10)
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(stats['deduplicated'], 9)
+
+    def test_validates_coalesce_queries(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'coalesce_queries must be a bool'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'coalesce_queries': 1})
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import json
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+from lib.stream import JSONArrayParser
+
+def feed_bytewise(parser, doc):
+    items = []
+    for i in range(len(doc)):
+        items.extend(parser.feed(doc[i:i + 1]))
+    return items, parser.close()
+
+class TestStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.keys = ['key%d' % i for i in range(1000)]
+        cls.node.route('GET', '/crud/keys/missing', lambda req: (500, {'error': 'no such uuid'}))
+        cls.node.route('GET', '/crud/keys/empty', lambda req: {'height': '3', 'result': {'keys': None}})
+        cls.node.route('GET', '/crud/keys/', lambda req: {'height': '3', 'result': {'keys': cls.keys}})
+        cls.node.route('GET', '/crud/keyvalues/', lambda req: {
+            'height': '3',
+            'result': {'keyvalues': [{'key': k, 'value': 'v' + k} for k in cls.keys]},
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_parser_yields_items_of_named_array(self):
+        doc = json.dumps({
+            'height': 'keys',
+            'result': {'other': ['x'], 'keys': ['a', 'b"]', 'ü€', {'n': [1, 2]}, 12345, None]},
+        }).encode('utf-8')
+        items, rest = feed_bytewise(JSONArrayParser('keys'), doc)
+        self.assertEqual(items, ['a', 'b"]', 'ü€', {'n': [1, 2]}, 12345, None])
+        self.assertEqual(rest, None)
+
+    def test_parser_returns_documents_without_the_array(self):
+        doc = json.dumps({'error': 'unknown request'}).encode('utf-8')
+        items, rest = feed_bytewise(JSONArrayParser('keys'), doc)
+        self.assertEqual(items, [])
+        self.assertEqual(rest, {'error': 'unknown request'})
+
+    def test_parser_treats_null_arrays_as_empty(self):
+        doc = json.dumps({'height': '3', 'result': {'keys': None}}).encode('utf-8')
+        items, rest = feed_bytewise(JSONArrayParser('keys'), doc)
+        self.assertEqual(items, [])
+        self.assertEqual(rest, None)
+
+    def test_parser_rejects_truncated_arrays(self):
+        parser = JSONArrayParser('keys')
+        self.assertEqual(parser.feed(b'{"result":{"keys":["a","b'), ['a'])
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    def test_iter_keys(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        it = client.iter_keys()
+        self.assertEqual(next(it), 'key0')
+        self.assertEqual(['key0'] + list(it), self.keys)
+        self.assertEqual(list(client.iter_keys(limit=3)), ['key0', 'key1', 'key2'])
+        client.close()
+
+    def test_iter_key_values(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        self.assertEqual(list(client.iter_key_values()), client.key_values())
+        client.close()
+
+    def test_iter_keys_of_empty_uuid(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'uuid': 'empty'})
+        self.assertEqual(client.keys(), None)
+        self.assertEqual(list(client.iter_keys()), [])
+        client.close()
+
+    def test_iter_raises_api_errors(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'uuid': 'missing'})
+        with self.assertRaisesRegex(bluzelle.APIError, 'no such uuid'):
+            list(client.iter_keys())
+        with self.assertRaises(bluzelle.APIError):
+            client.iter_keys(limit=-1)
+        client.close()
+
+    def test_async_iter_keys(self):
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint}, AsyncClient) as client:
+                return [k async for k in client.iter_keys()], [kv async for kv in client.iter_key_values(limit=2)]
+        keys, key_values = asyncio.run(run())
+        self.assertEqual(keys, self.keys)
+        self.assertEqual(key_values, [{'key': 'key0', 'value': 'vkey0'}, {'key': 'key1', 'value': 'vkey1'}])
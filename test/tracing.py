@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import logging
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+from lib.tracing import Tracer, LoggingExporter, NOOP_SPAN, current_span
+
+def names(span):
+    return [child.name for child in span.children]
+
+class TestTracer(unittest.TestCase):
+    def test_nests_spans(self):
+        tracer = Tracer()
+        with tracer.span('call', {'a': 1}) as call:
+            with tracer.span('http') as http:
+                current_span().event('retry', attempt=1)
+        self.assertEqual(tracer.finished(), [call])
+        self.assertEqual(call.children, [http])
+        self.assertEqual(http.trace_id, call.trace_id)
+        self.assertEqual(http.events[0][1:], ('retry', {'attempt': 1}))
+        self.assertTrue(call.duration >= http.duration)
+        self.assertEqual(call.to_dict()['children'][0]['name'], 'http')
+
+    def test_records_errors(self):
+        tracer = Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span('call'):
+                raise ValueError('x')
+        self.assertEqual(tracer.finished()[0].error, "ValueError('x')")
+
+    def test_unsampled_calls_record_nothing(self):
+        tracer = Tracer(sample_rate=0.000001)
+        with tracer.span('call') as call:
+            self.assertFalse(call.recording)
+            self.assertIs(tracer.span('http'), NOOP_SPAN)
+        self.assertEqual(tracer.finished(), [])
+
+    def test_samples_calls(self):
+        tracer = Tracer(sample_rate=0.5)
+        for _ in range(1000):
+            with tracer.span('call'):
+                pass
+        self.assertTrue(400 < len(tracer.finished()) < 600)
+
+    def test_exporter(self):
+        exported = []
+        tracer = Tracer(exporter=exported.append)
+        with tracer.span('call'):
+            pass
+        self.assertEqual([s.name for s in exported], ['call'])
+        self.assertEqual(tracer.finished(), [])
+
+class TestClientTracing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/crud/read/', lambda req: {'result': {'value': 'v'}})
+        cls.node.route('GET', '/crud/has/', lambda req: (404, {'error': 'unknown'}))
+        cls.node.route('GET', '/crud/keys/', lambda req: {'result': {'keys': ['a', 'b']}})
+        cls.node.route('POST', '/crud/', lambda req: {'value': {'msg': [{'type': 'crud/x', 'value': {}}], 'fee': {'gas': '1000'}}})
+        cls.node.route('POST', '/txs', lambda req: {'height': '1', 'txhash': 'H', 'raw_log': '[]'})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_off_by_default(self):
+        client = new_offline_client({'endpoint': self.node.endpoint})
+        self.assertIs(client.span('read'), NOOP_SPAN)
+        self.assertIs(client.http_span('get', '/'), NOOP_SPAN)
+        client.close()
+
+    def test_spans_calls_and_requests(self):
+        tracer = Tracer()
+        client = new_offline_client({'endpoint': self.node.endpoint, 'tracer': tracer})
+        client.read('a')
+        with self.assertRaises(bluzelle.APIError):
+            client.has('a')
+        client.create('a', 'b', {'max_fee': 1})
+        read, has, create = tracer.finished()
+        self.assertEqual((read.name, names(read)), ('read', ['http']))
+        self.assertEqual(read.children[0].attributes['http.url'], self.node.endpoint + '/crud/read/test/a')
+        self.assertTrue(read.children[0].attributes['http.received_bytes'] > 0)
+        self.assertTrue(has.error != None and has.children[0].error != None)
+        self.assertEqual((create.name, names(create)), ('create', ['http', 'sign', 'http']))
+        self.assertTrue(create.children[2].attributes['http.url'].endswith('/txs'))
+        self.assertFalse('http.request' in create.children[2].attributes)
+        self.assertFalse('sign_bytes' in create.children[1].attributes)
+        client.close()
+
+    def test_captures_payloads(self):
+        tracer = Tracer(capture_payloads=True)
+        client = new_offline_client({'endpoint': self.node.endpoint, 'tracer': tracer})
+        client.batch().create('a', 'b').create('c', 'd').commit({'max_fee': 1})
+        batch = tracer.finished()[0]
+        self.assertEqual((batch.name, batch.attributes['ops']), ('batch', 2))
+        broadcast = batch.children[-1].attributes
+        self.assertIn('"mode":"block"', broadcast['http.request'])
+        self.assertIn('H', broadcast['http.response'])
+        sign = batch.children[-2].attributes
+        self.assertIn('"chain_id":"bluzelle"', sign['sign_bytes'])
+        self.assertEqual(sign['pub_key'], client.get_pub_key_string())
+        client.close()
+
+    def test_spans_streams(self):
+        tracer = Tracer()
+        client = new_offline_client({'endpoint': self.node.endpoint, 'tracer': tracer})
+        keys = client.iter_keys()
+        self.assertEqual(next(keys), 'a')
+        self.assertIs(current_span(), NOOP_SPAN)
+        self.assertEqual(list(keys), ['b'])
+        span = tracer.finished()[0]
+        self.assertEqual((span.name, span.attributes['items']), ('keys', 2))
+        client.close()
+
+    def test_debug_logs_traces(self):
+        client = new_offline_client({'endpoint': self.node.endpoint, 'debug': True})
+        self.assertTrue(isinstance(client.tracer.exporter, LoggingExporter))
+        with self.assertLogs('bluzelle', level=logging.DEBUG) as logs:
+            client.read('a')
+        self.assertRegex(logs.output[0], r'read [\d.]+ms\n  http [\d.]+ms .*"http.response"')
+        client.logger.disabled = True
+        client.close()
+
+    def test_clients_share_one_log_handler(self):
+        logger = logging.getLogger('bluzelle')
+        clients = [new_offline_client({'endpoint': self.node.endpoint, 'debug': True})]
+        handlers = list(logger.handlers)
+        clients.extend(new_offline_client({'endpoint': self.node.endpoint, 'debug': True}) for _ in range(3))
+        self.assertEqual(logger.handlers, handlers)
+        for client in clients:
+            client.logger.disabled = True
+            client.close()
+
+    def test_async_client(self):
+        tracer = Tracer()
+        async def run():
+            async with new_offline_client({'endpoint': self.node.endpoint, 'tracer': tracer}, AsyncClient) as client:
+                await client.read('a')
+                await client.create('a', 'b', {'max_fee': 1})
+        asyncio.run(run())
+        read, create = tracer.finished()
+        self.assertEqual(names(read), ['http'])
+        self.assertEqual((create.name, names(create)), ('create', ['http', 'sign', 'http']))
+
+    def test_validates_tracer(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'tracer must be a Tracer'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'tracer': {}})
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+import unittest
+import asyncio
+import json
+import threading
+from .util import new_offline_client, bluzelle, FakeNode
+from lib.async_client import AsyncClient
+
+class TestTracker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('POST', '/crud/', lambda req: {
+            'value': {'msg': [{'type': 'crud/x', 'value': req['body']}], 'fee': {'gas': '100'}},
+        })
+        cls.node.route('POST', '/txs', cls.on_broadcast)
+        cls.node.route('GET', '/txs/', cls.on_query)
+        cls.lock = threading.Lock()
+        cls.txs = {}
+        cls.polls = {}
+
+    @classmethod
+    def on_broadcast(cls, req):
+        tx = req['body']['tx']
+        with cls.lock:
+            txhash = 'H%d' % len(cls.txs)
+            cls.txs[txhash] = tx
+            cls.polls[txhash] = 0
+        return {'height': '0', 'txhash': txhash, 'raw_log': '[]'}
+
+    # every tx shows up on the second poll, keys named `fail` fail and `lost` never show up
+    @classmethod
+    def on_query(cls, req):
+        txhash = req['path'].split('/')[-1]
+        with cls.lock:
+            cls.polls[txhash] += 1
+            polls = cls.polls[txhash]
+        key = cls.txs[txhash]['msg'][0]['value'].get('Key')
+        if polls < 2 or key == 'lost':
+            return 404, {'error': 'tx (%s) not found' % txhash}
+        if key == 'fail':
+            return {'height': '2', 'txhash': txhash, 'code': 5, 'raw_log': 'insufficient funds'}
+        if key == None:
+            return {'height': '2', 'txhash': txhash}
+        data = json.dumps({'value': key}).encode('ascii').hex()
+        return {'height': '2', 'txhash': txhash, 'data': data}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def new_client(self, mode, cls = bluzelle.bluzelle.Client):
+        return new_offline_client({
+            'endpoint': self.node.endpoint,
+            'broadcast_mode': mode,
+            'confirmation_poll_interval': 0.05,
+            'confirmation_timeout': 0.5,
+        }, cls)
+
+    def test_sync_mode_returns_futures_and_advances_sequence(self):
+        client = self.new_client('sync')
+        futures = [client.tx_read(k, {'max_fee': 1}) for k in ['a', 'b', 'c']]
+        self.assertEqual(client.bluzelle_account['sequence'], 3)
+        self.assertEqual([f.result(5) for f in futures], ['a', 'b', 'c'])
+        sequences = [self.txs[f.txhash]['signatures'][0]['sequence'] for f in futures]
+        self.assertEqual(sequences, ['0', '1', '2'])
+        client.close()
+
+    def test_async_mode_mutations_resolve_to_none(self):
+        client = self.new_client('async')
+        self.assertEqual(client.delete_all({'max_fee': 1}).result(5), None)
+        client.close()
+
+    def test_failed_tx_raises(self):
+        client = self.new_client('sync')
+        future = client.create('fail', 'v', {'max_fee': 1})
+        with self.assertRaisesRegex(bluzelle.APIError, 'insufficient funds'):
+            future.result(5)
+        client.close()
+
+    def test_lost_tx_times_out_and_resyncs_account(self):
+        client = self.new_client('sync')
+        future = client.create('lost', 'v', {'max_fee': 1})
+        with self.assertRaisesRegex(bluzelle.APIError, 'not included'):
+            future.result(5)
+        self.assertTrue(client.account_stale)
+        client.close()
+
+    def test_async_client(self):
+        async def run():
+            async with self.new_client('sync', AsyncClient) as client:
+                futures = await asyncio.gather(*[client.tx_read(k, {'max_fee': 1}) for k in ['x', 'y']])
+                return await asyncio.gather(*futures)
+        self.assertEqual(asyncio.run(run()), ['x', 'y'])
+
+    def test_validates_broadcast_mode(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'broadcast_mode must be one of block, sync, async'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'broadcast_mode': 'commit'})
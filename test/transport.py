@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+import unittest
+from .util import new_offline_client, bluzelle, FakeNode, Client
+
+class TestTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode()
+        cls.node.route('GET', '/node_info', lambda req: {
+            'application_version': {'version': '0.0.1'},
+        })
+        cls.node.route('POST', '/crud/create', lambda req: {
+            'value': {'msg': [], 'fee': {'gas': '1'}, 'echo': req['body']['Key']},
+        })
+        cls.node.route('GET', '/crud/read/', lambda req: (404, {
+            'error': 'key not found',
+        }))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.client = new_offline_client({'endpoint': self.node.endpoint})
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_reuses_connections(self):
+        for _ in range(5):
+            self.assertEqual(self.client.version(), '0.0.1')
+        stats = self.client.transport_stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reused'], 4)
+
+    def test_shares_transport_between_queries_and_mutations(self):
+        self.client.version()
+        txn = self.client.validate_transaction('post', '/crud/create', {'Key': 'foo'})
+        self.assertEqual(txn['echo'], 'foo')
+        self.assertEqual(self.client.transport_stats()['reused'], 1)
+
+    def test_raises_api_errors(self):
+        with self.assertRaisesRegex(bluzelle.APIError, 'key not found'):
+            self.client.read('foo')
+
+    def test_custom_transport(self):
+        class Static(bluzelle.Transport):
+            def request(self, method, url, data = None, headers = None):
+                raise bluzelle.APIError('static %s %s' % (method, url))
+
+        client = new_offline_client({'transport': Static()})
+        with self.assertRaisesRegex(bluzelle.APIError, 'static get http://127.0.0.1:1/node_info'):
+            client.version()
+
+    def test_validates_transport_options(self):
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'pool_size must be a positive int'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'pool_size': 0})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'timeout must be a positive number'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'timeout': '1'})
+        with self.assertRaisesRegex(bluzelle.OptionsError, 'transport must be a Transport'):
+            bluzelle.new_client({'mnemonic': '...', 'uuid': '...', 'transport': object()})
@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 
 import os
+import re
+import json
+import binascii
 import lib as bluzelle
 from lib.bluzelle import Client
+from lib.emulator import SAMPLE_MNEMONIC, new_offline_client, FakeNode
 import distutils.util
 from dotenv import load_dotenv
 
@@ -31,3 +35,11 @@ def key_values_to_dict(key_values):
     for key_value in key_values:
         ret[key_value['key']] = key_value['value']
     return ret
+
+# offline helpers
+
+# the sign bytes the client built before `canonical_json`
+def legacy_sign_bytes(payload):
+    s = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    s = re.sub(r"([&<>])", lambda m: u"\\u00" + binascii.hexlify(m.group(0).encode('ascii')).decode(), s)
+    return bytes(s, 'utf-8')